@@ -0,0 +1,161 @@
+"""
+Benchmark: HTTP requests and bytes downloaded per domain by discover_policy.
+
+Serves a synthetic corpus from an httpx.MockTransport, so nothing touches
+the network. Each domain has a 200 KB homepage and publishes its policy one
+of four ways, a quarter of the domains each:
+
+  - the well-known URI
+  - an Agent-Policy header on the homepage
+  - a <meta name="agent-policy"> tag in the homepage's <head>
+  - a DNS TXT record
+
+and reports requests and bytes of response body read per domain for:
+
+  - fetching the whole homepage once for the header step and again for the
+    meta-tag step, searching it with regexes (the original chain)
+  - fetching the whole homepage once for both steps
+  - streaming the homepage only when there is no Agent-Policy header, and
+    only until </head> (the chain as it is)
+
+Run from sdk/python::
+
+    python benchmarks/bench_discovery.py
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import re
+from typing import AsyncIterator, Awaitable, Callable, Optional
+
+import httpx
+
+from apop.discovery import (
+    DiscoveryOptions,
+    _fetch_and_parse_policy,
+    _Found,
+    _try_dns_txt,
+    _try_well_known,
+    discover_policy,
+)
+
+DOMAINS = 400
+HOMEPAGE_BYTES = 200_000
+CHUNK = 16 * 1024
+META = re.compile(r'<meta\s+name=["\']agent-policy["\']\s+content=["\']([^"\']+)["\']', re.I)
+POLICY = json.dumps({"version": "1.0", "defaultPolicy": {"allow": True}})
+METHODS = ("well-known", "http-header", "meta-tag", "dns-txt")
+
+
+def method_of(host: str) -> str:
+    return METHODS[int(host.split(".")[0][1:]) % len(METHODS)]
+
+
+def homepage(host: str) -> str:
+    meta = ""
+    if method_of(host) == "meta-tag":
+        meta = f'<meta name="agent-policy" content="https://{host}/policy.json">'
+    head = f"<html><head><title>{host}</title>{meta}</head><body>"
+    return head + "x" * (HOMEPAGE_BYTES - len(head) - len("</body></html>")) + "</body></html>"
+
+
+class Counter:
+    """MockTransport handler serving the corpus and counting body bytes read."""
+
+    def __init__(self) -> None:
+        self.requests = 0
+        self.bytes = 0
+
+    async def stream(self, body: bytes) -> AsyncIterator[bytes]:
+        for start in range(0, len(body), CHUNK):
+            self.bytes += len(body[start : start + CHUNK])
+            yield body[start : start + CHUNK]
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        host, path = request.url.host, request.url.path
+        method = method_of(host)
+        self.requests += 1
+        if path == "/.well-known/agent-policy.json":
+            response = httpx.Response(200 if method == "well-known" else 404, text=POLICY)
+        elif path == "/policy.json":
+            response = httpx.Response(200, text=POLICY)
+        elif path == "/":
+            headers = {}
+            if method == "http-header":
+                headers["Agent-Policy"] = f"https://{host}/policy.json"
+            # Streamed: only the chunks the client reads are counted
+            body = self.stream(homepage(host).encode())
+            return httpx.Response(200, content=body, headers=headers)
+        else:
+            response = httpx.Response(404)
+        self.bytes += len(response.content)
+        return response
+
+
+async def dns_resolve(hostname: str, rrtype: str) -> list[list[str]]:
+    host = hostname.removeprefix("_agentpolicy.")
+    if method_of(host) != "dns-txt":
+        return []
+    return [[f"apop=1 policy=https://{host}/policy.json"]]
+
+
+async def from_homepage(
+    response: httpx.Response, client: httpx.AsyncClient, step: int
+) -> Optional[_Found]:
+    """Steps 2 and 3 on a fully downloaded homepage, as the original chain ran them."""
+    if step == 2:
+        header = response.headers.get("agent-policy")
+        return await _fetch_and_parse_policy(header, "http-header", client) if header else None
+    match = META.search(response.text)
+    return await _fetch_and_parse_policy(match.group(1), "meta-tag", client) if match else None
+
+
+def whole_page_chain(fetches: int) -> Callable[[str, DiscoveryOptions], Awaitable[object]]:
+    """The chain with the homepage downloaded in full, once per step or once for both."""
+
+    async def discover(domain: str, options: DiscoveryOptions) -> Optional[_Found]:
+        client = options.http_client
+        assert client is not None
+        url = f"https://{domain}/.well-known/agent-policy.json"
+        found = await _try_well_known(url, client, options.max_retries)
+        page = None
+        for step in (2, 3):
+            if found:
+                break
+            if page is None or fetches == 2:
+                page = await client.get(f"https://{domain}/")
+            found = await from_homepage(page, client, step)
+        return found or await _try_dns_txt(domain, client, options.dns_resolve)
+
+    return discover
+
+
+async def run(discover: Callable[[str, DiscoveryOptions], Awaitable[object]]) -> Counter:
+    counter = Counter()
+    async with httpx.AsyncClient(transport=httpx.MockTransport(counter)) as client:
+        options = DiscoveryOptions(http_client=client, max_retries=0, dns_resolve=dns_resolve)
+        for i in range(DOMAINS):
+            assert await discover(f"d{i}.example", options)
+    return counter
+
+
+async def main() -> None:
+    print(f"{DOMAINS} domains, {HOMEPAGE_BYTES:,}-byte homepages, methods split evenly")
+    before = await run(whole_page_chain(fetches=2))
+    rows = {
+        "two homepage fetches": before,
+        "one homepage fetch": await run(whole_page_chain(fetches=1)),
+        "streamed <head> scan": await run(discover_policy),
+    }
+    for label, counter in rows.items():
+        print(
+            f"{label:<24}{counter.requests / DOMAINS:>8.2f} requests/domain"
+            f"{counter.bytes / DOMAINS:>14,.0f} bytes/domain"
+            f"{1 - counter.bytes / before.bytes:>8.0%} saved"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,77 @@
+"""
+Benchmark: parse_policy throughput over the examples/ corpus.
+
+Parses every examples/*.json policy repeatedly and reports policies parsed
+per second for:
+
+  - a fresh jsonschema validator per call (how validate_policy used to work)
+  - the shared jsonschema validator (engine="jsonschema")
+  - the validator generated from APOP_SCHEMA by apop.codegen, followed by
+    the dict → dataclass conversion (engine="generated")
+  - the fused single pass that validates while converting (the default)
+
+JSON is decoded with the library named by apop.parser.JSON_DECODER.
+
+Run from sdk/python::
+
+    python benchmarks/bench_parser.py
+"""
+
+from __future__ import annotations
+
+import json
+import time
+from pathlib import Path
+from typing import Callable
+
+import jsonschema
+
+from apop.parser import (
+    APOP_SCHEMA,
+    JSON_DECODER,
+    ParseResult,
+    _dict_to_agent_policy,
+    parse_policy,
+)
+
+EXAMPLES = Path(__file__).resolve().parents[3] / "examples"
+ROUNDS = 200
+
+
+def parse_with_fresh_validator(json_str: str) -> ParseResult:
+    """parse_policy as it was before the validator was cached."""
+    data = json.loads(json_str)
+    validator = jsonschema.Draft202012Validator(APOP_SCHEMA)
+    if any(True for _ in validator.iter_errors(data)):
+        return ParseResult(valid=False)
+    return ParseResult(valid=True, policy=_dict_to_agent_policy(data))
+
+
+def run(parse: Callable[[str], ParseResult], corpus: list[str]) -> float:
+    """Policies parsed per second."""
+    parse(corpus[0])  # warm-up
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        for text in corpus:
+            assert parse(text).valid
+    return ROUNDS * len(corpus) / (time.perf_counter() - start)
+
+
+def main() -> None:
+    corpus = [path.read_text(encoding="utf-8") for path in sorted(EXAMPLES.glob("*.json"))]
+    size = sum(len(text) for text in corpus)
+    print(f"{len(corpus)} example policies, {size:,} bytes, {ROUNDS} rounds, {JSON_DECODER}")
+    before = run(parse_with_fresh_validator, corpus)
+    print(f"{'fresh validator per call':<28}{before:>12,.0f} policies/s")
+    engines = {
+        "shared jsonschema validator": lambda text: parse_policy(text, engine="jsonschema"),
+        "generated validator": lambda text: parse_policy(text, engine="generated"),
+        "fused validate + convert": parse_policy,
+    }
+    for label, parse in engines.items():
+        rate = run(parse, corpus)
+        print(f"{label:<28}{rate:>12,.0f} policies/s   {rate / before:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Benchmark: RateLimiter throughput under thread contention.
+
+Runs the same workload — each thread counting requests for its own slice
+of 1,000 agents — against a single-lock limiter (shards=1) and the default
+lock-striped limiter, from 1 to 32 threads, and reports total hits/s.
+
+On a GIL build of CPython only one thread runs Python code at a time, so
+striping mainly removes lock hand-offs between threads; on a free-threaded
+build (python3.13t and later) it lets hits on different stripes run in
+parallel.
+
+Run from sdk/python::
+
+    python benchmarks/bench_ratelimit.py
+"""
+
+from __future__ import annotations
+
+import sys
+import threading
+import time
+
+from apop.ratelimit import RateLimiter
+from apop.types import RateLimit
+
+HITS_PER_THREAD = 50_000
+AGENTS = 1_000
+THREADS = (1, 2, 4, 8, 16, 32)
+LIMIT = RateLimit(requests=1_000_000, window="minute")
+
+
+def run(limiter: RateLimiter, threads: int) -> float:
+    """Total hits per second with `threads` threads hammering the limiter."""
+    keys = [(f"did:web:agent{i}.example", 0) for i in range(AGENTS)]
+    barrier = threading.Barrier(threads + 1)
+
+    def worker(offset: int) -> None:
+        hit = limiter.hit
+        mine = keys[offset::threads] or keys
+        n = len(mine)
+        barrier.wait()
+        for i in range(HITS_PER_THREAD):
+            hit(mine[i % n], LIMIT)
+
+    workers = [threading.Thread(target=worker, args=(t,)) for t in range(threads)]
+    for w in workers:
+        w.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - start
+    return threads * HITS_PER_THREAD / elapsed
+
+
+def main() -> None:
+    gil = getattr(sys, "_is_gil_enabled", lambda: True)()
+    print(f"Python {sys.version.split()[0]}, GIL {'enabled' if gil else 'disabled'}")
+    print(f"{'threads':>8}{'1 lock hits/s':>16}{'16 shards hits/s':>19}{'speedup':>10}")
+    for threads in THREADS:
+        single = run(RateLimiter(shards=1), threads)
+        striped = run(RateLimiter(shards=16), threads)
+        print(f"{threads:>8}{single:>16,.0f}{striped:>19,.0f}{striped / single:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
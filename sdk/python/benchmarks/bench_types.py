@@ -0,0 +1,174 @@
+"""
+Benchmark: memory and allocation cost of the hot-path types.
+
+Compares the slotted apop.types dataclasses against equivalent plain
+(__dict__-backed) dataclasses, and measures what one enforce() call
+allocates for a raw AgentPolicy versus a CompiledPolicy.
+
+Run from sdk/python::
+
+    python benchmarks/bench_types.py
+"""
+
+from __future__ import annotations
+
+import gc
+import timeit
+import tracemalloc
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+from apop.compiler import compile_policy
+from apop.enforcer import enforce
+from apop.types import (
+    AgentPolicy,
+    AgentRequestHeaders,
+    EnforcementResult,
+    PathPolicy,
+    PolicyRule,
+    RateLimit,
+    RequestContext,
+)
+
+N = 100_000
+
+
+@dataclass
+class PlainRequestContext:
+    path: str
+    agent_name: Optional[str] = None
+    agent_intent: Optional[str] = None
+    agent_id: Optional[str] = None
+    agent_signature: Optional[str] = None
+    agent_vc: Optional[str] = None
+    agent_card: Optional[str] = None
+    agent_key_id: Optional[str] = None
+
+
+@dataclass
+class PlainAgentRequestHeaders:
+    agent_name: Optional[str] = None
+    agent_intent: Optional[str] = None
+    agent_id: Optional[str] = None
+    agent_signature: Optional[str] = None
+    agent_vc: Optional[str] = None
+    agent_card: Optional[str] = None
+    agent_key_id: Optional[str] = None
+
+
+@dataclass
+class PlainEnforcementResult:
+    status: str
+    http_status: int
+    headers: Any
+    body: Optional[dict[str, object]] = None
+
+
+@dataclass
+class PlainRateLimit:
+    requests: int
+    window: str
+
+
+def bytes_per_instance(factory: Callable[[], object]) -> float:
+    """Average traced bytes retained per instance over N instances."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    keep = [factory() for _ in range(N)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del keep
+    # Subtract the list holding the instances (one pointer each)
+    return (after - before) / N - 8
+
+
+def ns_per_call(fn: Callable[[], object], number: int = N) -> float:
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number * 1e9
+
+
+def allocations_per_call(fn: Callable[[], object], number: int = 10_000) -> tuple[float, float]:
+    """(allocated blocks, allocated bytes) per call, counting only memory still live afterwards."""
+    gc.collect()
+    tracemalloc.start()
+    snap_before = tracemalloc.take_snapshot()
+    results = [fn() for _ in range(number)]
+    snap_after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    stats = snap_after.compare_to(snap_before, "filename")
+    blocks = sum(s.count_diff for s in stats)
+    size = sum(s.size_diff for s in stats)
+    del results
+    return blocks / number, size / number - 8
+
+
+def main() -> None:
+    ctx_kwargs = dict(
+        path="/public/page",
+        agent_name="TestBot/1.0",
+        agent_intent="read",
+        agent_id="did:web:testbot.example",
+        agent_signature="sig",
+    )
+    headers = {"Agent-Policy-Status": "allowed"}
+
+    rows = [
+        (
+            "RequestContext",
+            lambda: PlainRequestContext(**ctx_kwargs),
+            lambda: RequestContext(**ctx_kwargs),
+        ),
+        (
+            "AgentRequestHeaders",
+            lambda: PlainAgentRequestHeaders(agent_name="TestBot/1.0", agent_id="did:web:x"),
+            lambda: AgentRequestHeaders(agent_name="TestBot/1.0", agent_id="did:web:x"),
+        ),
+        (
+            "EnforcementResult",
+            lambda: PlainEnforcementResult("allowed", 200, headers),
+            lambda: EnforcementResult("allowed", 200, headers),
+        ),
+        (
+            "RateLimit",
+            lambda: PlainRateLimit(100, "hour"),
+            lambda: RateLimit(100, "hour"),
+        ),
+    ]
+
+    print(f"{'type':<22}{'dict B/obj':>12}{'slots B/obj':>13}{'dict ns':>10}{'slots ns':>10}")
+    for name, plain, slotted in rows:
+        print(
+            f"{name:<22}"
+            f"{bytes_per_instance(plain):>12.0f}"
+            f"{bytes_per_instance(slotted):>13.0f}"
+            f"{ns_per_call(plain):>10.0f}"
+            f"{ns_per_call(slotted):>10.0f}"
+        )
+
+    policy = AgentPolicy(
+        version="1.0",
+        policy_url="https://example.com/.well-known/agent-policy.json",
+        default_policy=PolicyRule(
+            allow=True,
+            actions=["read", "render"],
+            disallow=["extract"],
+            rate_limit=RateLimit(requests=100, window="hour"),
+        ),
+        path_policies=[PathPolicy(path=f"/section{i}/*", allow=True) for i in range(50)]
+        + [PathPolicy(path="/public/*", allow=True, actions=["read", "index"])],
+    )
+    compiled = compile_policy(policy)
+    ctx = RequestContext(**ctx_kwargs)
+
+    print()
+    print(f"{'enforce() on':<22}{'live blocks':>12}{'live bytes':>13}{'ns/call':>10}")
+    for name, target in (("AgentPolicy", policy), ("CompiledPolicy", compiled)):
+        blocks, size = allocations_per_call(lambda: enforce(target, ctx))
+        print(
+            f"{name:<22}{blocks:>12.1f}{size:>13.0f}"
+            f"{ns_per_call(lambda: enforce(target, ctx), 20_000):>10.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
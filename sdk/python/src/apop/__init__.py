@@ -10,7 +10,9 @@ __version__ = "1.0.0"
 
 # Types
 from apop.types import (
+    ACTION_BITS,
     ACTION_TYPES,
+    ALL_ACTIONS_MASK,
     APOP_STATUS_CODES,
     ActionType,
     AgentPolicy,
@@ -37,31 +39,63 @@ from apop.types import (
 from apop.parser import get_schema, parse_policy, parse_policy_file, validate_policy
 from apop.parser import ParseResult, ValidationError
 
+# Policy loading
+from apop.loader import LoadedPolicy, PolicyLoader, load_policy_file
+
 # Matcher
-from apop.matcher import match_path_policy, merge_policy, path_matches
+from apop.matcher import PolicyIndex, match_path_policy, merge_policy, path_matches
+
+# Compiler
+from apop.compiler import CompiledPolicy, CompiledRule, compile_policy
 
 # Enforcer
-from apop.enforcer import enforce
+from apop.enforcer import (
+    BatchEnforcementResult,
+    DecisionCache,
+    Verifier,
+    aenforce,
+    enforce,
+    enforce_many,
+)
+
+# Rate limiting
+from apop.ratelimit import (
+    AsyncRateLimitBackend,
+    RateLimitBackend,
+    RateLimitDecision,
+    RateLimiter,
+)
+from apop.lease import LeaseBackend, LeasedRateLimiter, LeaseGrant
+from apop.redis import AsyncRedisRateLimiter, RedisRateLimiter
+from apop.sharedmem import SharedMemoryRateLimiter
+
+# Anti-enumeration
+from apop.enumeration import EnumerationGuard
 
 # Headers
 from apop.headers import (
+    action_mask,
     build_allowed_headers,
     build_denied_headers,
     build_discovery_headers,
     build_rate_limited_headers,
     build_verification_headers,
     is_agent,
+    parse_intent_mask,
     parse_intents,
     parse_request_headers,
 )
 
 # Discovery
-from apop.discovery import discover_policy, DiscoveryOptions
+from apop.discovery import discover_many, discover_policy, DiscoveryOptions, DiscoveryProgress
+from apop.policycache import CachedPolicy, PolicyCache
 
 __all__ = [
     # Types
     "ActionType",
     "ACTION_TYPES",
+    "ACTION_BITS",
+    "ALL_ACTIONS_MASK",
     "AgentPolicy",
     "AgentRequestHeaders",
     "AgentResponseHeaders",
@@ -88,16 +122,45 @@ __all__ = [
     "get_schema",
     "ParseResult",
     "ValidationError",
+    # Policy loading
+    "load_policy_file",
+    "LoadedPolicy",
+    "PolicyLoader",
     # Matcher
     "path_matches",
     "match_path_policy",
     "merge_policy",
+    "PolicyIndex",
+    # Compiler
+    "compile_policy",
+    "CompiledPolicy",
+    "CompiledRule",
     # Enforcer
     "enforce",
+    "aenforce",
+    "enforce_many",
+    "Verifier",
+    "BatchEnforcementResult",
+    "DecisionCache",
+    # Rate limiting
+    "RateLimiter",
+    "RateLimitDecision",
+    "RateLimitBackend",
+    "AsyncRateLimitBackend",
+    "SharedMemoryRateLimiter",
+    "RedisRateLimiter",
+    "AsyncRedisRateLimiter",
+    "LeasedRateLimiter",
+    "LeaseBackend",
+    "LeaseGrant",
+    # Anti-enumeration
+    "EnumerationGuard",
     # Headers
     "parse_request_headers",
     "is_agent",
     "parse_intents",
+    "parse_intent_mask",
+    "action_mask",
     "build_discovery_headers",
     "build_allowed_headers",
     "build_denied_headers",
@@ -106,4 +169,8 @@ __all__ = [
     # Discovery
     "discover_policy",
     "DiscoveryOptions",
+    "discover_many",
+    "DiscoveryProgress",
+    "PolicyCache",
+    "CachedPolicy",
 ]
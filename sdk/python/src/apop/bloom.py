@@ -0,0 +1,109 @@
+"""
+APoP v1.0 — Agent ID Sets
+
+Membership structures for agentAllowlist / agentDenylist lookups:
+
+  - BloomFilter: fixed-size probabilistic set (no false negatives)
+  - AgentIdSet: Bloom prefilter with exact confirmation against an external
+    lookup callable
+
+Lists held in memory are best served by a plain frozenset, which is what
+the compiler builds; AgentIdSet is for IDs that live elsewhere. Neither is
+used by the enforcer or re-exported from apop; import them from apop.bloom.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import math
+from typing import Callable, Iterable
+
+
+class BloomFilter:
+    """
+    A fixed-size Bloom filter over strings.
+
+    Sized from the expected number of items and the target false-positive
+    rate; memory is ``-ln(p) / ln(2)^2`` bits per item (≈ 9.6 bits at 1%).
+    Probe positions come from one blake2b digest via double hashing.
+    """
+
+    __slots__ = ("size", "hash_count", "_bits")
+
+    def __init__(self, capacity: int, error_rate: float = 0.001) -> None:
+        if not 0 < error_rate < 1:
+            raise ValueError("BloomFilter error_rate must be between 0 and 1")
+        capacity = max(capacity, 1)
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str) -> Iterable[int]:
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        size = self.size
+        return ((h1 + i * h2) % size for i in range(self.hash_count))
+
+    def add(self, item: str) -> None:
+        """Add an item to the filter."""
+        bits = self._bits
+        for pos in self._positions(item):
+            bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, item: object) -> bool:
+        if not isinstance(item, str):
+            return False
+        bits = self._bits
+        return all(bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+    @property
+    def nbytes(self) -> int:
+        """Memory used by the bit array, in bytes."""
+        return len(self._bits)
+
+
+class AgentIdSet:
+    """
+    A set of agent IDs kept in an external source, with a Bloom-filter prefilter.
+
+    IDs rejected by the filter are definitely absent. IDs that pass are
+    confirmed by ``confirm`` (a database, an abuse-feed service), so lookups
+    never return false positives and only the filter is held in memory.
+    The prefilter only pays off because confirmation is expensive; for IDs
+    already in memory a frozenset is faster and the compiler uses one.
+
+    Example::
+
+        denylist = AgentIdSet(abuse_feed_ids, confirm=abuse_feed.contains)
+        if agent_id in denylist:
+            ...
+    """
+
+    __slots__ = ("bloom", "_confirm", "_len")
+
+    def __init__(
+        self,
+        ids: Iterable[str],
+        *,
+        confirm: Callable[[str], bool],
+        error_rate: float = 0.001,
+    ) -> None:
+        items = ids if isinstance(ids, (list, tuple, set, frozenset)) else list(ids)
+        self.bloom = BloomFilter(len(items), error_rate)
+        for agent_id in items:
+            self.bloom.add(agent_id)
+        self._len = len(items)
+        self._confirm = confirm
+
+    def __contains__(self, agent_id: object) -> bool:
+        if agent_id not in self.bloom:
+            return False
+        assert isinstance(agent_id, str)
+        return self._confirm(agent_id)
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __bool__(self) -> bool:
+        return self._len > 0
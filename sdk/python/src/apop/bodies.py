@@ -0,0 +1,247 @@
+"""
+APoP v1.0 — Error Response Bodies
+
+Denied (430) and verification-required (439) responses carry a JSON body
+whose shape is fixed per rule and decision; only the request path, the
+Agent-Id and the blocked intents vary. This module pre-encodes each body
+once as UTF-8 JSON with holes for those values, so a denial costs a few
+byte joins instead of a dict build plus a JSON re-serialization:
+
+  - BodyTemplate: pre-encoded body for one (rule, decision) pair
+  - LazyBody: per-request handle that renders a template to bytes or to a dict
+    only when the middleware (or caller) asks for it
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from typing import Optional, Sequence
+
+from apop.matcher import MergedPolicy
+from apop.types import AgentPolicy, VerificationMethod
+
+# Decision codes shared by enforce() and enforce_many()
+DECISION_ALLOWED = 0
+DECISION_ON_DENYLIST = 1
+DECISION_NOT_ON_ALLOWLIST = 2
+DECISION_ACCESS_DENIED = 3
+DECISION_INTENT_BLOCKED = 4
+DECISION_VERIFICATION_REQUIRED = 5
+
+DECISION_HTTP_STATUS = (200, 430, 430, 430, 430, 439)
+"""HTTP status for each decision code."""
+
+# Placeholders survive json.dumps as "\u0000name\u0000", which no real
+# policy value can produce, so the encoded body can be split on them safely.
+_PATH = "\x00path\x00"
+_AGENT = "\x00agent\x00"
+_BLOCKED = "\x00blocked\x00"
+_HOLE = re.compile(r"\\u0000(path|agent|blocked)\\u0000")
+_NEEDS_ESCAPE = re.compile(r'["\\\x00-\x1f\ud800-\udfff]')
+
+
+def encode_json(value: object) -> bytes:
+    """Encode a JSON body the way BodyTemplate does (compact, UTF-8)."""
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _escape(value: str) -> bytes:
+    # Contents of a JSON string literal, without the surrounding quotes
+    if _NEEDS_ESCAPE.search(value) is None:
+        return value.encode("utf-8")
+    return json.dumps(value, ensure_ascii=False)[1:-1].encode("utf-8", "surrogatepass")
+
+
+def blocked_intents(agent_intent: Optional[str], disallow: Sequence[str]) -> str:
+    """The intents of an Agent-Intent header found in disallow, comma-joined in header order."""
+    if not agent_intent:
+        return ""
+    return ", ".join(
+        [i for s in agent_intent.split(",") if (i := s.strip()) and i in disallow]
+    )
+
+
+class BodyTemplate:
+    """A JSON error body pre-encoded with holes for path, agent and blocked intents."""
+
+    __slots__ = ("_body", "_parts", "_holes", "_disallow")
+
+    def __init__(
+        self,
+        body: dict[str, object],
+        disallow: Optional[Sequence[str]] = None,
+    ) -> None:
+        self._body = body
+        self._disallow = disallow or ()
+        encoded = json.dumps(body, ensure_ascii=False, separators=(",", ":"))
+        parts: list[bytes] = []
+        holes: list[str] = []
+        pos = 0
+        for match in _HOLE.finditer(encoded):
+            parts.append(encoded[pos : match.start()].encode("utf-8"))
+            holes.append(match.group(1))
+            pos = match.end()
+        parts.append(encoded[pos:].encode("utf-8"))
+        self._parts = tuple(parts)
+        self._holes = tuple(holes)
+
+    def blocked(self, agent_intent: Optional[str]) -> str:
+        """The disallowed intents of an Agent-Intent header, comma-joined in header order."""
+        return blocked_intents(agent_intent, self._disallow)
+
+    def render(self, path: str, agent_id: Optional[str], agent_intent: Optional[str]) -> bytes:
+        """Render the body as UTF-8 JSON bytes."""
+        parts = self._parts
+        if not self._holes:
+            return parts[0]
+        out = [parts[0]]
+        for hole, tail in zip(self._holes, parts[1:]):
+            if hole == "path":
+                out.append(_escape(path))
+            elif hole == "agent":
+                out.append(_escape(agent_id or ""))
+            else:
+                out.append(_escape(self.blocked(agent_intent)))
+            out.append(tail)
+        return b"".join(out)
+
+    def build(
+        self,
+        path: str,
+        agent_id: Optional[str],
+        agent_intent: Optional[str],
+    ) -> dict[str, object]:
+        """Render the body as a fresh dict."""
+        result: dict[str, object] = {}
+        for key, value in self._body.items():
+            if isinstance(value, str) and "\x00" in value:
+                value = (
+                    value.replace(_PATH, path)
+                    .replace(_AGENT, agent_id or "")
+                    .replace(_BLOCKED, self.blocked(agent_intent))
+                )
+            elif isinstance(value, list):
+                value = list(value)
+            result[key] = value
+        return result
+
+
+class LazyBody:
+    """
+    The error body of one denied request, rendered on demand.
+
+    Holds only the template and the request values it needs; the dict or
+    the encoded bytes are produced when EnforcementResult.body or
+    EnforcementResult.body_bytes is first read.
+    """
+
+    __slots__ = ("template", "path", "agent_id", "agent_intent")
+
+    def __init__(
+        self,
+        template: BodyTemplate,
+        path: str,
+        agent_id: Optional[str] = None,
+        agent_intent: Optional[str] = None,
+    ) -> None:
+        self.template = template
+        self.path = path
+        self.agent_id = agent_id
+        self.agent_intent = agent_intent
+
+    def to_dict(self) -> dict[str, object]:
+        return self.template.build(self.path, self.agent_id, self.agent_intent)
+
+    def to_bytes(self) -> bytes:
+        return self.template.render(self.path, self.agent_id, self.agent_intent)
+
+
+def build_body_template(
+    policy: AgentPolicy,
+    effective: MergedPolicy,
+    decision: int,
+    methods: Optional[Sequence[VerificationMethod]] = None,
+) -> BodyTemplate:
+    """
+    Build the body template for one rule and decision code.
+
+    Args:
+        policy: The policy the rule belongs to.
+        effective: The rule's merged effective policy.
+        decision: One of the DECISION_* codes other than DECISION_ALLOWED.
+        methods: Accepted verification methods (for DECISION_VERIFICATION_REQUIRED).
+
+    Returns:
+        The pre-encoded template.
+    """
+    return BodyTemplate(
+        build_error_body(policy, effective, decision, methods),
+        disallow=effective.disallow if decision == DECISION_INTENT_BLOCKED else None,
+    )
+
+
+def build_error_body(
+    policy: AgentPolicy,
+    effective: MergedPolicy,
+    decision: int,
+    methods: Optional[Sequence[VerificationMethod]] = None,
+    path: str = _PATH,
+    agent_id: str = _AGENT,
+    blocked: str = _BLOCKED,
+) -> dict[str, object]:
+    """
+    Build the error body dict for one decision code.
+
+    Without path, agent_id and blocked the body holds the template
+    placeholders for them (see build_body_template).
+    """
+    if decision == DECISION_ON_DENYLIST:
+        return {
+            "error": "agent_on_denylist",
+            "message": f"Agent '{agent_id}' is denied access to this path.",
+            "policy": policy.policy_url,
+            "path": path,
+        }
+
+    if decision == DECISION_NOT_ON_ALLOWLIST:
+        return {
+            "error": "agent_not_on_allowlist",
+            "message": "This path is restricted to specific agents.",
+            "policy": policy.policy_url,
+            "path": path,
+        }
+
+    if decision == DECISION_ACCESS_DENIED:
+        return {
+            "error": "agent_action_not_allowed",
+            "message": "Access is not permitted on this path.",
+            "policy": policy.policy_url,
+            "path": path,
+        }
+
+    if decision == DECISION_INTENT_BLOCKED:
+        return {
+            "error": "agent_action_not_allowed",
+            "message": f"Action(s) '{blocked}' not permitted on this path.",
+            "policy": policy.policy_url,
+            "allowedActions": list(effective.actions or ()),
+            "path": path,
+        }
+
+    if decision == DECISION_VERIFICATION_REQUIRED:
+        verification = policy.verification
+        return {
+            "error": "agent_verification_required",
+            "message": "This endpoint requires verified agent identity.",
+            "acceptedMethods": list(methods or ()),
+            "verifyEndpoint": verification.verification_endpoint if verification else None,
+            "trustedIssuers": (
+                list(verification.trusted_issuers)
+                if verification and verification.trusted_issuers is not None
+                else None
+            ),
+            "policy": policy.policy_url,
+        }
+
+    raise ValueError(f"No error body for decision code {decision}")
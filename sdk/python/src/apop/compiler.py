@@ -0,0 +1,303 @@
+"""
+APoP v1.0 — Policy Compiler
+
+Precomputes everything about a policy that does not depend on the request,
+so enforcement only has to pick among ready-made results:
+
+  - a PolicyIndex for O(path depth) rule lookup
+  - the merged effective policy for each PathPolicy and for the default rule
+  - frozen allowed / denied / verification response headers per rule
+  - agentAllowlist / agentDenylist as frozensets
+  - action bitmasks for the allow / actions / disallow lists
+  - pre-encoded JSON error bodies per decision (see apop.bodies)
+
+Usage::
+
+    from apop.compiler import compile_policy
+    from apop.enforcer import enforce
+
+    compiled = compile_policy(policy)
+    result = enforce(compiled, ctx)
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Container, Mapping, Optional, Sequence
+
+from apop.bodies import (
+    DECISION_ACCESS_DENIED,
+    DECISION_INTENT_BLOCKED,
+    DECISION_NOT_ON_ALLOWLIST,
+    DECISION_ON_DENYLIST,
+    DECISION_VERIFICATION_REQUIRED,
+    BodyTemplate,
+    build_body_template,
+)
+from apop.headers import (
+    action_mask,
+    build_allowed_headers,
+    build_denied_headers,
+    build_verification_headers,
+)
+from apop.matcher import MergedPolicy, PolicyIndex, merge_policy
+from apop.types import (
+    ALL_ACTIONS_MASK,
+    AgentPolicy,
+    EnforcementResult,
+    PathPolicy,
+    VerificationMethod,
+)
+
+
+@dataclass(slots=True, frozen=True)
+class CompiledRule:
+    """A PathPolicy (or the default rule) with its request-independent results precomputed."""
+
+    index: int
+    """Position in pathPolicies, or -1 for the default rule."""
+
+    path_rule: Optional[PathPolicy]
+    effective: MergedPolicy
+    allowed_headers: Mapping[str, str]
+    denied_headers: Mapping[str, str]
+    verification_headers: Mapping[str, str]
+    allowed_result: EnforcementResult
+    """Shared result returned for every allowed request on this rule."""
+
+    agent_allowlist: Optional[Container[str]] = None
+    agent_denylist: Optional[Container[str]] = None
+    allow_mask: Optional[int] = None
+    actions_mask: Optional[int] = None
+    disallow_mask: Optional[int] = None
+    """Action bitmasks (see apop.types.ACTION_BITS); None if a list has non-ActionType entries."""
+
+    body_templates: dict[int, BodyTemplate] = field(default_factory=dict)
+    """Error body per decision code; filled by compile_policy(), or on first use."""
+
+
+@dataclass(slots=True, frozen=True)
+class CompiledPolicy:
+    """An AgentPolicy compiled for repeated enforcement."""
+
+    policy: AgentPolicy
+    index: PolicyIndex
+    rules: tuple[CompiledRule, ...]
+    default_rule: CompiledRule
+    verification_methods: tuple[VerificationMethod, ...]
+
+    def rule_for(self, url_path: str) -> CompiledRule:
+        """Return the compiled rule that governs a URL path."""
+        i = self.index.match_index(url_path)
+        return self.rules[i] if i >= 0 else self.default_rule
+
+
+def verification_methods(policy: AgentPolicy) -> list[VerificationMethod]:
+    """Return the accepted verification methods, defaulting to ["pkix"]."""
+    if policy.verification and policy.verification.method:
+        m = policy.verification.method
+        return m if isinstance(m, list) else [m]
+    return ["pkix"]
+
+
+def compile_rule(
+    policy: AgentPolicy,
+    path_rule: Optional[PathPolicy],
+    index: int = -1,
+    *,
+    denied_headers: Optional[Mapping[str, str]] = None,
+    verification_headers: Optional[Mapping[str, str]] = None,
+    freeze: bool = True,
+) -> CompiledRule:
+    """
+    Compile a single rule of a policy.
+
+    Args:
+        policy: The policy the rule belongs to.
+        path_rule: The PathPolicy to compile, or None for the default rule.
+        index: Position of path_rule in pathPolicies (-1 for the default rule).
+        denied_headers: Shared denied headers (built if omitted).
+        verification_headers: Shared verification headers (built if omitted).
+        freeze: Copy lists into tuples and hashed agent sets so the rule can be
+            shared across threads. One-off enforcement passes False to skip
+            the O(n) copies for a single lookup.
+
+    Returns:
+        The compiled rule.
+    """
+    effective = merge_policy(policy.default_policy, path_rule)
+    if freeze:
+        effective = _freeze(effective)
+
+    if denied_headers is None:
+        denied_headers = _build_denied(policy)
+    if verification_headers is None:
+        verification_headers = _build_verification(policy)
+
+    allowed_headers = MappingProxyType(
+        build_allowed_headers(
+            policy_url=policy.policy_url,
+            version=policy.version,
+            actions=list(effective.actions) if effective.actions else None,
+            rate_limit=effective.rate_limit,
+        )
+    )
+
+    return CompiledRule(
+        index=index,
+        path_rule=path_rule,
+        effective=effective,
+        allowed_headers=allowed_headers,
+        denied_headers=denied_headers,
+        verification_headers=verification_headers,
+        allowed_result=EnforcementResult(
+            status="allowed",
+            http_status=200,
+            headers=allowed_headers,
+        ),
+        agent_allowlist=(
+            _agent_set(effective.agent_allowlist)
+            if freeze
+            else effective.agent_allowlist or None
+        ),
+        agent_denylist=(
+            _agent_set(effective.agent_denylist)
+            if freeze
+            else effective.agent_denylist or None
+        ),
+        allow_mask=(
+            action_mask(effective.allow)
+            if not isinstance(effective.allow, bool)
+            else (ALL_ACTIONS_MASK if effective.allow else 0)
+        ),
+        actions_mask=action_mask(effective.actions),
+        disallow_mask=action_mask(effective.disallow),
+    )
+
+
+def body_template(
+    policy: AgentPolicy,
+    rule: CompiledRule,
+    decision: int,
+    methods: Optional[Sequence[VerificationMethod]] = None,
+) -> BodyTemplate:
+    """Return the error body template of a rule for a decision code, building it if needed."""
+    template = rule.body_templates.get(decision)
+    if template is None:
+        if methods is None:
+            methods = verification_methods(policy)
+        template = rule.body_templates[decision] = build_body_template(
+            policy, rule.effective, decision, methods
+        )
+    return template
+
+
+def compile_policy(policy: AgentPolicy) -> CompiledPolicy:
+    """
+    Compile an AgentPolicy for fast, repeated enforcement.
+
+    Compile once after loading the policy and recompile whenever it changes;
+    later edits to the AgentPolicy are not tracked.
+
+    Args:
+        policy: The APoP policy to compile.
+
+    Returns:
+        CompiledPolicy ready to pass to enforce().
+    """
+    # Denied and verification headers only depend on the policy, so every rule shares them
+    denied = _build_denied(policy)
+    verification = _build_verification(policy)
+
+    path_policies = tuple(policy.path_policies or ())
+    rules = tuple(
+        compile_rule(
+            policy,
+            rule,
+            i,
+            denied_headers=denied,
+            verification_headers=verification,
+        )
+        for i, rule in enumerate(path_policies)
+    )
+
+    methods = tuple(verification_methods(policy))
+    for rule in rules:
+        _fill_body_templates(policy, rule, methods)
+
+    default_rule = compile_rule(
+        policy,
+        None,
+        denied_headers=denied,
+        verification_headers=verification,
+    )
+    _fill_body_templates(policy, default_rule, methods)
+
+    return CompiledPolicy(
+        policy=policy,
+        index=PolicyIndex(path_policies),
+        rules=rules,
+        default_rule=default_rule,
+        verification_methods=methods,
+    )
+
+
+def _build_denied(policy: AgentPolicy) -> Mapping[str, str]:
+    return MappingProxyType(
+        build_denied_headers(policy_url=policy.policy_url, version=policy.version)
+    )
+
+
+def _build_verification(policy: AgentPolicy) -> Mapping[str, str]:
+    return MappingProxyType(
+        build_verification_headers(
+            policy_url=policy.policy_url,
+            version=policy.version,
+            methods=verification_methods(policy),
+            verify_endpoint=(
+                policy.verification.verification_endpoint if policy.verification else None
+            ),
+        )
+    )
+
+
+def _fill_body_templates(
+    policy: AgentPolicy,
+    rule: CompiledRule,
+    methods: Sequence[VerificationMethod],
+) -> None:
+    # Only the decisions this rule can actually reach
+    decisions = []
+    if rule.effective.allow is False:
+        decisions.append(DECISION_ACCESS_DENIED)
+    if rule.effective.require_verification:
+        decisions.append(DECISION_VERIFICATION_REQUIRED)
+    if rule.agent_denylist:
+        decisions.append(DECISION_ON_DENYLIST)
+    if rule.agent_allowlist:
+        decisions.append(DECISION_NOT_ON_ALLOWLIST)
+    if rule.effective.disallow:
+        decisions.append(DECISION_INTENT_BLOCKED)
+    for decision in decisions:
+        body_template(policy, rule, decision, methods)
+
+
+def _freeze(merged: MergedPolicy) -> MergedPolicy:
+    def as_tuple(values: Optional[Sequence[str]]) -> Optional[tuple[str, ...]]:
+        return tuple(values) if values is not None else None
+
+    return MergedPolicy(
+        allow=merged.allow if isinstance(merged.allow, bool) else tuple(merged.allow),
+        disallow=as_tuple(merged.disallow),
+        actions=as_tuple(merged.actions),
+        rate_limit=merged.rate_limit,
+        require_verification=merged.require_verification,
+        agent_allowlist=as_tuple(merged.agent_allowlist),
+        agent_denylist=as_tuple(merged.agent_denylist),
+    )
+
+
+def _agent_set(ids: Optional[Sequence[str]]) -> Optional[frozenset[str]]:
+    # Empty lists are treated like absent ones, matching the enforcer's truthiness checks
+    return frozenset(ids) if ids else None
@@ -7,21 +7,48 @@ Implements the 4-method discovery chain per spec/discovery.md:
   3. HTML meta tag: <meta name="agent-policy" content="{url}">
   4. DNS TXT record: _agentpolicy.{domain} with apop=1 policy={url}
 
-Each step only runs if the previous one fails.
+Each step only runs if the previous one fails. Steps 2 and 3 share one
+streamed fetch of the root page: its body is only read when there is no
+Agent-Policy header, and only until ``</head>`` or ``max_head_bytes``.
+
+With ``DiscoveryOptions(cache=PolicyCache())`` results are cached per
+domain as discovery.md §5.1 describes; see apop.policycache.
+
+With ``DiscoveryOptions(hedged=True)`` the well-known, root-page and DNS
+lookups start together instead; the result is still chosen by the spec's
+priority order, so hedging only changes how long discovery takes.
+
+discover_many() runs the chain for many domains at once over one pooled
+client, with global and per-host concurrency caps.
 """
 
 from __future__ import annotations
 
 import asyncio
+import html
 import re
-from dataclasses import dataclass, field
-from typing import Any, Callable, Coroutine, Optional
+import time
+from dataclasses import dataclass, field, replace
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Callable,
+    Coroutine,
+    Iterable,
+    Optional,
+    Union,
+)
 
 import httpx
 
 from apop.parser import parse_policy
+from apop.policycache import CachedPolicy, PolicyCache
 from apop.types import DiscoveryResult
 
+_Found = tuple[DiscoveryResult, httpx.Headers]
+"""A discovered policy and the headers of the response that delivered it."""
+
 
 @dataclass
 class DiscoveryOptions:
@@ -39,6 +66,19 @@ class DiscoveryOptions:
     dns_resolve: Optional[Callable[[str, str], Coroutine[Any, Any, list[list[str]]]]] = None
     """Custom DNS resolver (for testing). Defaults to dnspython or asyncio resolver."""
 
+    hedged: bool = False
+    """
+    Start the well-known, root-page and DNS lookups concurrently rather than
+    one after another. Costs requests that a sequential run would have
+    skipped; saves waiting for earlier steps to fail. Default: off.
+    """
+
+    max_head_bytes: int = 512 * 1024
+    """Most bytes of the root page read while looking for the meta tag. Default: 512 KiB."""
+
+    cache: Optional[PolicyCache] = None
+    """Optional HTTP-cache-aware store of discovered policies, shared across calls."""
+
 
 async def discover_policy(
     domain: str,
@@ -55,37 +95,303 @@ async def discover_policy(
         DiscoveryResult with the discovered policy or error info.
     """
     opts = options or DiscoveryOptions()
+    cache = opts.cache
+    entry = None
+    if cache is not None:
+        entry = cache.get(domain)
+        if entry is not None:
+            now = cache.clock()
+            # Callers get copies, so what they do with a result stays out of the cache
+            if now < entry.expires:
+                cache.hits += 1
+                return replace(entry.result)
+            if now < entry.stale_until:
+                cache.stale_hits += 1
+                stale = entry
+                cache.refresh_in_background(domain, lambda: _discover(domain, opts, stale))
+                return replace(entry.result)
+        cache.misses += 1
+    return await _discover(domain, opts, entry)
+
+
+async def _discover(
+    domain: str,
+    opts: DiscoveryOptions,
+    entry: Optional[CachedPolicy],
+) -> DiscoveryResult:
     client = opts.http_client or httpx.AsyncClient(timeout=opts.timeout, follow_redirects=True)
     should_close = opts.http_client is None
+    cache = opts.cache
+
+    try:
+        # An expired entry is revalidated against the URL it came from first
+        if cache is not None and entry is not None:
+            renewed = await _revalidate(domain, entry, cache, client)
+            if renewed:
+                return renewed
+
+        saved = None
+        if opts.hedged:
+            found, saved = await _run_hedged(domain, client, opts)
+        else:
+            found = await _run_chain(domain, client, opts)
+        if found is None:
+            if cache is not None:
+                cache.invalidate(domain)
+            return DiscoveryResult(
+                policy=None,
+                error=f"No APoP policy found for domain: {domain}",
+                latency_saved=saved,
+            )
+        result, headers = found
+        if cache is not None:
+            cache.store(domain, result, headers)
+        return replace(result, latency_saved=saved)
+    finally:
+        if should_close:
+            await client.aclose()
+
+
+async def _run_chain(
+    domain: str,
+    client: httpx.AsyncClient,
+    opts: DiscoveryOptions,
+) -> Optional[_Found]:
+    # Step 1: Well-known URI
+    well_known_url = f"https://{domain}/.well-known/agent-policy.json"
+    step1 = await _try_well_known(well_known_url, client, opts.max_retries)
+    if step1:
+        return step1
+
+    # Steps 2 and 3: HTTP header, then HTML meta tag, on the root page
+    step2_3 = await _try_root_page(domain, client, opts.max_head_bytes)
+    if step2_3:
+        return step2_3
+
+    # Step 4: DNS TXT record
+    return await _try_dns_txt(domain, client, opts.dns_resolve)
+
+
+async def _run_hedged(
+    domain: str,
+    client: httpx.AsyncClient,
+    opts: DiscoveryOptions,
+) -> tuple[Optional[_Found], float]:
+    """
+    Run the lookups concurrently and take the highest-priority success.
+
+    Returns the result and the seconds saved against the sequential chain,
+    whose time is the sum of the steps it would have run: every step up to
+    and including the winner, all of which finished here.
+    """
+    start = time.perf_counter()
+    well_known_url = f"https://{domain}/.well-known/agent-policy.json"
+    steps = [
+        _timed(_try_well_known(well_known_url, client, opts.max_retries)),
+        _timed(_try_root_page(domain, client, opts.max_head_bytes)),
+        _timed(_try_dns_txt(domain, client, opts.dns_resolve)),
+    ]
+    tasks = [asyncio.ensure_future(step) for step in steps]
+    sequential = 0.0
+    try:
+        # Awaited in priority order: a later success waits for the earlier steps to fail
+        for task in tasks:
+            found, duration = await task
+            sequential += duration
+            if found:
+                return found, sequential - (time.perf_counter() - start)
+        return None, sequential - (time.perf_counter() - start)
+    finally:
+        # Lower-priority lookups still running lost: stop them
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
 
+async def _timed(step: Coroutine[Any, Any, Optional[_Found]]) -> tuple[Optional[_Found], float]:
+    start = time.perf_counter()
+    found = await step
+    return found, time.perf_counter() - start
+
+
+async def _revalidate(
+    domain: str,
+    entry: CachedPolicy,
+    cache: PolicyCache,
+    client: httpx.AsyncClient,
+) -> Optional[DiscoveryResult]:
+    """Conditionally re-fetch an expired entry's policy; None means rediscover."""
+    url = entry.result.policy_url
+    if not url:
+        return None
     try:
-        # Step 1: Well-known URI
-        well_known_url = f"https://{domain}/.well-known/agent-policy.json"
-        step1 = await _try_well_known(well_known_url, client, opts.max_retries)
-        if step1:
-            return step1
-
-        # Step 2: HTTP header on root page
-        step2 = await _try_http_header(domain, client)
-        if step2:
-            return step2
-
-        # Step 3: HTML meta tag on root page
-        step3 = await _try_meta_tag(domain, client)
-        if step3:
-            return step3
-
-        # Step 4: DNS TXT record
-        step4 = await _try_dns_txt(domain, client, opts.dns_resolve)
-        if step4:
-            return step4
-
-        # No policy found
-        return DiscoveryResult(
-            policy=None,
-            error=f"No APoP policy found for domain: {domain}",
+        response = await client.get(url, headers=entry.conditional_headers())
+    except Exception:
+        return None
+    if response.status_code == 304:
+        # Unchanged: keep the parsed policy, take the new freshness
+        return replace(cache.renew(domain, entry, response.headers).result)
+    found = _parse_response(response, url, entry.result.method or "well-known")
+    if found is None:
+        return None
+    cache.store(domain, *found)
+    return found[0]
+
+
+# ---------------------------------------------------------------------------
+# Bulk discovery
+# ---------------------------------------------------------------------------
+
+
+@dataclass
+class DiscoveryProgress:
+    """Counters updated by discover_many() as it runs."""
+
+    submitted: int = 0
+    """Domains taken from the input and started."""
+
+    completed: int = 0
+    """Domains whose discovery has finished."""
+
+    found: int = 0
+    """Completed domains with a policy."""
+
+    @property
+    def in_flight(self) -> int:
+        return self.submitted - self.completed
+
+    @property
+    def not_found(self) -> int:
+        return self.completed - self.found
+
+
+class _HostLimitedTransport(httpx.AsyncBaseTransport):
+    """Caps concurrent requests per host, from sending until the response headers arrive."""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, limit: int) -> None:
+        self._transport = transport
+        self._limit = limit
+        # host -> [semaphore, requests holding or awaiting it]; dropped when unused
+        self._hosts: dict[str, list[Any]] = {}
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        slot = self._hosts.get(host)
+        if slot is None:
+            slot = self._hosts[host] = [asyncio.Semaphore(self._limit), 0]
+        slot[1] += 1
+        try:
+            async with slot[0]:
+                return await self._transport.handle_async_request(request)
+        finally:
+            slot[1] -= 1
+            if not slot[1]:
+                del self._hosts[host]
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+async def discover_many(
+    domains: Union[Iterable[str], AsyncIterable[str]],
+    options: Optional[DiscoveryOptions] = None,
+    *,
+    concurrency: int = 64,
+    per_host_limit: int = 4,
+    progress: Optional[DiscoveryProgress] = None,
+    transport: Optional[httpx.AsyncBaseTransport] = None,
+) -> AsyncIterator[tuple[str, DiscoveryResult]]:
+    """
+    Discover policies for many domains concurrently, yielding results as they finish.
+
+    Domains are read lazily, so the input can be a generator over millions
+    of names. At most ``concurrency`` discoveries run at once, and finished
+    results waiting to be consumed count against that limit, so a slow
+    consumer slows the crawl instead of buffering results.
+
+    Args:
+        domains: Domain names, as an iterable or async iterable.
+        options: Discovery settings shared by every domain (timeout,
+            retries, DNS resolver, cache).
+        concurrency: Most discoveries in flight at once.
+        per_host_limit: Most concurrent HTTP requests to any one host, such
+            as a CDN serving policy files for many domains.
+        progress: Counters to update; pass one to watch a running crawl.
+        transport: Transport under the pooled client (for testing).
+
+    Yields:
+        (domain, DiscoveryResult) pairs in completion order.
+
+    When ``options.http_client`` is set it is used as is, without the
+    per-host cap; otherwise one pooled client is created for the whole run
+    and closed at the end.
+    """
+    if concurrency < 1 or per_host_limit < 1:
+        raise ValueError("discover_many concurrency and per_host_limit must be at least 1")
+    opts = options or DiscoveryOptions()
+    counters = progress if progress is not None else DiscoveryProgress()
+    client = opts.http_client
+    should_close = client is None
+    if client is None:
+        pool = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        client = httpx.AsyncClient(
+            transport=_HostLimitedTransport(
+                transport or httpx.AsyncHTTPTransport(limits=pool), per_host_limit
+            ),
+            timeout=opts.timeout,
+            follow_redirects=True,
         )
+    shared = replace(opts, http_client=client)
+
+    slots = asyncio.Semaphore(concurrency)
+    finished: asyncio.Queue[Optional[tuple[str, DiscoveryResult]]] = asyncio.Queue()
+    tasks: set[asyncio.Task[None]] = set()
+
+    async def run(domain: str) -> None:
+        try:
+            result = await discover_policy(domain, shared)
+        except Exception as e:
+            result = DiscoveryResult(policy=None, error=f"Discovery failed for {domain}: {e}")
+        counters.completed += 1
+        if result.policy is not None:
+            counters.found += 1
+        finished.put_nowait((domain, result))
+
+    async def feed() -> None:
+        try:
+            if isinstance(domains, AsyncIterable):
+                async for domain in domains:
+                    await start(domain)
+            else:
+                for domain in domains:
+                    await start(domain)
+            if tasks:
+                await asyncio.gather(*tasks)
+        finally:
+            finished.put_nowait(None)
+
+    async def start(domain: str) -> None:
+        await slots.acquire()
+        counters.submitted += 1
+        task = asyncio.create_task(run(domain))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+    feeder = asyncio.create_task(feed())
+    try:
+        while True:
+            item = await finished.get()
+            if item is None:
+                break
+            # The slot is freed once the result is handed over
+            slots.release()
+            yield item
+        await feeder  # Re-raise an error from the domains iterable
     finally:
+        feeder.cancel()
+        for task in list(tasks):
+            task.cancel()
+        await asyncio.gather(feeder, *tasks, return_exceptions=True)
         if should_close:
             await client.aclose()
 
@@ -99,20 +405,14 @@ async def _try_well_known(
     url: str,
     client: httpx.AsyncClient,
     max_retries: int,
-) -> Optional[DiscoveryResult]:
+) -> Optional[_Found]:
     for attempt in range(max_retries + 1):
         try:
             response = await client.get(url)
 
             if response.status_code == 200:
-                result = parse_policy(response.text)
-                if result.valid and result.policy:
-                    return DiscoveryResult(
-                        policy=result.policy,
-                        policy_url=url,
-                        method="well-known",
-                    )
-                return None  # Invalid JSON, try next method
+                # None for invalid JSON: try next method
+                return _parse_response(response, url, "well-known")
 
             if response.status_code == 404:
                 return None  # Not found, try next method
@@ -133,59 +433,184 @@ async def _try_well_known(
 
 
 # ---------------------------------------------------------------------------
-# Step 2: HTTP Response Header
+# Steps 2 and 3: Root Page (HTTP Response Header, then HTML Meta Tag)
 # ---------------------------------------------------------------------------
 
 
-async def _try_http_header(
+async def _try_root_page(
     domain: str,
     client: httpx.AsyncClient,
-) -> Optional[DiscoveryResult]:
+    max_head_bytes: int,
+) -> Optional[_Found]:
+    url = f"https://{domain}/"
     try:
-        response = await client.get(f"https://{domain}/")
-        policy_header = response.headers.get("agent-policy") or response.headers.get(
-            "Agent-Policy"
-        )
-        if not policy_header:
+        policy_header, meta_url = await _read_root_page(url, client, max_head_bytes, scan=False)
+    except (httpx.HTTPError, Exception):
+        return None
+
+    if policy_header:
+        found = await _fetch_and_parse_policy(policy_header, "http-header", client)
+        if found:
+            return found
+        # Rare: the header led nowhere, so read the page for step 3 after all
+        try:
+            _, meta_url = await _read_root_page(url, client, max_head_bytes, scan=True)
+        except (httpx.HTTPError, Exception):
             return None
 
-        return await _fetch_and_parse_policy(policy_header, "http-header", client)
-    except (httpx.HTTPError, Exception):
+    if not meta_url:
         return None
+    return await _fetch_and_parse_policy(meta_url, "meta-tag", client)
+
+
+async def _read_root_page(
+    url: str,
+    client: httpx.AsyncClient,
+    max_head_bytes: int,
+    scan: bool,
+) -> tuple[Optional[str], Optional[str]]:
+    """(Agent-Policy header, meta tag URL); the body is left unread if the header is set."""
+    async with client.stream("GET", url) as response:
+        policy_header = response.headers.get("agent-policy")
+        if policy_header and not scan:
+            return policy_header, None
+        return policy_header, await _scan_head(response, max_head_bytes)
 
 
 # ---------------------------------------------------------------------------
-# Step 3: HTML Meta Tag
+# Step 3: HTML Meta Tag Scanner
 # ---------------------------------------------------------------------------
 
+_TAG_NAME = re.compile(rb"(/?)([a-z][^\s/>]*)")
+_ATTRIBUTE = re.compile(rb"""([^\s"'>/=]+)(?:\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]+)))?""")
+_TAG_START = frozenset(b"abcdefghijklmnopqrstuvwxyz/!?")
+_TAG_END = re.compile(rb""">|=\s*(["'])""")
+_EQUALS_SPACE = frozenset(b"= \t\n\r\f")
+_RAW_TEXT = frozenset({b"script", b"style", b"title", b"textarea"})
 
-async def _try_meta_tag(
-    domain: str,
-    client: httpx.AsyncClient,
-) -> Optional[DiscoveryResult]:
-    try:
-        response = await client.get(f"https://{domain}/")
-        html = response.text
-
-        # Try name before content
-        match = re.search(
-            r'<meta\s+name=["\']agent-policy["\']\s+content=["\']([^"\']+)["\']',
-            html,
-            re.IGNORECASE,
-        )
-        if not match:
-            # Try content before name
-            match = re.search(
-                r'<meta\s+content=["\']([^"\']+)["\']\s+name=["\']agent-policy["\']',
-                html,
-                re.IGNORECASE,
-            )
-        if not match:
-            return None
 
-        return await _fetch_and_parse_policy(match.group(1), "meta-tag", client)
-    except (httpx.HTTPError, Exception):
-        return None
+class _HeadScanner:
+    """
+    Incremental tokenizer that finds the first agent-policy meta tag in <head>.
+
+    Fed the page in chunks of any size; tags split across chunks are held
+    back until complete, and only the bytes added since the last chunk are
+    searched again. Comments and the contents of script, style, title and
+    textarea are skipped, and scanning stops at </head> or <body>.
+    """
+
+    def __init__(self) -> None:
+        self.url: Optional[str] = None
+        self.done = False
+        self._data = bytearray()
+        self._lower = bytearray()
+        self._raw_end: Optional[bytes] = None  # closing tag of raw text being skipped
+        # Where to pick up the search for the end of the comment or tag that
+        # the held-back bytes start with, and the quote it was cut inside
+        self._resume = 0
+        self._quote: Optional[bytes] = None
+
+    def feed(self, chunk: bytes) -> None:
+        data, lower = self._data, self._lower
+        data += chunk
+        lower += chunk.lower()
+        pos = 0
+        while not self.done:
+            if self._raw_end is not None:
+                end = lower.find(self._raw_end, pos)
+                if end < 0:
+                    # Keep enough to match a closing tag split across chunks
+                    pos = max(pos, len(data) - len(self._raw_end) + 1)
+                    break
+                pos = end + len(self._raw_end)
+                self._raw_end = None
+                continue
+            start = lower.find(b"<", pos)
+            if start < 0:
+                pos = len(data)
+                break
+            if start + 1 == len(data):
+                pos = start
+                break
+            if lower[start + 1] not in _TAG_START:
+                pos = start + 1  # A bare "<" in text
+                continue
+            if lower.startswith(b"<!--", start):
+                end = lower.find(b"-->", start + max(4, self._resume))
+                if end < 0:
+                    self._resume = len(data) - start - 2
+                    pos = start
+                    break
+                self._resume = 0
+                pos = end + 3
+                continue
+            end = self._tag_end(lower, start)
+            if end < 0:
+                pos = start
+                break
+            self._tag(bytes(data[start + 1 : end]), bytes(lower[start + 1 : end]))
+            pos = end + 1
+        del data[:pos]
+        del lower[:pos]
+
+    def _tag_end(self, lower: bytearray, start: int) -> int:
+        """Index of the ">" closing the tag at start, skipping quoted attribute values."""
+        i = start + max(1, self._resume)
+        quote = self._quote
+        while True:
+            if quote is not None:
+                close = lower.find(quote, i)
+                if close < 0:
+                    self._resume, self._quote = len(lower) - start, quote
+                    return -1
+                i, quote = close + 1, None
+                continue
+            match = _TAG_END.search(lower, i)
+            if match is None:
+                # Back off over a trailing "=" that may yet open a quoted value
+                j = len(lower)
+                while j > i and lower[j - 1] in _EQUALS_SPACE:
+                    j -= 1
+                self._resume, self._quote = j - start, None
+                return -1
+            if match.group(1) is None:
+                self._resume, self._quote = 0, None
+                return match.start()
+            i, quote = match.end(), bytes(match.group(1))
+
+    def _tag(self, tag: bytes, lower: bytes) -> None:
+        match = _TAG_NAME.match(lower)
+        if not match:
+            return
+        closing, name = match.groups()
+        if closing:
+            self.done = name == b"head"
+        elif name == b"body":
+            self.done = True
+        elif name in _RAW_TEXT:
+            self._raw_end = b"</" + name
+        elif name == b"meta":
+            attributes: dict[bytes, bytes] = {}
+            for attribute in _ATTRIBUTE.finditer(tag, match.end()):
+                value = next((v for v in attribute.groups()[1:] if v is not None), b"")
+                attributes.setdefault(attribute.group(1).lower(), value)
+            name_attr = attributes.get(b"name", b"").strip().lower()
+            content = attributes.get(b"content", b"").strip()
+            if name_attr == b"agent-policy" and content:
+                self.url = html.unescape(content.decode("utf-8", "replace"))
+                self.done = True
+
+
+async def _scan_head(response: httpx.Response, max_bytes: int) -> Optional[str]:
+    """Stream the page until the meta tag, the end of <head>, or max_bytes."""
+    scanner = _HeadScanner()
+    remaining = max_bytes
+    async for chunk in response.aiter_bytes():
+        scanner.feed(chunk[:remaining])
+        remaining -= len(chunk)
+        if scanner.done or remaining <= 0:
+            break
+    return scanner.url
 
 
 # ---------------------------------------------------------------------------
@@ -197,7 +622,7 @@ async def _try_dns_txt(
     domain: str,
     client: httpx.AsyncClient,
     custom_resolve: Optional[Callable[..., Coroutine[Any, Any, list[list[str]]]]] = None,
-) -> Optional[DiscoveryResult]:
+) -> Optional[_Found]:
     try:
         records: list[list[str]]
 
@@ -252,19 +677,26 @@ async def _fetch_and_parse_policy(
     url: str,
     method: str,
     client: httpx.AsyncClient,
-) -> Optional[DiscoveryResult]:
+) -> Optional[_Found]:
     try:
         response = await client.get(url)
-        if response.status_code != 200:
-            return None
+        return _parse_response(response, url, method)
+    except (httpx.HTTPError, Exception):
+        return None
 
-        result = parse_policy(response.text)
-        if result.valid and result.policy:
-            return DiscoveryResult(
+
+def _parse_response(response: httpx.Response, url: str, method: str) -> Optional[_Found]:
+    """The policy in a 200 response, with the response headers, or None."""
+    if response.status_code != 200:
+        return None
+    result = parse_policy(response.text)
+    if result.valid and result.policy:
+        return (
+            DiscoveryResult(
                 policy=result.policy,
                 policy_url=url,
                 method=method,  # type: ignore[arg-type]
-            )
-        return None
-    except (httpx.HTTPError, Exception):
-        return None
+            ),
+            response.headers,
+        )
+    return None
@@ -5,164 +5,653 @@ Takes a policy + request context and returns an EnforcementResult
 with status, HTTP status code, response headers, and error body.
 
 Enforcement logic order:
-  1. Match path → merge with defaultPolicy
+  1. Match path → merge with defaultPolicy (precomputed for a CompiledPolicy)
   2. Check denylist → 430
   3. Check allowlist → 430
   4. Check allow/disallow → 430
   5. Check intent against disallow list → 430
   6. Check requireVerification → 439
-  7. Set rate limit headers → 200
+  7. Count against rateLimit (when a rate limiter is given) → 438, else 200
+     with rate limit headers
+
+aenforce() is the asyncio form for async servers: steps 1–6 are the same
+CPU-only code, and the rate-limit lookup and an optional credential check
+(a Verifier) are awaited concurrently.
 """
 
 from __future__ import annotations
 
-from typing import Any
+import asyncio
+import math
+import threading
+from array import array
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Container, Optional, Sequence, Union
 
-from apop.types import (
-    AgentPolicy,
-    EnforcementResult,
-    RequestContext,
-    VerificationMethod,
+from apop.bodies import (
+    DECISION_ACCESS_DENIED,
+    DECISION_ALLOWED,
+    DECISION_HTTP_STATUS,
+    DECISION_INTENT_BLOCKED,
+    DECISION_NOT_ON_ALLOWLIST,
+    DECISION_ON_DENYLIST,
+    DECISION_VERIFICATION_REQUIRED,
+    LazyBody,
+    blocked_intents,
+    build_error_body,
+)
+from apop.compiler import (
+    CompiledPolicy,
+    CompiledRule,
+    body_template,
+    compile_policy,
+    compile_rule,
+    verification_methods,
 )
-from apop.matcher import match_path_policy, merge_policy
 from apop.headers import (
     build_allowed_headers,
     build_denied_headers,
+    build_rate_limited_headers,
     build_verification_headers,
+    parse_intent_mask,
     parse_intents,
 )
+from apop.matcher import MergedPolicy, match_path_policy, merge_policy
+from apop.ratelimit import (
+    AsyncRateLimitBackend,
+    RateLimitBackend,
+    RateLimitDecision,
+    format_reset,
+    rate_limit_key,
+)
+from apop.types import (
+    AgentPolicy,
+    EnforcementResult,
+    RequestContext,
+    VerificationMethod,
+)
+
+DecisionKey = tuple[str, Optional[str], Optional[str], bool]
+"""(path, agent_id, agent_intent, has_signature) — the inputs a decision depends on."""
+
+Verifier = Callable[[RequestContext], Awaitable[bool]]
+"""
+Async check of a request's Agent-Signature / Agent-VC (e.g. resolving a DID
+key or a VC issuer). Returning False answers 439 as if no credential was sent.
+"""
 
 
-def enforce(policy: AgentPolicy, ctx: RequestContext) -> EnforcementResult:
+def enforce(
+    policy: Union[AgentPolicy, CompiledPolicy],
+    ctx: RequestContext,
+    rate_limiter: Optional[RateLimitBackend] = None,
+) -> EnforcementResult:
     """
     Evaluate an APoP policy against a request context and return an enforcement decision.
 
+    Passing a CompiledPolicy (see apop.compiler.compile_policy) skips path
+    scanning, policy merging and header building on every call.
+
     Args:
-        policy: The APoP policy to enforce.
+        policy: The APoP policy (or compiled policy) to enforce.
         ctx: The request context (path, agent name, intent, id, etc.).
+        rate_limiter: Optional limiter that counts allowed requests against the
+            rule's rateLimit. Without one, rate limit headers are advisory.
 
     Returns:
         EnforcementResult with status, HTTP code, headers, and optional body.
     """
+    source, rule, result = _evaluate(policy, ctx)
+    if rate_limiter is not None and result.status == "allowed":
+        return _apply_rate_limit(source, _matched_rule(source, rule, ctx), ctx, rate_limiter)
+    return result
+
+
+def _evaluate(
+    policy: Union[AgentPolicy, CompiledPolicy],
+    ctx: RequestContext,
+) -> tuple[AgentPolicy, Optional[CompiledRule], EnforcementResult]:
+    """
+    Run steps 1–6 and return the source policy, the matched rule and the decision.
+
+    The rule is None for an AgentPolicy: compiling one per request costs
+    more than the uncompiled checks, so it is only done when step 7 needs
+    it (see _matched_rule).
+    """
     # Step 1: Match path → merge with defaultPolicy
-    path_rule = match_path_policy(policy, ctx.path)
-    effective = merge_policy(policy.default_policy, path_rule)
+    if isinstance(policy, CompiledPolicy):
+        rule = policy.rule_for(ctx.path)
+        return (
+            policy.policy,
+            rule,
+            _enforce_rule(policy.policy, rule, ctx, policy.verification_methods),
+        )
+    return policy, None, _enforce_uncompiled(policy, ctx)
+
+
+def _matched_rule(
+    policy: AgentPolicy,
+    rule: Optional[CompiledRule],
+    ctx: RequestContext,
+) -> CompiledRule:
+    """The rule _evaluate() matched, compiled now if it was not already."""
+    if rule is not None:
+        return rule
+    return compile_rule(policy, match_path_policy(policy, ctx.path), freeze=False)
+
+
+# ---------------------------------------------------------------------------
+# Async enforcement
+# ---------------------------------------------------------------------------
+
+
+async def aenforce(
+    policy: Union[AgentPolicy, CompiledPolicy],
+    ctx: RequestContext,
+    rate_limiter: Optional[Union[RateLimitBackend, AsyncRateLimitBackend]] = None,
+    verifier: Optional[Verifier] = None,
+) -> EnforcementResult:
+    """
+    Evaluate an APoP policy against a request context without blocking the event loop.
+
+    Steps 1–6 run exactly as in enforce(). For an allowed request the
+    remaining lookups are awaited: the rate limiter's ``ahit`` when it has
+    one (see AsyncRateLimitBackend), and ``verifier`` when the matched rule
+    requires verification. When both apply they run concurrently, so a
+    request failing verification has still been counted against its budget.
+
+    When neither applies — a denial, no rateLimit on the rule, no limiter or
+    verifier given — nothing is awaited and the result comes straight from
+    the CPU-only path. A limiter without ``ahit`` is called synchronously;
+    that suits SharedMemoryRateLimiter and LeasedRateLimiter, which only
+    block on I/O briefly or once per lease.
 
-    denied_headers = build_denied_headers(
-        policy_url=policy.policy_url,
-        version=policy.version,
+    Args:
+        policy: The APoP policy (or compiled policy) to enforce.
+        ctx: The request context (path, agent name, intent, id, etc.).
+        rate_limiter: Optional sync or async limiter for rateLimit rules.
+        verifier: Optional async credential check for requireVerification rules.
+
+    Returns:
+        EnforcementResult with status, HTTP code, headers, and optional body.
+    """
+    source, rule, result = _evaluate(policy, ctx)
+    return await _afinish(policy, source, rule, result, ctx, rate_limiter, verifier)
+
+
+async def _afinish(
+    policy: Union[AgentPolicy, CompiledPolicy],
+    source: AgentPolicy,
+    rule: Optional[CompiledRule],
+    result: EnforcementResult,
+    ctx: RequestContext,
+    rate_limiter: Optional[Union[RateLimitBackend, AsyncRateLimitBackend]],
+    verifier: Optional[Verifier],
+) -> EnforcementResult:
+    """Await the rate-limit and verification lookups for an evaluated request."""
+    if result.status != "allowed" or (rate_limiter is None and verifier is None):
+        return result
+    rule = _matched_rule(source, rule, ctx)
+    limited = rate_limiter is not None and rule.effective.rate_limit is not None
+    verify = verifier is not None and bool(rule.effective.require_verification)
+
+    if not verify:
+        if not limited:
+            return result
+        return await _arate_limit(source, rule, ctx, rate_limiter)  # type: ignore[arg-type]
+
+    assert verifier is not None
+    if limited:
+        verified, result = await asyncio.gather(
+            verifier(ctx),
+            _arate_limit(source, rule, ctx, rate_limiter),  # type: ignore[arg-type]
+        )
+    else:
+        verified = await verifier(ctx)
+    if not verified:
+        methods = policy.verification_methods if isinstance(policy, CompiledPolicy) else None
+        return _error_result(source, rule, ctx, DECISION_VERIFICATION_REQUIRED, methods)
+    return result
+
+
+async def _arate_limit(
+    policy: AgentPolicy,
+    rule: CompiledRule,
+    ctx: RequestContext,
+    rate_limiter: Union[RateLimitBackend, AsyncRateLimitBackend],
+) -> EnforcementResult:
+    """Step 7 for aenforce(): like _apply_rate_limit, awaiting ahit when available."""
+    rate_limit = rule.effective.rate_limit
+    assert rate_limit is not None
+    key = (rate_limit_key(ctx.agent_id, ctx.agent_name), rule.index)
+    ahit = getattr(rate_limiter, "ahit", None)
+    if ahit is not None:
+        decision = await ahit(key, rate_limit)
+    else:
+        decision = rate_limiter.hit(key, rate_limit)  # type: ignore[union-attr]
+    return _rate_limit_result(policy, rule, decision)
+
+
+def _apply_rate_limit(
+    policy: AgentPolicy,
+    rule: CompiledRule,
+    ctx: RequestContext,
+    rate_limiter: RateLimitBackend,
+) -> EnforcementResult:
+    """Step 7: count an allowed request against the rule's rateLimit."""
+    rate_limit = rule.effective.rate_limit
+    if rate_limit is None:
+        return rule.allowed_result
+
+    decision = rate_limiter.hit(
+        (rate_limit_key(ctx.agent_id, ctx.agent_name), rule.index),
+        rate_limit,
+    )
+    return _rate_limit_result(policy, rule, decision)
+
+
+def _rate_limit_result(
+    policy: AgentPolicy,
+    rule: CompiledRule,
+    decision: RateLimitDecision,
+) -> EnforcementResult:
+    """Build the 200 or 438 result for a rate-limit decision on rule."""
+    rate_limit = rule.effective.rate_limit
+    assert rate_limit is not None
+    reset = format_reset(math.ceil(decision.reset_at))
+
+    if decision.allowed:
+        headers = dict(rule.allowed_headers)
+        headers["Agent-Policy-Rate-Remaining"] = str(decision.remaining)
+        headers["Agent-Policy-Rate-Reset"] = reset
+        return EnforcementResult(status="allowed", http_status=200, headers=headers)
+
+    return EnforcementResult(
+        status="rate-limited",
+        http_status=438,
+        headers=build_rate_limited_headers(
+            policy_url=policy.policy_url,
+            version=policy.version,
+            rate_limit=rate_limit,
+            retry_after=decision.retry_after,
+            rate_reset=reset,
+        ),
+        body={
+            "error": "agent_rate_limited",
+            "message": (
+                f"Rate limit exceeded. {rate_limit.requests} requests "
+                f"per {rate_limit.window} allowed."
+            ),
+            "retryAfter": decision.retry_after,
+            "limit": rate_limit.requests,
+            "window": rate_limit.window,
+            "resetAt": reset,
+        },
     )
 
+
+def _decide(
+    effective: MergedPolicy,
+    agent_denylist: Optional[Container[str]],
+    agent_allowlist: Optional[Container[str]],
+    disallow_mask: Optional[int],
+    agent_id: Optional[str],
+    agent_intent: Optional[str],
+    has_verification: bool,
+) -> int:
+    """
+    Run enforcement steps 2–6 against a matched rule and return a decision code.
+
+    A compiled rule passes its hashed agent sets and disallow mask; an
+    uncompiled one passes the merged lists and no mask.
+    """
     # Step 2: Check denylist
-    if path_rule and path_rule.agent_denylist and ctx.agent_id:
-        if ctx.agent_id in path_rule.agent_denylist:
-            return EnforcementResult(
-                status="denied",
-                http_status=430,
-                headers=denied_headers,
-                body={
-                    "error": "agent_on_denylist",
-                    "message": f"Agent '{ctx.agent_id}' is denied access to this path.",
-                    "policy": policy.policy_url,
-                    "path": ctx.path,
-                },
-            )
+    if agent_denylist and agent_id:
+        if agent_id in agent_denylist:
+            return DECISION_ON_DENYLIST
 
     # Step 3: Check allowlist
-    if path_rule and path_rule.agent_allowlist:
-        if not ctx.agent_id or ctx.agent_id not in path_rule.agent_allowlist:
-            return EnforcementResult(
-                status="denied",
-                http_status=430,
-                headers=denied_headers,
-                body={
-                    "error": "agent_not_on_allowlist",
-                    "message": "This path is restricted to specific agents.",
-                    "policy": policy.policy_url,
-                    "path": ctx.path,
-                },
-            )
+    if agent_allowlist:
+        if not agent_id or agent_id not in agent_allowlist:
+            return DECISION_NOT_ON_ALLOWLIST
 
     # Step 4: Check allow/disallow — access denied
     if effective.allow is False:
-        return EnforcementResult(
-            status="denied",
-            http_status=430,
-            headers=denied_headers,
-            body={
-                "error": "agent_action_not_allowed",
-                "message": "Access is not permitted on this path.",
-                "policy": policy.policy_url,
-                "path": ctx.path,
-            },
-        )
+        return DECISION_ACCESS_DENIED
 
     # Step 5: Intent-based enforcement
-    if ctx.agent_intent and effective.disallow:
-        intents = parse_intents(ctx.agent_intent)
-        blocked = [i for i in intents if i in effective.disallow]
-        if blocked:
-            return EnforcementResult(
-                status="denied",
-                http_status=430,
-                headers=denied_headers,
-                body={
-                    "error": "agent_action_not_allowed",
-                    "message": f"Action(s) '{', '.join(blocked)}' not permitted on this path.",
-                    "policy": policy.policy_url,
-                    "allowedActions": effective.actions or [],
-                    "path": ctx.path,
-                },
-            )
+    if agent_intent and effective.disallow:
+        if disallow_mask is not None:
+            if parse_intent_mask(agent_intent) & disallow_mask:
+                return DECISION_INTENT_BLOCKED
+        else:
+            disallow = effective.disallow
+            for intent in parse_intents(agent_intent):
+                if intent in disallow:
+                    return DECISION_INTENT_BLOCKED
 
     # Step 6: Verification required
-    if effective.require_verification:
-        has_verification = ctx.agent_signature or ctx.agent_vc
-        if not has_verification:
-            methods: list[VerificationMethod]
-            if policy.verification and policy.verification.method:
-                m = policy.verification.method
-                methods = m if isinstance(m, list) else [m]
-            else:
-                methods = ["pkix"]
-
-            return EnforcementResult(
-                status="verification-required",
-                http_status=439,
-                headers=build_verification_headers(
-                    policy_url=policy.policy_url,
-                    version=policy.version,
-                    methods=methods,
-                    verify_endpoint=(
-                        policy.verification.verification_endpoint
-                        if policy.verification
-                        else None
-                    ),
+    if effective.require_verification and not has_verification:
+        return DECISION_VERIFICATION_REQUIRED
+
+    return DECISION_ALLOWED
+
+
+def _enforce_rule(
+    policy: AgentPolicy,
+    rule: CompiledRule,
+    ctx: RequestContext,
+    methods: Optional[Sequence[VerificationMethod]] = None,
+) -> EnforcementResult:
+    """Decide against an already matched and compiled rule and build the result."""
+    decision = _decide(
+        rule.effective,
+        rule.agent_denylist,
+        rule.agent_allowlist,
+        rule.disallow_mask,
+        ctx.agent_id,
+        ctx.agent_intent,
+        bool(ctx.agent_signature or ctx.agent_vc),
+    )
+
+    # Step 7: Allowed — success headers (request-independent, so prebuilt per rule)
+    if decision == DECISION_ALLOWED:
+        return rule.allowed_result
+    return _error_result(policy, rule, ctx, decision, methods)
+
+
+def _enforce_uncompiled(policy: AgentPolicy, ctx: RequestContext) -> EnforcementResult:
+    """Steps 1–6 for a raw AgentPolicy, without compiling the matched rule."""
+    path_rule = match_path_policy(policy, ctx.path)
+    effective = merge_policy(policy.default_policy, path_rule)
+    decision = _decide(
+        effective,
+        effective.agent_denylist,
+        effective.agent_allowlist,
+        None,
+        ctx.agent_id,
+        ctx.agent_intent,
+        bool(ctx.agent_signature or ctx.agent_vc),
+    )
+
+    # Step 7: Allowed — success headers
+    if decision == DECISION_ALLOWED:
+        return EnforcementResult(
+            status="allowed",
+            http_status=200,
+            headers=build_allowed_headers(
+                policy_url=policy.policy_url,
+                version=policy.version,
+                actions=list(effective.actions) if effective.actions else None,
+                rate_limit=effective.rate_limit,
+            ),
+        )
+    return _uncompiled_error_result(policy, effective, ctx, decision)
+
+
+def _uncompiled_error_result(
+    policy: AgentPolicy,
+    effective: MergedPolicy,
+    ctx: RequestContext,
+    decision: int,
+) -> EnforcementResult:
+    """Build the 430 or 439 result for a raw AgentPolicy with a plain dict body."""
+    if decision == DECISION_VERIFICATION_REQUIRED:
+        methods = verification_methods(policy)
+        return EnforcementResult(
+            status="verification-required",
+            http_status=439,
+            headers=build_verification_headers(
+                policy_url=policy.policy_url,
+                version=policy.version,
+                methods=methods,
+                verify_endpoint=(
+                    policy.verification.verification_endpoint if policy.verification else None
                 ),
-                body={
-                    "error": "agent_verification_required",
-                    "message": "This endpoint requires verified agent identity.",
-                    "acceptedMethods": methods,
-                    "verifyEndpoint": (
-                        policy.verification.verification_endpoint
-                        if policy.verification
-                        else None
-                    ),
-                    "trustedIssuers": (
-                        policy.verification.trusted_issuers if policy.verification else None
-                    ),
-                    "policy": policy.policy_url,
-                },
-            )
+            ),
+            body=build_error_body(policy, effective, decision, methods),
+        )
 
-    # Step 7: Allowed — build success headers
+    blocked = ""
+    if decision == DECISION_INTENT_BLOCKED:
+        blocked = blocked_intents(ctx.agent_intent, effective.disallow or ())
     return EnforcementResult(
-        status="allowed",
-        http_status=200,
-        headers=build_allowed_headers(
-            policy_url=policy.policy_url,
-            version=policy.version,
-            actions=effective.actions,
-            rate_limit=effective.rate_limit,
+        status="denied",
+        http_status=430,
+        headers=build_denied_headers(policy_url=policy.policy_url, version=policy.version),
+        body=build_error_body(
+            policy, effective, decision, path=ctx.path, agent_id=ctx.agent_id or "", blocked=blocked
         ),
     )
+
+
+def _error_result(
+    policy: AgentPolicy,
+    rule: CompiledRule,
+    ctx: RequestContext,
+    decision: int,
+    methods: Optional[Sequence[VerificationMethod]] = None,
+) -> EnforcementResult:
+    """Build the 430 or 439 result for a non-allowed decision."""
+    body = LazyBody(
+        body_template(policy, rule, decision, methods),
+        ctx.path,
+        ctx.agent_id,
+        ctx.agent_intent,
+    )
+
+    if decision == DECISION_VERIFICATION_REQUIRED:
+        return EnforcementResult(
+            status="verification-required",
+            http_status=439,
+            headers=rule.verification_headers,
+            body_source=body,
+        )
+
+    return EnforcementResult(
+        status="denied",
+        http_status=430,
+        headers=rule.denied_headers,
+        body_source=body,
+    )
+
+
+# ---------------------------------------------------------------------------
+# Batch enforcement
+# ---------------------------------------------------------------------------
+
+
+@dataclass
+class BatchEnforcementResult:
+    """Column-oriented result of enforce_many()."""
+
+    http_status: array[int]
+    """HTTP status per request (array of unsigned 16-bit ints: 200, 430 or 439)."""
+
+    rule_index: array[int]
+    """Matched pathPolicies position per request, -1 for the default rule (signed 32-bit)."""
+
+
+def enforce_many(
+    policy: Union[AgentPolicy, CompiledPolicy],
+    paths: Sequence[str],
+    agent_ids: Optional[Sequence[Optional[str]]] = None,
+    intents: Optional[Sequence[Optional[str]]] = None,
+    has_signature: Optional[Sequence[bool]] = None,
+) -> BatchEnforcementResult:
+    """
+    Evaluate a policy against many requests given as parallel columns.
+
+    Intended for offline replay and log auditing. No EnforcementResult objects
+    are built; each distinct path is matched once and decisions are written
+    into compact arrays. NumPy arrays are accepted for any column; wrap the
+    outputs with ``numpy.frombuffer`` to get arrays back without copying.
+
+    Args:
+        policy: The APoP policy (or compiled policy) to enforce.
+        paths: URL path per request.
+        agent_ids: Agent-Id per request (None/empty for absent).
+        intents: Agent-Intent header value per request.
+        has_signature: Whether each request carried Agent-Signature or Agent-VC.
+
+    Returns:
+        BatchEnforcementResult with per-request HTTP status and matched rule index.
+    """
+    compiled = policy if isinstance(policy, CompiledPolicy) else compile_policy(policy)
+
+    path_col = _column(paths)
+    count = len(path_col)
+    id_col = _column(agent_ids) if agent_ids is not None else [None] * count
+    intent_col = _column(intents) if intents is not None else [None] * count
+    sig_col = _column(has_signature) if has_signature is not None else [False] * count
+    if not len(id_col) == len(intent_col) == len(sig_col) == count:
+        raise ValueError("enforce_many columns must all have the same length")
+
+    # Group identical paths so each distinct path is matched once
+    rules_by_path: dict[str, CompiledRule] = {}
+    rule_for = compiled.rule_for
+    decide = _decide
+    codes = DECISION_HTTP_STATUS
+
+    http_status = array("H", bytes(2 * count))
+    rule_index = array("i", bytes(4 * count))
+
+    for i in range(count):
+        path = path_col[i]
+        rule = rules_by_path.get(path)
+        if rule is None:
+            rule = rules_by_path[path] = rule_for(path)
+        http_status[i] = codes[
+            decide(
+                rule.effective,
+                rule.agent_denylist,
+                rule.agent_allowlist,
+                rule.disallow_mask,
+                id_col[i],
+                intent_col[i],
+                bool(sig_col[i]),
+            )
+        ]
+        rule_index[i] = rule.index
+
+    return BatchEnforcementResult(http_status=http_status, rule_index=rule_index)
+
+
+def _column(values: Sequence[Any]) -> Sequence[Any]:
+    # NumPy arrays convert to lists of Python scalars much faster than element access
+    tolist = getattr(values, "tolist", None)
+    return tolist() if callable(tolist) else values
+
+
+# ---------------------------------------------------------------------------
+# Decision cache
+# ---------------------------------------------------------------------------
+
+
+class DecisionCache:
+    """
+    Bounded LRU cache of enforcement decisions.
+
+    Decisions are keyed on everything enforce() looks at:
+    ``(path, agent_id, agent_intent, has_signature)``. The cache remembers the
+    policy object it was filled from and clears itself when called with a
+    different one, so swapping in a new (compiled) policy never serves stale
+    decisions.
+
+    Cached EnforcementResult objects are shared between requests and must be
+    treated as read-only.
+
+    Example::
+
+        cache = DecisionCache(maxsize=50_000)
+        result = cache.enforce(compiled, ctx)
+        print(cache.hits, cache.misses)
+    """
+
+    def __init__(self, maxsize: int = 10_000) -> None:
+        if maxsize <= 0:
+            raise ValueError("DecisionCache maxsize must be positive")
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._policy: Optional[Union[AgentPolicy, CompiledPolicy]] = None
+        self._entries: OrderedDict[
+            DecisionKey, tuple[AgentPolicy, Optional[CompiledRule], EnforcementResult]
+        ] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def enforce(
+        self,
+        policy: Union[AgentPolicy, CompiledPolicy],
+        ctx: RequestContext,
+        rate_limiter: Optional[RateLimitBackend] = None,
+    ) -> EnforcementResult:
+        """
+        Return the cached decision for ctx, evaluating and storing it on a miss.
+
+        Rate limiting is never cached: with a rate_limiter, every allowed
+        decision is still counted against the limiter.
+        """
+        source, rule, result = self._lookup(policy, ctx)
+        if rate_limiter is not None and result.status == "allowed":
+            return _apply_rate_limit(source, _matched_rule(source, rule, ctx), ctx, rate_limiter)
+        return result
+
+    async def aenforce(
+        self,
+        policy: Union[AgentPolicy, CompiledPolicy],
+        ctx: RequestContext,
+        rate_limiter: Optional[Union[RateLimitBackend, AsyncRateLimitBackend]] = None,
+        verifier: Optional[Verifier] = None,
+    ) -> EnforcementResult:
+        """
+        Cached form of aenforce(): steps 1–6 come from the cache, while the
+        rate-limit and verification lookups run on every request.
+        """
+        source, rule, result = self._lookup(policy, ctx)
+        return await _afinish(policy, source, rule, result, ctx, rate_limiter, verifier)
+
+    def _lookup(
+        self,
+        policy: Union[AgentPolicy, CompiledPolicy],
+        ctx: RequestContext,
+    ) -> tuple[AgentPolicy, Optional[CompiledRule], EnforcementResult]:
+        key: DecisionKey = (
+            ctx.path,
+            ctx.agent_id,
+            ctx.agent_intent,
+            bool(ctx.agent_signature or ctx.agent_vc),
+        )
+        entry: Optional[tuple[AgentPolicy, Optional[CompiledRule], EnforcementResult]] = None
+        with self._lock:
+            if policy is not self._policy:
+                self._entries.clear()
+                self._policy = policy
+            else:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+            if entry is None:
+                self.misses += 1
+
+        if entry is None:
+            entry = _evaluate(policy, ctx)
+            with self._lock:
+                if policy is self._policy:
+                    self._entries[key] = entry
+                    if len(self._entries) > self.maxsize:
+                        self._entries.popitem(last=False)
+        return entry
+
+    def clear(self) -> None:
+        """Drop all cached decisions and reset the hit/miss counters."""
+        with self._lock:
+            self._entries.clear()
+            self._policy = None
+            self.hits = 0
+            self.misses = 0
@@ -0,0 +1,249 @@
+"""
+APoP v1.0 — Anti-Enumeration
+
+IP-level protection against Agent-Id enumeration (http-extensions §8): a
+client that sends many different ``Agent-Id`` values in quick succession
+gets every request from its address answered with 438 for a while, before
+any policy details are looked up.
+
+Counting distinct IDs per IP exactly would need a set per address, which an
+attacker can grow at will. Instead EnumerationGuard keeps a count-min sketch
+whose cells are HyperLogLog registers:
+
+  - each IP hashes to one cell in each of ``depth`` rows of ``width`` cells
+  - each cell is a HyperLogLog of the Agent-Ids seen from the IPs in it
+  - an IP's distinct-ID estimate is the smallest estimate among its cells
+
+Memory is ``2 * depth * width * 2**precision`` bytes (two windows' worth,
+512 KiB by default) however many IPs and IDs arrive. Cells shared with busy
+IPs only ever inflate an estimate, so size ``width`` to roughly the number of
+distinct agent IPs seen per window. IPs found over the limit (the heavy
+hitters) are kept in a small table of blocked addresses.
+
+Usage::
+
+    from apop.enumeration import EnumerationGuard
+
+    guard = EnumerationGuard(max_ids=20, window=60, block_for=300)
+    options = MiddlewareOptions(policy=policy, enumeration_guard=guard)
+
+Middleware passes the peer address of the connection; behind a reverse
+proxy, configure the framework to take the client address from the proxy's
+forwarding header first (e.g. werkzeug ProxyFix, uvicorn --proxy-headers).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import math
+import threading
+import time
+from typing import Callable, Optional
+
+from apop.headers import build_discovery_headers
+from apop.types import AgentPolicy, EnforcementResult
+
+_INVERSE_POWERS = tuple(2.0**-rank for rank in range(66))
+
+
+def _alpha(registers: int) -> float:
+    if registers == 16:
+        return 0.673
+    if registers == 32:
+        return 0.697
+    if registers == 64:
+        return 0.709
+    return 0.7213 / (1 + 1.079 / registers)
+
+
+def hll_estimate(registers: bytes) -> float:
+    """Estimate the cardinality of one HyperLogLog from its registers."""
+    m = len(registers)
+    estimate = _alpha(m) * m * m / sum(map(_INVERSE_POWERS.__getitem__, registers))
+    if estimate <= 2.5 * m:
+        zeros = registers.count(0)
+        if zeros:
+            # Small-range correction (linear counting)
+            estimate = m * math.log(m / zeros)
+    return estimate
+
+
+class EnumerationGuard:
+    """
+    Detects IPs cycling through many Agent-Id values and blocks them.
+
+    Args:
+        max_ids: Distinct Agent-Id values an IP may use per window.
+        window: Window length in seconds. Estimates cover the current and
+            the previous window, so IDs are remembered for up to two windows.
+        block_for: Seconds an IP stays blocked once over the limit.
+        width: Cells per sketch row.
+        depth: Sketch rows (independent hashes per IP).
+        precision: log2 of HyperLogLog registers per cell (4–16). 6 gives
+            about 13% standard error.
+        max_blocked: Most blocked IPs remembered; the oldest block is
+            dropped first.
+        clock: Time source in epoch seconds.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_ids: int = 20,
+        window: float = 60.0,
+        block_for: float = 300.0,
+        width: int = 1024,
+        depth: int = 4,
+        precision: int = 6,
+        max_blocked: int = 10_000,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        if max_ids < 1:
+            raise ValueError("EnumerationGuard max_ids must be at least 1")
+        if window <= 0 or block_for <= 0:
+            raise ValueError("EnumerationGuard window and block_for must be positive")
+        if width < 1 or depth < 1 or max_blocked < 1:
+            raise ValueError("EnumerationGuard width, depth and max_blocked must be at least 1")
+        if not 4 <= precision <= 16:
+            raise ValueError("EnumerationGuard precision must be between 4 and 16")
+        self.max_ids = max_ids
+        self.window = window
+        self.block_for = block_for
+        self.width = width
+        self.depth = depth
+        self.precision = precision
+        self.max_blocked = max_blocked
+        self.clock = clock
+        self.blocks = 0
+        """Counter: times an IP was newly blocked."""
+        self._registers = 1 << precision
+        self._epoch = math.floor(clock() / window)
+        self._current = self._new_rows()
+        self._previous = self._new_rows()
+        self._blocked: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def _new_rows(self) -> list[bytearray]:
+        return [bytearray(self.width * self._registers) for _ in range(self.depth)]
+
+    @property
+    def memory(self) -> int:
+        """Bytes held by the sketches (the blocked-IP table comes on top)."""
+        return 2 * self.depth * self.width * self._registers
+
+    def __len__(self) -> int:
+        """Number of IPs currently remembered as blocked."""
+        return len(self._blocked)
+
+    def _cells(self, ip: str) -> list[int]:
+        digest = hashlib.blake2b(ip.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        width, m = self.width, self._registers
+        return [((h1 + row * h2) % width) * m for row in range(self.depth)]
+
+    def _rank(self, agent_id: str) -> tuple[int, int]:
+        digest = hashlib.blake2b(agent_id.encode("utf-8", "surrogatepass"), digest_size=8).digest()
+        h = int.from_bytes(digest, "little")
+        p = self.precision
+        rest = h >> p
+        # Position of the leftmost 1 in the remaining 64 - p bits
+        return h & (self._registers - 1), 64 - p - rest.bit_length() + 1
+
+    def _rotate(self, now: float) -> None:
+        epoch = math.floor(now / self.window)
+        if epoch == self._epoch:
+            return
+        if epoch == self._epoch + 1:
+            self._previous = self._current
+        else:
+            self._previous = self._new_rows()
+        self._current = self._new_rows()
+        self._epoch = epoch
+
+    def _estimate(self, cells: list[int]) -> float:
+        m = self._registers
+        best = math.inf
+        for row, start in enumerate(cells):
+            current = self._current[row][start : start + m]
+            previous = self._previous[row][start : start + m]
+            best = min(best, hll_estimate(bytes(map(max, current, previous))))
+        return best
+
+    def distinct_ids(self, ip: str, now: Optional[float] = None) -> float:
+        """Estimated distinct Agent-Id values seen from ip in the last one to two windows."""
+        if now is None:
+            now = self.clock()
+        with self._lock:
+            self._rotate(now)
+            return self._estimate(self._cells(ip))
+
+    def check(self, ip: Optional[str], agent_id: Optional[str], now: Optional[float] = None) -> int:
+        """
+        Record one request and return how many seconds ip is blocked for.
+
+        Returns 0 when the request may proceed. Requests without an IP pass;
+        requests without an Agent-Id are only checked against existing blocks.
+        """
+        if ip is None:
+            return 0
+        if now is None:
+            now = self.clock()
+
+        with self._lock:
+            blocked = self._blocked
+            until = blocked.get(ip)
+            if until is not None:
+                if until > now:
+                    return max(1, math.ceil(until - now))
+                del blocked[ip]
+            if agent_id is None:
+                return 0
+
+            self._rotate(now)
+            cells = self._cells(ip)
+            index, rank = self._rank(agent_id)
+            changed = False
+            for row, start in zip(self._current, cells):
+                if row[start + index] < rank:
+                    row[start + index] = rank
+                    changed = True
+            # An unchanged register set cannot have pushed the estimate up
+            if not changed or self._estimate(cells) <= self.max_ids:
+                return 0
+
+            if len(blocked) >= self.max_blocked:
+                del blocked[next(iter(blocked))]
+            blocked[ip] = now + self.block_for
+            self.blocks += 1
+            return max(1, math.ceil(self.block_for))
+
+    def enforce(
+        self,
+        policy: AgentPolicy,
+        ip: Optional[str],
+        agent_id: Optional[str],
+        now: Optional[float] = None,
+    ) -> Optional[EnforcementResult]:
+        """
+        Record one request and return a 438 result if ip is blocked, else None.
+
+        The response carries only Retry-After and the discovery headers, so
+        a blocked client learns nothing about the policy's rules.
+        """
+        retry_after = self.check(ip, agent_id, now)
+        if not retry_after:
+            return None
+        headers = build_discovery_headers(policy.policy_url, policy.version)
+        headers["Agent-Policy-Status"] = "denied"
+        headers["Retry-After"] = str(retry_after)
+        return EnforcementResult(
+            status="rate-limited",
+            http_status=438,
+            headers=headers,
+            body={
+                "error": "agent_rate_limited",
+                "message": "Too many requests from this address.",
+                "retryAfter": retry_after,
+            },
+        )
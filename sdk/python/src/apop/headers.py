@@ -15,9 +15,11 @@ Response headers (from server):
 
 from __future__ import annotations
 
-from typing import Optional
+from functools import lru_cache
+from typing import Iterable, Optional
 
 from apop.types import (
+    ACTION_BITS,
     AgentRequestHeaders,
     AgentResponseHeaders,
     RateLimit,
@@ -97,6 +99,46 @@ def parse_intents(intent_header: Optional[str]) -> list[str]:
     return [s.strip() for s in intent_header.split(",") if s.strip()]
 
 
+def action_mask(actions: Optional[Iterable[str]]) -> Optional[int]:
+    """
+    Encode a list of action types as an integer bitmask (see ACTION_BITS).
+
+    Args:
+        actions: Action type strings, or None.
+
+    Returns:
+        The OR of each action's bit, or None if any entry is not a known
+        ActionType (such a list cannot be represented exactly as a mask).
+    """
+    mask = 0
+    for action in actions or ():
+        bit = ACTION_BITS.get(action)
+        if bit is None:
+            return None
+        mask |= bit
+    return mask
+
+
+@lru_cache(maxsize=1024)
+def parse_intent_mask(intent_header: Optional[str]) -> int:
+    """
+    Parse the Agent-Intent header value into an action bitmask.
+
+    Results are cached per header string, so the common repeated values cost a
+    dict lookup. Intents that are not known ActionTypes contribute no bits.
+
+    Args:
+        intent_header: Raw Agent-Intent header value (comma-separated).
+
+    Returns:
+        Bitmask of the declared intents.
+    """
+    mask = 0
+    for intent in parse_intents(intent_header):
+        mask |= ACTION_BITS.get(intent, 0)
+    return mask
+
+
 # ---------------------------------------------------------------------------
 # Response Header Building
 # ---------------------------------------------------------------------------
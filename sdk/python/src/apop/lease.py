@@ -0,0 +1,311 @@
+"""
+APoP v1.0 — Leased Rate Limiting
+
+Spends a central rate-limit budget locally. Instead of one backend round
+trip per request, each worker takes a slice of an agent's window budget
+(a lease) from the central counter and counts requests against it in
+memory, so a hot agent costs one backend call per lease rather than one
+per request.
+
+The central counter never grants more than ``rateLimit.requests`` units per
+window, so leasing never admits more requests than the budget. The cost is
+accuracy on the other side: units sitting unused in one worker's lease are
+unavailable to the others, so an agent can be denied while up to
+``lease_size - 1`` units per other worker are still unspent.
+``lease_fraction`` trades that slack against round trips:
+
+  - lease_fraction=1/n_workers: about one call per worker per window,
+    coarse sharing
+  - lease_fraction=0.01: about 100 calls per window, near-exact sharing
+
+Leases end when the window rolls over or after ``lease_ttl`` seconds. An
+expired lease's unused units are returned to the central counter, folded
+into the worker's next backend call, so budget stranded in a worker that
+stopped seeing an agent flows back to the workers that still do.
+
+Usage::
+
+    from apop.lease import LeasedRateLimiter
+    from apop.redis import RedisRateLimiter
+
+    limiter = LeasedRateLimiter(RedisRateLimiter("redis.internal"), lease_fraction=0.05)
+    options = MiddlewareOptions(policy=policy, rate_limiter=limiter)
+"""
+
+from __future__ import annotations
+
+import math
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Hashable, Optional, Protocol, Sequence
+
+from apop.ratelimit import WINDOW_SECONDS, RateLimitDecision, RateLimitHit
+from apop.types import RateLimit
+
+LeaseRequest = tuple[Hashable, RateLimit, int]
+"""Units to take from a key's budget in the current window: (key, rate limit, units)."""
+
+LeaseReturn = tuple[Hashable, RateLimit, int, int]
+"""Unused units to give back: (key, rate limit, window index, units)."""
+
+
+@dataclass(slots=True, frozen=True)
+class LeaseGrant:
+    """Result of one lease request."""
+
+    granted: int
+    """Units granted, between 0 and the number requested."""
+
+    remaining: int
+    """Units still unleased in the window after this grant."""
+
+    window_end: float
+    """Epoch seconds at which the window (and the lease) ends."""
+
+
+class LeaseBackend(Protocol):
+    """
+    A central fixed-window counter that hands out budget in slices.
+
+    apop.redis.RedisRateLimiter implements it.
+    """
+
+    def lease_many(
+        self,
+        acquire: Sequence[LeaseRequest],
+        release: Sequence[LeaseReturn] = (),
+        now: Optional[float] = None,
+    ) -> list[LeaseGrant]:
+        """Grant leases and take back unused units, in one round trip."""
+        ...
+
+
+class _Lease:
+    __slots__ = ("rate_limit", "index", "window_end", "expires", "left", "remaining", "exhausted")
+
+    def __init__(
+        self,
+        rate_limit: RateLimit,
+        index: int,
+        window_end: float,
+        expires: float,
+        left: int,
+        remaining: int,
+    ) -> None:
+        self.rate_limit = rate_limit
+        self.index = index
+        self.window_end = window_end
+        self.expires = expires
+        self.left = left
+        self.remaining = remaining
+        # The central budget ran out; deny locally until the lease expires
+        self.exhausted = left == 0
+
+
+class LeasedRateLimiter:
+    """
+    Rate limiter that spends leased slices of a central budget locally.
+
+    Args:
+        backend: The central counter (e.g. RedisRateLimiter).
+        lease_fraction: Share of ``rateLimit.requests`` taken per lease
+            (at least one unit). Smaller is more accurate, larger makes
+            fewer backend calls.
+        lease_ttl: Seconds after which a lease ends and its unused units
+            are returned, even within the same window.
+        shards: Lock stripes for the local lease table.
+        clock: Time source in epoch seconds.
+
+    Remaining counts in decisions are estimates: the local lease plus the
+    central remainder as of the last grant.
+    """
+
+    def __init__(
+        self,
+        backend: LeaseBackend,
+        *,
+        lease_fraction: float = 0.1,
+        lease_ttl: float = 10.0,
+        shards: int = 16,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        if not 0 < lease_fraction <= 1:
+            raise ValueError("LeasedRateLimiter lease_fraction must be in (0, 1]")
+        if lease_ttl <= 0:
+            raise ValueError("LeasedRateLimiter lease_ttl must be positive")
+        self.backend = backend
+        self.lease_fraction = lease_fraction
+        self.lease_ttl = lease_ttl
+        self.clock = clock
+        self.backend_calls = 0
+        self._shards: tuple[tuple[dict[Hashable, _Lease], threading.Lock], ...] = tuple(
+            ({}, threading.Lock()) for _ in range(shards)
+        )
+        self._returns: list[LeaseReturn] = []
+        self._returns_lock = threading.Lock()
+        self._next_sweep = 0.0
+
+    def lease_size(self, rate_limit: RateLimit) -> int:
+        """Units requested per lease for a rate limit."""
+        return max(1, math.ceil(rate_limit.requests * self.lease_fraction))
+
+    def hit(
+        self,
+        key: Hashable,
+        rate_limit: RateLimit,
+        now: Optional[float] = None,
+    ) -> RateLimitDecision:
+        """Count one request against key, leasing more budget only when needed."""
+        if now is None:
+            now = self.clock()
+        window = WINDOW_SECONDS[rate_limit.window]
+        if rate_limit.requests <= 0:
+            # Nothing to lease; don't ask the backend on every request
+            return RateLimitDecision(
+                allowed=False, remaining=0, retry_after=window, reset_at=now + window
+            )
+        index = int(now // window)
+        shards = self._shards
+        leases, lock = shards[hash(key) % len(shards)]
+
+        with lock:
+            lease = leases.get(key)
+            if lease is not None and (lease.index != index or lease.expires <= now):
+                del leases[key]
+                self._retire(key, lease, now)
+                lease = None
+            if lease is None or (lease.left == 0 and not lease.exhausted):
+                lease = leases[key] = self._lease(key, rate_limit, index, now, lock)
+
+            if lease.left:
+                lease.left -= 1
+                if not lease.left and not lease.remaining:
+                    # The central budget was already used up when we leased
+                    lease.exhausted = True
+                return RateLimitDecision(
+                    allowed=True,
+                    remaining=lease.left + lease.remaining,
+                    retry_after=0,
+                    reset_at=lease.window_end,
+                )
+            return RateLimitDecision(
+                allowed=False,
+                remaining=0,
+                retry_after=max(1, math.ceil(lease.window_end - now)),
+                reset_at=lease.window_end,
+            )
+
+    def hit_many(
+        self,
+        hits: Sequence[RateLimitHit],
+        now: Optional[float] = None,
+    ) -> list[RateLimitDecision]:
+        """Count a batch of requests; decisions are returned in input order."""
+        if now is None:
+            now = self.clock()
+        return [self.hit(key, rate_limit, now) for key, rate_limit in hits]
+
+    def __len__(self) -> int:
+        """Number of leases held locally."""
+        return sum(len(leases) for leases, _ in self._shards)
+
+    def _lease(
+        self,
+        key: Hashable,
+        rate_limit: RateLimit,
+        index: int,
+        now: float,
+        held: threading.Lock,
+    ) -> _Lease:
+        if now >= self._next_sweep:
+            # Expired leases of keys nobody asks for any more ride along too
+            self._next_sweep = now + self.lease_ttl
+            self._sweep(now, held)
+
+        units = self.lease_size(rate_limit)
+        returns = self._take_returns()
+        try:
+            grant = self.backend.lease_many([(key, rate_limit, units)], returns, now)[0]
+        except BaseException:
+            with self._returns_lock:
+                self._returns[:0] = returns
+            raise
+        self.backend_calls += 1
+        if grant.granted < units:
+            # The counter was bumped by the full request; give back the excess
+            self._queue_return(key, rate_limit, index, units - grant.granted)
+        return _Lease(
+            rate_limit=rate_limit,
+            index=index,
+            window_end=grant.window_end,
+            expires=min(now + self.lease_ttl, grant.window_end),
+            left=grant.granted,
+            remaining=grant.remaining,
+        )
+
+    def _retire(self, key: Hashable, lease: _Lease, now: float) -> None:
+        # Units of a finished window lapse with its counter; within the
+        # window they go back to the central budget
+        if lease.left and lease.window_end > now:
+            self._queue_return(key, lease.rate_limit, lease.index, lease.left)
+
+    def _expire(self, leases: dict[Hashable, _Lease], now: float, everything: bool) -> None:
+        expired = [k for k, lease in leases.items() if everything or lease.expires <= now]
+        for key in expired:
+            self._retire(key, leases.pop(key), now)
+
+    def _sweep(self, now: float, held: Optional[threading.Lock] = None) -> None:
+        # Called with one shard lock held; other shards are skipped if busy
+        # rather than waited on, so two sweeping threads cannot deadlock
+        for leases, lock in self._shards:
+            if lock is held:
+                self._expire(leases, now, False)
+            elif lock.acquire(blocking=False):
+                try:
+                    self._expire(leases, now, False)
+                finally:
+                    lock.release()
+
+    def _queue_return(self, key: Hashable, rate_limit: RateLimit, index: int, units: int) -> None:
+        with self._returns_lock:
+            self._returns.append((key, rate_limit, index, units))
+
+    def _take_returns(self) -> list[LeaseReturn]:
+        with self._returns_lock:
+            returns, self._returns = self._returns, []
+        return returns
+
+    def _flush_returns(self, now: float) -> None:
+        returns = self._take_returns()
+        if returns:
+            self.backend.lease_many([], returns, now)
+            self.backend_calls += 1
+
+    def release_expired(self, now: Optional[float] = None) -> None:
+        """
+        Drop expired leases and return their unused units in one backend call.
+
+        hit() already does this every ``lease_ttl`` seconds while it is
+        leasing; call it from a timer to also cover quiet periods.
+        """
+        if now is None:
+            now = self.clock()
+        for leases, lock in self._shards:
+            with lock:
+                self._expire(leases, now, False)
+        self._flush_returns(now)
+
+    def release_all(self, now: Optional[float] = None) -> None:
+        """
+        Return every unused leased unit to the central budget.
+
+        Call on worker shutdown so a restarting worker does not strand its
+        leases until they expire.
+        """
+        if now is None:
+            now = self.clock()
+        for leases, lock in self._shards:
+            with lock:
+                self._expire(leases, now, True)
+        self._flush_returns(now)
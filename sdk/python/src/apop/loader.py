@@ -0,0 +1,309 @@
+"""
+APoP v1.0 — Policy Loader
+
+Loads agent-policy.json once and keeps it current without restarts.
+
+load_policy_file() parses, validates and compiles a policy file, and
+remembers the result twice over:
+
+  - by path and ``(mtime, size, inode)``: an unchanged file is not read again
+  - by a BLAKE2b digest of the contents: a rewritten file with the same
+    bytes (a redeploy, a ``touch``) is read but not parsed or compiled again
+
+PolicyLoader holds the current policy for one file. A background watcher
+(inotify on Linux, stat polling elsewhere) calls refresh() when the file may
+have changed; a changed, valid file is compiled off the request path and
+swapped in with a single attribute assignment, so requests see either the
+old policy or the new one, never a mix. A changed file that fails to load
+leaves the previous policy in force.
+
+Usage::
+
+    from apop.loader import PolicyLoader
+
+    loader = PolicyLoader("agent-policy.json")
+    loader.start()
+    options = MiddlewareOptions(policy=loader.policy, policy_loader=loader)
+
+The directory holding the file is watched rather than the file itself, so
+editors and deploy tools that replace the file by rename (including
+Kubernetes ConfigMap symlink swaps) are picked up.
+"""
+
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import hashlib
+import os
+import select
+import sys
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Callable, Optional
+
+from apop.compiler import CompiledPolicy, compile_policy
+from apop.parser import ValidatorEngine, parse_policy
+from apop.types import AgentPolicy
+
+FileStat = tuple[int, int, int]
+"""(mtime_ns, size, inode) of a policy file."""
+
+_MEMO_SIZE = 32
+
+# inotify(7) event mask: writes closed, renames into and metadata changes in the directory
+_IN_ATTRIB = 0x00000004
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_WATCH_MASK = _IN_ATTRIB | _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE
+
+
+@dataclass(slots=True, frozen=True)
+class LoadedPolicy:
+    """A validated, compiled policy and the file state it was read from."""
+
+    policy: AgentPolicy
+    compiled: CompiledPolicy
+    digest: bytes
+    """BLAKE2b digest of the file contents."""
+    stat: FileStat
+
+
+_memo_lock = threading.Lock()
+_by_path: dict[str, LoadedPolicy] = {}
+_by_digest: OrderedDict[bytes, LoadedPolicy] = OrderedDict()
+
+
+def _file_stat(path: str) -> FileStat:
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size, st.st_ino
+
+
+def load_policy_file(
+    file_path: str | Path, *, engine: ValidatorEngine = "fused"
+) -> LoadedPolicy:
+    """
+    Parse, validate and compile a policy file, reusing earlier work where possible.
+
+    Args:
+        file_path: Path to the agent-policy.json file.
+        engine: Validator engine used when the contents have to be parsed.
+
+    Returns:
+        The LoadedPolicy. Loads of unchanged contents return the same
+        policy and compiled objects.
+
+    Raises:
+        OSError: The file cannot be read.
+        ValueError: The file is not a valid APoP policy.
+    """
+    path = os.path.abspath(file_path)
+    # Stat before reading: a write that lands after the stat changes the
+    # stat again, so the next load cannot mistake old contents for new.
+    stat = _file_stat(path)
+    with _memo_lock:
+        loaded = _by_path.get(path)
+    if loaded is not None and loaded.stat == stat:
+        return loaded
+
+    with open(path, "rb") as f:
+        content = f.read()
+    digest = hashlib.blake2b(content, digest_size=16).digest()
+    with _memo_lock:
+        loaded = _by_digest.get(digest)
+    if loaded is None:
+        result = parse_policy(content, engine=engine)
+        if not result.valid or result.policy is None:
+            raise ValueError(f"Invalid APoP policy file '{file_path}': {result.errors}")
+        loaded = LoadedPolicy(result.policy, compile_policy(result.policy), digest, stat)
+    elif loaded.stat != stat:
+        loaded = replace(loaded, stat=stat)
+
+    with _memo_lock:
+        _by_path[path] = loaded
+        _by_digest[digest] = loaded
+        _by_digest.move_to_end(digest)
+        if len(_by_digest) > _MEMO_SIZE:
+            _by_digest.popitem(last=False)
+    return loaded
+
+
+def _inotify_watch(directory: str) -> Optional[int]:
+    """A non-blocking inotify descriptor watching directory, or None where unavailable."""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        fd = int(libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC))
+    except (OSError, AttributeError):
+        return None
+    if fd < 0:
+        return None
+    if libc.inotify_add_watch(fd, os.fsencode(directory), _WATCH_MASK) < 0:
+        os.close(fd)
+        return None
+    return fd
+
+
+class PolicyLoader:
+    """
+    The current policy from one file, reloaded when the file changes.
+
+    Args:
+        file_path: Path to the agent-policy.json file. It must hold a valid
+            policy when the loader is created.
+        interval: Seconds between checks while watching. With inotify this
+            only bounds how late a missed event is noticed.
+        engine: Validator engine used for changed files.
+        use_inotify: Set False to always poll.
+        on_error: Called with the OSError or ValueError when a changed file
+            fails to load; the previous policy stays in force.
+
+    Raises:
+        OSError, ValueError: As for load_policy_file, on the initial load.
+    """
+
+    def __init__(
+        self,
+        file_path: str | Path,
+        *,
+        interval: float = 1.0,
+        engine: ValidatorEngine = "fused",
+        use_inotify: bool = True,
+        on_error: Optional[Callable[[Exception], None]] = None,
+    ) -> None:
+        if interval <= 0:
+            raise ValueError("PolicyLoader interval must be positive")
+        self.path = os.path.abspath(file_path)
+        self.interval = interval
+        self.engine = engine
+        self.use_inotify = use_inotify
+        self.on_error = on_error
+        self.reloads = 0
+        """Counter: new policies swapped in."""
+        self.failures = 0
+        """Counter: changed files that failed to load."""
+        self.watch_mode: Optional[str] = None
+        """How the watcher runs ("inotify" or "poll"), or None when stopped."""
+        self._current = load_policy_file(self.path, engine=engine)
+        self._failed: Optional[FileStat] = None
+        self._refresh_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wake: Optional[int] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def current(self) -> LoadedPolicy:
+        """The policy in force; read it once per request for a consistent view."""
+        return self._current
+
+    @property
+    def policy(self) -> AgentPolicy:
+        return self._current.policy
+
+    @property
+    def compiled(self) -> CompiledPolicy:
+        return self._current.compiled
+
+    def snapshot(self) -> tuple[AgentPolicy, CompiledPolicy]:
+        """The current (policy, compiled) pair, taken from one LoadedPolicy."""
+        current = self._current
+        return current.policy, current.compiled
+
+    def refresh(self) -> bool:
+        """
+        Check the file now and swap in its policy if it changed.
+
+        Returns True when a new policy was swapped in. A file that is
+        unchanged, rewritten with the same contents, or fails to load
+        returns False.
+        """
+        with self._refresh_lock:
+            try:
+                stat = _file_stat(self.path)
+            except OSError as e:
+                # Mid-rename or deleted: keep serving the last good policy
+                self._fail(e)
+                return False
+            if stat == self._current.stat or stat == self._failed:
+                return False
+            try:
+                loaded = load_policy_file(self.path, engine=self.engine)
+            except (OSError, ValueError) as e:
+                self._failed = stat
+                self._fail(e)
+                return False
+            self._failed = None
+            changed = loaded.digest != self._current.digest
+            self._current = loaded
+            if changed:
+                self.reloads += 1
+            return changed
+
+    def _fail(self, error: Exception) -> None:
+        self.failures += 1
+        if self.on_error is not None:
+            self.on_error(error)
+
+    # -- watcher --
+
+    def start(self) -> None:
+        """Start watching the file in a daemon thread (no-op if already watching)."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        fd = _inotify_watch(os.path.dirname(self.path)) if self.use_inotify else None
+        fds = None
+        self.watch_mode = "poll" if fd is None else "inotify"
+        if fd is not None:
+            # select() cannot see the stop event; a pipe wakes it instead
+            wake_read, self._wake = os.pipe()
+            fds = (fd, wake_read)
+        self._thread = threading.Thread(
+            target=self._watch, args=(fds,), name="apop-policy-loader", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the watcher and wait for its thread to exit."""
+        self._stop.set()
+        if self._wake is not None:
+            os.write(self._wake, b"x")
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._wake is not None:
+            os.close(self._wake)
+            self._wake = None
+        self.watch_mode = None
+
+    def __enter__(self) -> PolicyLoader:
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.stop()
+
+    def _watch(self, fds: Optional[tuple[int, int]]) -> None:
+        try:
+            while not self._stop.is_set():
+                if fds is None:
+                    self._stop.wait(self.interval)
+                else:
+                    ready, _, _ = select.select([fds[0], fds[1]], [], [], self.interval)
+                    if fds[0] in ready:
+                        # Drain the events; refresh() decides from the file's stat
+                        try:
+                            while os.read(fds[0], 65536):
+                                pass
+                        except BlockingIOError:
+                            pass
+                if not self._stop.is_set():
+                    self.refresh()
+        finally:
+            if fds is not None:
+                os.close(fds[0])
+                os.close(fds[1])
@@ -9,24 +9,31 @@ Implements glob-style path matching per the APoP specification:
 
 from __future__ import annotations
 
+import sys
 from copy import copy
 from dataclasses import dataclass, field, fields
-from typing import Optional
+from typing import Optional, Sequence
 
 from apop.types import AgentPolicy, PathPolicy, PolicyRule, RateLimit
 
 
-@dataclass
+@dataclass(slots=True)
 class MergedPolicy:
-    """A PolicyRule merged with path-specific overrides, including allow/deny lists."""
+    """
+    A PolicyRule merged with path-specific overrides, including allow/deny lists.
+
+    merge_policy() returns the source lists as-is; compiled policies hold
+    tuples so a MergedPolicy can be shared safely across threads. Not frozen,
+    since uncompiled enforcement builds one per request; treat it as read-only.
+    """
 
-    allow: bool | list[str]
-    disallow: Optional[list[str]] = None
-    actions: Optional[list[str]] = None
+    allow: bool | Sequence[str]
+    disallow: Optional[Sequence[str]] = None
+    actions: Optional[Sequence[str]] = None
     rate_limit: Optional[RateLimit] = None
     require_verification: bool = False
-    agent_allowlist: Optional[list[str]] = None
-    agent_denylist: Optional[list[str]] = None
+    agent_allowlist: Optional[Sequence[str]] = None
+    agent_denylist: Optional[Sequence[str]] = None
 
 
 def path_matches(url_path: str, pattern: str) -> bool:
@@ -76,6 +83,116 @@ def match_path_policy(policy: AgentPolicy, url_path: str) -> Optional[PathPolicy
     return None
 
 
+# ---------------------------------------------------------------------------
+# Compiled path index
+# ---------------------------------------------------------------------------
+
+_NO_RULE = sys.maxsize
+
+
+class _TrieNode:
+    """One path segment in a PolicyIndex trie."""
+
+    __slots__ = ("children", "exact", "single", "recursive")
+
+    def __init__(self) -> None:
+        self.children: dict[str, _TrieNode] = {}
+        self.exact = _NO_RULE
+        self.single = _NO_RULE
+        self.recursive = _NO_RULE
+
+
+class PolicyIndex:
+    """
+    A segment trie over a policy's pathPolicies, built once at load time.
+
+    Each pattern is split on "/" and inserted as a chain of literal segments.
+    The node where the chain ends records the lowest rule index for that
+    pattern kind (exact, /* or /**), so a lookup walks the URL path segment by
+    segment and costs O(path depth) regardless of how many rules the policy
+    has. Results are identical to match_path_policy(): first match wins.
+
+    Example::
+
+        index = PolicyIndex.from_policy(policy)
+        rule = index.match("/api/v1/users")
+    """
+
+    __slots__ = ("rules", "_root")
+
+    def __init__(self, path_policies: Optional[Sequence[PathPolicy]] = None) -> None:
+        self.rules: tuple[PathPolicy, ...] = tuple(path_policies or ())
+        self._root = _TrieNode()
+        for i, rule in enumerate(self.rules):
+            self._insert(rule.path, i)
+
+    @classmethod
+    def from_policy(cls, policy: AgentPolicy) -> PolicyIndex:
+        """Build an index from an AgentPolicy's pathPolicies."""
+        return cls(policy.path_policies)
+
+    def _insert(self, pattern: str, index: int) -> None:
+        # Same precedence as path_matches(): "/**" is checked before "/*"
+        if pattern.endswith("/**"):
+            kind, prefix = "recursive", pattern[:-3]
+        elif pattern.endswith("/*"):
+            kind, prefix = "single", pattern[:-2]
+        else:
+            kind, prefix = "exact", pattern
+
+        node = self._root
+        for segment in prefix.split("/"):
+            child = node.children.get(segment)
+            if child is None:
+                child = node.children[segment] = _TrieNode()
+            node = child
+
+        if index < getattr(node, kind):
+            setattr(node, kind, index)
+
+    def match_index(self, url_path: str) -> int:
+        """
+        Return the position of the first matching PathPolicy, or -1 if none match.
+
+        Args:
+            url_path: The URL path to match against.
+        """
+        segments = url_path.split("/")
+        last = len(segments) - 1
+        best = _NO_RULE
+        node = self._root
+
+        for depth, segment in enumerate(segments):
+            # "prefix/**" matches any path that has prefix as leading segments
+            if node.recursive < best:
+                best = node.recursive
+            # "prefix/*" matches exactly one more segment
+            if depth == last and node.single < best:
+                best = node.single
+            child = node.children.get(segment)
+            if child is None:
+                break
+            node = child
+        else:
+            # Whole path consumed: exact patterns and "prefix/**" on prefix itself
+            best = min(best, node.exact, node.recursive)
+
+        return -1 if best == _NO_RULE else best
+
+    def match(self, url_path: str) -> Optional[PathPolicy]:
+        """
+        Find the first matching PathPolicy for a given URL path.
+
+        Args:
+            url_path: The URL path to match against.
+
+        Returns:
+            The matching PathPolicy or None if no match.
+        """
+        i = self.match_index(url_path)
+        return self.rules[i] if i >= 0 else None
+
+
 def merge_policy(
     default_policy: PolicyRule,
     path_rule: Optional[PathPolicy],
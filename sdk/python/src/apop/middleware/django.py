@@ -12,6 +12,7 @@ Usage::
     ]
 
     APOP_POLICY_FILE = BASE_DIR / "agent-policy.json"
+    APOP_POLICY_RELOAD_INTERVAL = 1.0  # optional: watch the file for edits
 
     # Or provide inline:
     APOP_POLICY = {
@@ -25,9 +26,13 @@ from __future__ import annotations
 import json
 from typing import Any, Callable
 
-from apop.enforcer import enforce
+from apop.compiler import CompiledPolicy, compile_policy
+from apop.enforcer import DecisionCache, enforce
+from apop.enumeration import EnumerationGuard
 from apop.headers import is_agent, parse_request_headers
-from apop.parser import parse_policy, parse_policy_file
+from apop.loader import PolicyLoader
+from apop.parser import parse_policy
+from apop.ratelimit import RateLimitBackend, as_sync_backend
 from apop.types import AgentPolicy, MiddlewareOptions, RequestContext
 
 
@@ -37,14 +42,25 @@ class APoPMiddleware:
 
     Configure via Django settings:
         - APOP_POLICY_FILE: Path to agent-policy.json
+        - APOP_POLICY_RELOAD_INTERVAL: Watch APOP_POLICY_FILE and swap in edits,
+          checking at least this often in seconds (default: off)
         - APOP_POLICY: Inline policy dict (alternative to file)
         - APOP_SKIP_NON_AGENTS: Whether to skip non-agent requests (default: True)
+        - APOP_DECISION_CACHE_SIZE: Enable a DecisionCache of this size (default: off)
+        - APOP_RATE_LIMITER: A RateLimitBackend that enforces rateLimit rules (default: off)
+        - APOP_ENUMERATION_GUARD: An EnumerationGuard that blocks IPs cycling
+          through Agent-Id values (default: off)
     """
 
     def __init__(self, get_response: Callable[..., Any]) -> None:
         self.get_response = get_response
         self._policy: AgentPolicy | None = None
+        self._compiled: CompiledPolicy | None = None
         self._skip_non_agents: bool = True
+        self.decision_cache: DecisionCache | None = None
+        self.rate_limiter: RateLimitBackend | None = None
+        self.enumeration_guard: EnumerationGuard | None = None
+        self.policy_loader: PolicyLoader | None = None
         self._initialized = False
 
     def _ensure_initialized(self) -> None:
@@ -57,16 +73,20 @@ class APoPMiddleware:
         policy_file = getattr(settings, "APOP_POLICY_FILE", None)
         policy_dict = getattr(settings, "APOP_POLICY", None)
         self._skip_non_agents = getattr(settings, "APOP_SKIP_NON_AGENTS", True)
+        cache_size = getattr(settings, "APOP_DECISION_CACHE_SIZE", 0)
+        if cache_size:
+            self.decision_cache = DecisionCache(maxsize=cache_size)
+        self.rate_limiter = as_sync_backend(
+            getattr(settings, "APOP_RATE_LIMITER", None), "APOP_RATE_LIMITER"
+        )
+        self.enumeration_guard = getattr(settings, "APOP_ENUMERATION_GUARD", None)
 
         if policy_file:
-            result = parse_policy_file(str(policy_file))
-            if result.valid and result.policy:
-                self._policy = result.policy
-            else:
-                raise ValueError(
-                    f"Invalid APoP policy file '{policy_file}': "
-                    f"{result.errors}"
-                )
+            reload_interval = getattr(settings, "APOP_POLICY_RELOAD_INTERVAL", None)
+            self.policy_loader = PolicyLoader(policy_file, interval=reload_interval or 1.0)
+            if reload_interval:
+                self.policy_loader.start()
+            self._policy, self._compiled = self.policy_loader.snapshot()
         elif policy_dict:
             result = parse_policy(json.dumps(policy_dict))
             if result.valid and result.policy:
@@ -78,13 +98,19 @@ class APoPMiddleware:
                 "APoP middleware requires either APOP_POLICY_FILE or APOP_POLICY in settings."
             )
 
+        if self._compiled is None:
+            self._compiled = compile_policy(self._policy)
         self._initialized = True
 
     def __call__(self, request: Any) -> Any:
-        from django.http import JsonResponse
+        from django.http import HttpResponse
 
         self._ensure_initialized()
-        assert self._policy is not None
+        if self.policy_loader is not None:
+            policy, compiled = self.policy_loader.snapshot()
+        else:
+            assert self._policy is not None and self._compiled is not None
+            policy, compiled = self._policy, self._compiled
 
         # Parse agent headers from Django request
         headers: dict[str, str] = {}
@@ -99,29 +125,43 @@ class APoPMiddleware:
         # Skip non-agent requests if configured
         if self._skip_non_agents and not is_agent(agent_headers):
             response = self.get_response(request)
-            if self._policy.policy_url:
-                response["Agent-Policy"] = self._policy.policy_url
-            response["Agent-Policy-Version"] = self._policy.version or "1.0"
+            if policy.policy_url:
+                response["Agent-Policy"] = policy.policy_url
+            response["Agent-Policy-Version"] = policy.version or "1.0"
             return response
 
-        # Enforce policy
-        result = enforce(
-            self._policy,
-            RequestContext(
-                path=request.path,
-                agent_name=agent_headers.agent_name,
-                agent_intent=agent_headers.agent_intent,
-                agent_id=agent_headers.agent_id,
-                agent_signature=agent_headers.agent_signature,
-                agent_vc=agent_headers.agent_vc,
-                agent_card=agent_headers.agent_card,
-                agent_key_id=agent_headers.agent_key_id,
-            ),
-        )
+        # Block clients cycling through Agent-Id values, then enforce policy
+        result = None
+        if self.enumeration_guard is not None:
+            result = self.enumeration_guard.enforce(
+                policy, request.META.get("REMOTE_ADDR"), agent_headers.agent_id
+            )
+        if result is None:
+            evaluate = (
+                self.decision_cache.enforce if self.decision_cache is not None else enforce
+            )
+            result = evaluate(
+                compiled,
+                RequestContext(
+                    path=request.path,
+                    agent_name=agent_headers.agent_name,
+                    agent_intent=agent_headers.agent_intent,
+                    agent_id=agent_headers.agent_id,
+                    agent_signature=agent_headers.agent_signature,
+                    agent_vc=agent_headers.agent_vc,
+                    agent_card=agent_headers.agent_card,
+                    agent_key_id=agent_headers.agent_key_id,
+                ),
+                self.rate_limiter,
+            )
 
         # If denied or verification-required, return error
         if result.status != "allowed":
-            response = JsonResponse(result.body, status=result.http_status)
+            response = HttpResponse(
+                result.body_bytes,
+                status=result.http_status,
+                content_type="application/json",
+            )
             for key, value in result.headers.items():
                 response[key] = value
             return response
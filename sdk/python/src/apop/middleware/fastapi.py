@@ -13,6 +13,9 @@ Usage::
     result = parse_policy_file("agent-policy.json")
     app.add_middleware(create_apop_middleware(result.policy))
 
+To pick up edits to the policy file without a restart, pass a started
+PolicyLoader as ``MiddlewareOptions(policy_loader=...)``.
+
 Or as a dependency::
 
     from apop.middleware.fastapi import APoPDependency
@@ -28,7 +31,8 @@ from __future__ import annotations
 
 from typing import Any, Optional
 
-from apop.enforcer import enforce
+from apop.compiler import compile_policy
+from apop.enforcer import aenforce
 from apop.headers import is_agent, parse_request_headers
 from apop.types import AgentPolicy, EnforcementResult, MiddlewareOptions
 
@@ -58,13 +62,23 @@ def create_fastapi_middleware(
     """
     from starlette.middleware.base import BaseHTTPMiddleware
     from starlette.requests import Request
-    from starlette.responses import JSONResponse, Response
+    from starlette.responses import Response
 
-    policy = options.policy
+    if options.policy_loader is not None:
+        snapshot = options.policy_loader.snapshot
+    else:
+        pinned = (options.policy, compile_policy(options.policy))
+        snapshot = lambda: pinned  # noqa: E731
     skip_non_agents = options.skip_non_agents
+    cache = options.decision_cache
+    evaluate = cache.aenforce if cache is not None else aenforce
+    rate_limiter = options.rate_limiter
+    verifier = options.verifier
+    guard = options.enumeration_guard
 
     class APoPMiddleware(BaseHTTPMiddleware):
         async def dispatch(self, request: Request, call_next: Any) -> Response:
+            policy, compiled = snapshot()
             # Set discovery headers on all responses
             agent_headers = parse_request_headers(dict(request.headers))
 
@@ -76,17 +90,25 @@ def create_fastapi_middleware(
                 response.headers["Agent-Policy-Version"] = policy.version or "1.0"
                 return response
 
-            # Enforce policy
-            result = enforce(
-                policy,
-                _request_to_context(request, agent_headers),
-            )
+            # Block clients cycling through Agent-Id values, then enforce policy
+            result = None
+            if guard is not None:
+                client_ip = request.client.host if request.client else None
+                result = guard.enforce(policy, client_ip, agent_headers.agent_id)
+            if result is None:
+                result = await evaluate(
+                    compiled,
+                    _request_to_context(request, agent_headers),
+                    rate_limiter,
+                    verifier,
+                )
 
             # If denied or verification-required, return error
             if result.status != "allowed":
-                response = JSONResponse(
-                    content=result.body,
+                response = Response(
+                    content=result.body_bytes,
                     status_code=result.http_status,
+                    media_type="application/json",
                 )
                 for key, value in result.headers.items():
                     response.headers[key] = value
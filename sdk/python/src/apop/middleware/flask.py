@@ -18,14 +18,25 @@ Usage::
 
     # Register discovery endpoint
     create_flask_discovery(app, result.policy)
+
+To pick up edits to the policy file without a restart, enforce through a
+PolicyLoader::
+
+    from apop.loader import PolicyLoader
+
+    loader = PolicyLoader("agent-policy.json")
+    loader.start()
+    create_flask_middleware(app, MiddlewareOptions(policy=loader.policy, policy_loader=loader))
 """
 
 from __future__ import annotations
 
 from typing import Any
 
+from apop.compiler import compile_policy
 from apop.enforcer import enforce
 from apop.headers import is_agent, parse_request_headers
+from apop.ratelimit import as_sync_backend
 from apop.types import AgentPolicy, MiddlewareOptions, RequestContext
 
 
@@ -37,13 +48,25 @@ def create_flask_middleware(app: Any, options: MiddlewareOptions) -> None:
         app: Flask application instance.
         options: Middleware options including the policy to enforce.
     """
-    from flask import jsonify, request
+    from flask import request
 
-    policy = options.policy
+    if options.policy_loader is not None:
+        snapshot = options.policy_loader.snapshot
+    else:
+        pinned = (options.policy, compile_policy(options.policy))
+        snapshot = lambda: pinned  # noqa: E731
     skip_non_agents = options.skip_non_agents
+    cache = options.decision_cache
+    evaluate = cache.enforce if cache is not None else enforce
+    rate_limiter = as_sync_backend(options.rate_limiter, "The Flask middleware")
+    guard = options.enumeration_guard
 
     @app.before_request
     def apop_enforce() -> Any:
+        policy, compiled = snapshot()
+        # Keep the same policy for after_request, even if it is swapped meanwhile
+        request._apop_policy = policy  # type: ignore[attr-defined]
+
         # Parse agent headers
         agent_headers = parse_request_headers(dict(request.headers))
 
@@ -51,25 +74,33 @@ def create_flask_middleware(app: Any, options: MiddlewareOptions) -> None:
         if skip_non_agents and not is_agent(agent_headers):
             return None
 
-        # Enforce policy
-        result = enforce(
-            policy,
-            RequestContext(
-                path=request.path,
-                agent_name=agent_headers.agent_name,
-                agent_intent=agent_headers.agent_intent,
-                agent_id=agent_headers.agent_id,
-                agent_signature=agent_headers.agent_signature,
-                agent_vc=agent_headers.agent_vc,
-                agent_card=agent_headers.agent_card,
-                agent_key_id=agent_headers.agent_key_id,
-            ),
-        )
+        # Block clients cycling through Agent-Id values, then enforce policy
+        result = None
+        if guard is not None:
+            result = guard.enforce(policy, request.remote_addr, agent_headers.agent_id)
+        if result is None:
+            result = evaluate(
+                compiled,
+                RequestContext(
+                    path=request.path,
+                    agent_name=agent_headers.agent_name,
+                    agent_intent=agent_headers.agent_intent,
+                    agent_id=agent_headers.agent_id,
+                    agent_signature=agent_headers.agent_signature,
+                    agent_vc=agent_headers.agent_vc,
+                    agent_card=agent_headers.agent_card,
+                    agent_key_id=agent_headers.agent_key_id,
+                ),
+                rate_limiter,
+            )
 
         # If denied or verification-required, return error
         if result.status != "allowed":
-            response = jsonify(result.body)
-            response.status_code = result.http_status
+            response = app.response_class(
+                result.body_bytes,
+                status=result.http_status,
+                mimetype="application/json",
+            )
             for key, value in result.headers.items():
                 response.headers[key] = value
             return response
@@ -80,6 +111,7 @@ def create_flask_middleware(app: Any, options: MiddlewareOptions) -> None:
 
     @app.after_request
     def apop_headers(response: Any) -> Any:
+        policy = getattr(request, "_apop_policy", None) or snapshot()[0]
         # Always set discovery headers
         if policy.policy_url:
             response.headers["Agent-Policy"] = policy.policy_url
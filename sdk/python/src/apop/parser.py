@@ -2,18 +2,30 @@
 APoP v1.0 — Policy Parser & Validator
 
 Parses and validates agent-policy.json against the APoP JSON Schema
-using jsonschema with JSON Schema draft 2020-12 support.
+(draft 2020-12). Three engines report identical errors:
+
+  - "fused" (default): one pass that checks each field against the schema
+    while building the AgentPolicy; an invalid policy is handed to the
+    generated validator for its error list
+  - "generated": the validator generated from APOP_SCHEMA (apop.codegen),
+    then a separate dict → dataclass conversion
+  - "jsonschema": jsonschema's Draft202012Validator, the reference
+
+JSON text is decoded with orjson or msgspec when one is installed
+(``pip install apop[fast]``), falling back to the standard library.
 """
 
 from __future__ import annotations
 
 import json
 from dataclasses import dataclass
+from functools import cache
 from pathlib import Path
-from typing import Any, Optional
+from typing import Any, Literal, Optional
 
 import jsonschema
 
+from apop.codegen import GeneratedValidator, compile_validator
 from apop.types import (
     AgentPolicy,
     Contact,
@@ -25,6 +37,26 @@ from apop.types import (
     Verification,
 )
 
+try:
+    import orjson
+
+    _json_loads: Any = orjson.loads
+    _JSON_ERRORS: tuple[type[Exception], ...] = (orjson.JSONDecodeError,)
+    JSON_DECODER = "orjson"
+except ImportError:  # pragma: no cover - depends on the environment
+    try:
+        import msgspec
+
+        _json_loads = msgspec.json.decode
+        _JSON_ERRORS = (msgspec.DecodeError,)
+        JSON_DECODER = "msgspec"
+    except ImportError:
+        _json_loads = json.loads
+        _JSON_ERRORS = (json.JSONDecodeError,)
+        JSON_DECODER = "json"
+"""Name of the library decoding policy JSON: "orjson", "msgspec" or "json"."""
+
+
 # ---------------------------------------------------------------------------
 # Inline APoP JSON Schema (self-contained SDK)
 # ---------------------------------------------------------------------------
@@ -258,6 +290,10 @@ APOP_SCHEMA: dict[str, Any] = {
 }
 
 
+ValidatorEngine = Literal["fused", "generated", "jsonschema"]
+"""How a policy is validated: fused with conversion, code-generated, or jsonschema (reference)."""
+
+
 # ---------------------------------------------------------------------------
 # Result Types
 # ---------------------------------------------------------------------------
@@ -370,69 +406,292 @@ def _dict_to_agent_policy(data: dict[str, Any]) -> AgentPolicy:
     )
 
 
+# ---------------------------------------------------------------------------
+# Fused validation + conversion
+# ---------------------------------------------------------------------------
+
+_DEFS = APOP_SCHEMA["$defs"]
+_VERSIONS = frozenset(APOP_SCHEMA["properties"]["version"]["enum"])
+_ACTIONS = frozenset(_DEFS["ActionType"]["enum"])
+_WINDOWS = frozenset(_DEFS["RateLimit"]["properties"]["window"]["enum"])
+_METHODS = frozenset(_DEFS["Verification"]["properties"]["method"]["oneOf"][0]["enum"])
+_POLICY_KEYS = frozenset(APOP_SCHEMA["properties"])
+_RATE_LIMIT_KEYS = frozenset(_DEFS["RateLimit"]["properties"])
+_RULE_KEYS = frozenset(_DEFS["PolicyRule"]["properties"])
+_PATH_KEYS = frozenset(_DEFS["PathPolicy"]["properties"])
+_VERIFICATION_KEYS = frozenset(_DEFS["Verification"]["properties"])
+_CONTACT_KEYS = frozenset(_DEFS["Contact"]["properties"])
+_METADATA_KEYS = frozenset(_DEFS["Metadata"]["properties"])
+_INTEROP_KEYS = frozenset(_DEFS["Interoperability"]["properties"])
+
+
+class _InvalidPolicyError(Exception):
+    """Raised by the fused builder at the first schema violation."""
+
+
+def _object(data: Any, keys: frozenset[str], *required: str) -> dict[str, Any]:
+    if not isinstance(data, dict) or not keys.issuperset(data):
+        raise _InvalidPolicyError
+    for key in required:
+        if key not in data:
+            raise _InvalidPolicyError
+    return data
+
+
+def _string(data: dict[str, Any], key: str) -> Optional[str]:
+    value = data.get(key)
+    if value is None:
+        if key in data:
+            raise _InvalidPolicyError
+        return None
+    if not isinstance(value, str):
+        raise _InvalidPolicyError
+    return value
+
+
+def _boolean(data: dict[str, Any], key: str) -> Optional[bool]:
+    value = data.get(key)
+    if value is None:
+        if key in data:
+            raise _InvalidPolicyError
+        return None
+    if not isinstance(value, bool):
+        raise _InvalidPolicyError
+    return value
+
+
+def _strings(data: dict[str, Any], key: str, allowed: Optional[frozenset[str]] = None) -> Any:
+    value = data.get(key)
+    if value is None:
+        if key in data:
+            raise _InvalidPolicyError
+        return None
+    if not isinstance(value, list):
+        raise _InvalidPolicyError
+    for item in value:
+        if not isinstance(item, str) or (allowed is not None and item not in allowed):
+            raise _InvalidPolicyError
+    return value
+
+
+def _allow(data: dict[str, Any]) -> Any:
+    value = data["allow"]
+    if isinstance(value, bool):
+        return value
+    return _strings(data, "allow", _ACTIONS)
+
+
+def _rate_limit(data: dict[str, Any]) -> Optional[RateLimit]:
+    value = data.get("rateLimit")
+    if value is None:
+        if "rateLimit" in data:
+            raise _InvalidPolicyError
+        return None
+    _object(value, _RATE_LIMIT_KEYS, "requests", "window")
+    requests, window = value["requests"], value["window"]
+    if isinstance(requests, bool) or not (
+        isinstance(requests, int) or isinstance(requests, float) and requests.is_integer()
+    ):
+        raise _InvalidPolicyError
+    if requests < 0 or not isinstance(window, str) or window not in _WINDOWS:
+        raise _InvalidPolicyError
+    return RateLimit(requests=requests, window=window)  # type: ignore[arg-type]
+
+
+def _fused_policy_rule(data: Any) -> PolicyRule:
+    _object(data, _RULE_KEYS, "allow")
+    require_verification = _boolean(data, "requireVerification")
+    return PolicyRule(
+        allow=_allow(data),
+        disallow=_strings(data, "disallow", _ACTIONS),
+        actions=_strings(data, "actions", _ACTIONS),
+        rate_limit=_rate_limit(data),
+        require_verification=False if require_verification is None else require_verification,
+    )
+
+
+def _fused_path_policy(data: Any) -> PathPolicy:
+    _object(data, _PATH_KEYS, "path")
+    path = data["path"]
+    if not isinstance(path, str):
+        raise _InvalidPolicyError
+    return PathPolicy(
+        path=path,
+        allow=_allow(data) if "allow" in data else None,
+        disallow=_strings(data, "disallow", _ACTIONS),
+        actions=_strings(data, "actions", _ACTIONS),
+        rate_limit=_rate_limit(data),
+        require_verification=_boolean(data, "requireVerification"),
+        agent_allowlist=_strings(data, "agentAllowlist"),
+        agent_denylist=_strings(data, "agentDenylist"),
+    )
+
+
+def _fused_verification(data: Any) -> Verification:
+    _object(data, _VERIFICATION_KEYS, "method")
+    method = data["method"]
+    if not (isinstance(method, str) and method in _METHODS):
+        _strings(data, "method", _METHODS)
+    return Verification(
+        method=method,
+        registry=_string(data, "registry"),
+        trusted_issuers=_strings(data, "trustedIssuers"),
+        verification_endpoint=_string(data, "verificationEndpoint"),
+    )
+
+
+def _fused_agent_policy(data: Any) -> AgentPolicy:
+    """Check data against APOP_SCHEMA while converting it, raising at the first violation."""
+    _object(data, _POLICY_KEYS, "version", "defaultPolicy")
+    version = data["version"]
+    if not isinstance(version, str) or version not in _VERSIONS:
+        raise _InvalidPolicyError
+
+    path_policies = data.get("pathPolicies")
+    if path_policies is not None:
+        if not isinstance(path_policies, list):
+            raise _InvalidPolicyError
+        path_policies = [_fused_path_policy(item) for item in path_policies]
+    elif "pathPolicies" in data:
+        raise _InvalidPolicyError
+
+    contact = metadata = interop = verification = None
+    if "verification" in data:
+        verification = _fused_verification(data["verification"])
+    if "contact" in data:
+        value = _object(data["contact"], _CONTACT_KEYS)
+        contact = Contact(
+            email=_string(value, "email"),
+            policy_url=_string(value, "policyUrl"),
+            abuse_url=_string(value, "abuseUrl"),
+        )
+    if "metadata" in data:
+        value = _object(data["metadata"], _METADATA_KEYS)
+        metadata = Metadata(
+            description=_string(value, "description"),
+            owner=_string(value, "owner"),
+            maintainer=_string(value, "maintainer"),
+            last_modified=_string(value, "lastModified"),
+            license=_string(value, "license"),
+        )
+    if "interop" in data:
+        value = _object(data["interop"], _INTEROP_KEYS)
+        interop = Interoperability(
+            a2a_agent_card=_string(value, "a2aAgentCard"),
+            mcp_server_url=_string(value, "mcpServerUrl"),
+            webmcp_enabled=_boolean(value, "webmcpEnabled"),
+            ucp_capabilities=_string(value, "ucpCapabilities"),
+            apaai_endpoint=_string(value, "apaaiEndpoint"),
+        )
+
+    return AgentPolicy(
+        version=version,
+        default_policy=_fused_policy_rule(data["defaultPolicy"]),
+        schema_url=_string(data, "$schema"),
+        policy_url=_string(data, "policyUrl"),
+        path_policies=path_policies,
+        verification=verification,
+        contact=contact,
+        metadata=metadata,
+        interop=interop,
+    )
+
+
 # ---------------------------------------------------------------------------
 # Public API
 # ---------------------------------------------------------------------------
 
 
-def parse_policy(json_str: str) -> ParseResult:
+@cache
+def get_validator() -> jsonschema.Draft202012Validator:
+    """
+    Return the shared validator for APOP_SCHEMA, built on first use.
+
+    Building a validator resolves the schema's $refs and is far more
+    expensive than validating one policy, so it is done once per process.
+    iter_errors() keeps no state between calls, so the one instance is safe
+    to share between threads.
+    """
+    return jsonschema.Draft202012Validator(APOP_SCHEMA)
+
+
+@cache
+def get_generated_validator() -> GeneratedValidator:
+    """Return the validator generated from APOP_SCHEMA, built on first use."""
+    return compile_validator(APOP_SCHEMA)
+
+
+def parse_policy(json_str: str | bytes, *, engine: ValidatorEngine = "fused") -> ParseResult:
     """
     Parse a JSON string into an AgentPolicy and validate it against the APoP schema.
 
     Args:
-        json_str: Raw JSON string of the agent-policy.json file.
+        json_str: Raw JSON text (str, or UTF-8 bytes) of the agent-policy.json file.
+        engine: "fused" (default), "generated", or "jsonschema" for the reference validator.
 
     Returns:
         ParseResult with validity status, parsed policy, or errors.
     """
     try:
-        data = json.loads(json_str)
-    except json.JSONDecodeError as e:
+        data = _json_loads(json_str)
+    except _JSON_ERRORS as e:
         return ParseResult(
             valid=False,
             errors=[ValidationError(path="", message=f"Invalid JSON: {e}")],
         )
-    return validate_policy(data)
+    return validate_policy(data, engine=engine)
 
 
-def validate_policy(data: Any) -> ParseResult:
+def validate_policy(data: Any, *, engine: ValidatorEngine = "fused") -> ParseResult:
     """
     Validate a parsed object against the APoP schema.
 
     Args:
         data: Parsed policy object (dict) to validate.
+        engine: "fused" (default), "generated", or "jsonschema" for the reference validator.
 
     Returns:
         ParseResult with validity status, parsed policy, or errors.
     """
-    validator = jsonschema.Draft202012Validator(APOP_SCHEMA)
-    errors_list = list(validator.iter_errors(data))
+    if engine == "fused":
+        try:
+            return ParseResult(valid=True, policy=_fused_agent_policy(data))
+        except _InvalidPolicyError:
+            # Invalid policies are rare; let the generated validator list the errors
+            errors_list = get_generated_validator()(data)
+    elif engine == "generated":
+        errors_list = get_generated_validator()(data)
+    elif engine == "jsonschema":
+        errors_list = [(e.absolute_path, e.message) for e in get_validator().iter_errors(data)]
+    else:
+        raise ValueError(f"Unknown validator engine: {engine!r}")
 
     if errors_list:
         validation_errors = [
             ValidationError(
-                path="/".join(str(p) for p in e.absolute_path) or "/",
-                message=e.message,
+                path="/".join(str(p) for p in path) or "/",
+                message=message,
             )
-            for e in errors_list
+            for path, message in errors_list
         ]
         return ParseResult(valid=False, errors=validation_errors)
 
     return ParseResult(valid=True, policy=_dict_to_agent_policy(data))
 
 
-def parse_policy_file(file_path: str | Path) -> ParseResult:
+def parse_policy_file(file_path: str | Path, *, engine: ValidatorEngine = "fused") -> ParseResult:
     """
     Load and validate an AgentPolicy from a file path.
 
     Args:
         file_path: Path to agent-policy.json.
+        engine: "fused" (default), "generated", or "jsonschema" for the reference validator.
 
     Returns:
         ParseResult with validity status, parsed policy, or errors.
     """
     content = Path(file_path).read_text(encoding="utf-8")
-    return parse_policy(content)
+    return parse_policy(content, engine=engine)
 
 
 def get_schema() -> dict[str, Any]:
@@ -0,0 +1,253 @@
+"""
+APoP v1.0 — Discovery Cache
+
+HTTP caching for discovered policies (discovery.md §5.1). PolicyCache keeps,
+per domain, the parsed DiscoveryResult together with the caching headers of
+the response that delivered the policy document:
+
+  - freshness from ``Cache-Control: max-age`` (less any ``Age``), else
+    ``Expires``, else a default TTL of one hour; ``no-cache`` entries are
+    revalidated on every use and ``no-store`` responses are not cached
+  - ``ETag`` and ``Last-Modified`` validators, sent back as ``If-None-Match``
+    and ``If-Modified-Since`` when an entry expires, so an unchanged policy
+    costs one 304 and is not parsed again
+  - ``stale-while-revalidate``: an entry within that window past expiry is
+    returned immediately while one background task per domain refreshes it
+
+Usage::
+
+    from apop.discovery import DiscoveryOptions, discover_policy
+    from apop.policycache import PolicyCache
+
+    options = DiscoveryOptions(cache=PolicyCache())
+    result = await discover_policy("example.com", options)
+
+A PolicyCache belongs to one event loop; it is not thread-safe.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import email.utils
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from typing import Any, Awaitable, Callable, Mapping, Optional
+
+from apop.types import DiscoveryResult
+
+DEFAULT_TTL = 3600.0
+"""Seconds a policy stays fresh when its response carries no caching headers."""
+
+
+@dataclass(slots=True, frozen=True)
+class CachedPolicy:
+    """A discovered policy and the HTTP caching state of its response."""
+
+    result: DiscoveryResult
+    expires: float
+    """Epoch seconds until which the entry is fresh."""
+    stale_until: float
+    """Epoch seconds until which the entry may be served while revalidating."""
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+    def conditional_headers(self) -> dict[str, str]:
+        """Request headers that revalidate this entry."""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+def _directives(cache_control: str) -> dict[str, Optional[str]]:
+    directives: dict[str, Optional[str]] = {}
+    for part in cache_control.split(","):
+        name, _, value = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = value.strip().strip('"') if value else None
+    return directives
+
+
+def _seconds(value: Optional[str]) -> Optional[float]:
+    try:
+        return max(0.0, float(int(value))) if value is not None else None
+    except ValueError:
+        return None
+
+
+def _http_date(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return email.utils.parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+def freshness(
+    headers: Mapping[str, str], now: float, default_ttl: float = DEFAULT_TTL
+) -> Optional[tuple[float, float]]:
+    """
+    Compute (expires, stale_until) for a response, or None if it must not be stored.
+
+    Args:
+        headers: Response headers (case-insensitive mapping, e.g. httpx.Headers).
+        now: Epoch seconds at which the response was received.
+        default_ttl: Lifetime when neither Cache-Control nor Expires applies.
+    """
+    directives = _directives(headers.get("cache-control", ""))
+    if "no-store" in directives:
+        return None
+
+    # s-maxage is for shared caches; this one is private to its agent
+    max_age = _seconds(directives.get("max-age"))
+    if "no-cache" in directives:
+        ttl = 0.0
+    elif max_age is not None:
+        ttl = max(0.0, max_age - (_seconds(headers.get("age")) or 0.0))
+    else:
+        expires = _http_date(headers.get("expires"))
+        if expires is not None:
+            date = _http_date(headers.get("date"))
+            ttl = max(0.0, expires - (date if date is not None else now))
+        elif "expires" in headers:
+            ttl = 0.0  # An invalid Expires means already expired
+        else:
+            ttl = default_ttl
+
+    stale = _seconds(directives.get("stale-while-revalidate")) or 0.0
+    return now + ttl, now + ttl + stale
+
+
+class PolicyCache:
+    """
+    Per-domain cache of discovered policies, honoring HTTP caching headers.
+
+    Args:
+        default_ttl: Lifetime of policies served without caching headers.
+        max_entries: Most domains remembered; the least recently used is
+            dropped first.
+        clock: Time source in epoch seconds.
+    """
+
+    def __init__(
+        self,
+        *,
+        default_ttl: float = DEFAULT_TTL,
+        max_entries: int = 10_000,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        if default_ttl < 0:
+            raise ValueError("PolicyCache default_ttl must not be negative")
+        if max_entries <= 0:
+            raise ValueError("PolicyCache max_entries must be positive")
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+        self.clock = clock
+        self.hits = 0
+        """Counter: fresh entries served."""
+        self.stale_hits = 0
+        """Counter: stale entries served while a background refresh ran."""
+        self.misses = 0
+        """Counter: lookups that had to go to the network."""
+        self.revalidated = 0
+        """Counter: expired entries renewed by a 304 Not Modified."""
+        self._entries: OrderedDict[str, CachedPolicy] = OrderedDict()
+        self._refreshing: dict[str, asyncio.Future[Any]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, domain: str) -> Optional[CachedPolicy]:
+        """The entry for domain, fresh or not, or None."""
+        entry = self._entries.get(domain.lower())
+        if entry is not None:
+            self._entries.move_to_end(domain.lower())
+        return entry
+
+    def store(
+        self, domain: str, result: DiscoveryResult, headers: Mapping[str, str]
+    ) -> Optional[CachedPolicy]:
+        """
+        Cache result as delivered with headers.
+
+        Returns the new entry, or None when the response forbids storing it
+        (any previous entry for the domain is dropped).
+        """
+        window = freshness(headers, self.clock(), self.default_ttl)
+        if window is None:
+            self.invalidate(domain)
+            return None
+        entry = CachedPolicy(
+            result=result,
+            expires=window[0],
+            stale_until=window[1],
+            etag=headers.get("etag"),
+            last_modified=headers.get("last-modified"),
+        )
+        self._put(domain, entry)
+        return entry
+
+    def renew(self, domain: str, entry: CachedPolicy, headers: Mapping[str, str]) -> CachedPolicy:
+        """Extend entry after a 304 Not Modified carrying headers."""
+        window = freshness(headers, self.clock(), self.default_ttl)
+        if window is None:
+            window = (self.clock(), self.clock())
+        renewed = replace(
+            entry,
+            expires=window[0],
+            stale_until=window[1],
+            etag=headers.get("etag") or entry.etag,
+            last_modified=headers.get("last-modified") or entry.last_modified,
+        )
+        self._put(domain, renewed)
+        self.revalidated += 1
+        return renewed
+
+    def invalidate(self, domain: str) -> None:
+        """Forget domain's entry."""
+        self._entries.pop(domain.lower(), None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def _put(self, domain: str, entry: CachedPolicy) -> None:
+        key = domain.lower()
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    # -- background revalidation --
+
+    def refresh_in_background(self, domain: str, refresh: Callable[[], Awaitable[Any]]) -> None:
+        """Run refresh() as a task unless one is already running for domain."""
+        key = domain.lower()
+        if key in self._refreshing:
+            return
+        task = asyncio.ensure_future(refresh())
+        self._refreshing[key] = task
+
+        def done(task: asyncio.Future[Any]) -> None:
+            self._refreshing.pop(key, None)
+            if not task.cancelled():
+                task.exception()  # Failures keep the stale entry; don't log them as unhandled
+
+        task.add_done_callback(done)
+
+    @property
+    def refreshing(self) -> int:
+        """Background refreshes in flight."""
+        return len(self._refreshing)
+
+    async def drain(self) -> None:
+        """Wait for the background refreshes in flight to finish."""
+        while self._refreshing:
+            await asyncio.gather(*self._refreshing.values(), return_exceptions=True)
+            # Done callbacks run on a later loop iteration; don't wait for them
+            for key, task in list(self._refreshing.items()):
+                if task.done():
+                    del self._refreshing[key]
@@ -0,0 +1,380 @@
+"""
+APoP v1.0 — Rate Limiting
+
+In-process enforcement of ``rateLimit`` rules using the Generic Cell Rate
+Algorithm (GCRA), the continuous form of a token bucket. Each key keeps a
+single float — its theoretical arrival time (TAT) — so a check is O(1) and
+state per agent is fixed-size.
+
+For a limit of ``n`` requests per window ``W``:
+  - requests are spaced by the emission interval ``T = W / n``
+  - up to ``n`` requests may arrive back to back (burst tolerance ``W - T``)
+  - the budget refills continuously rather than at window boundaries
+
+RateLimiter keeps state per process; apop.sharedmem shares state between
+the workers of one host and apop.redis across hosts (see RateLimitBackend).
+
+Usage::
+
+    from apop.ratelimit import RateLimiter
+
+    limiter = RateLimiter()
+    result = enforce(compiled, ctx, rate_limiter=limiter)
+"""
+
+from __future__ import annotations
+
+import hashlib
+import math
+import threading
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Callable, Hashable, Optional, Protocol, Sequence, cast
+
+from apop.types import RateLimit
+from apop.wheel import TimingWheel
+
+WINDOW_SECONDS: dict[str, int] = {
+    "minute": 60,
+    "hour": 3600,
+    "day": 86400,
+}
+
+
+@dataclass(slots=True, frozen=True)
+class RateLimitDecision:
+    """Outcome of one rate-limit check."""
+
+    allowed: bool
+    remaining: int
+    """Requests still available right now (after this one, if allowed)."""
+
+    retry_after: int
+    """Whole seconds until the next request would be allowed (0 if allowed)."""
+
+    reset_at: float
+    """Epoch seconds at which the full budget is available again."""
+
+
+def gcra(
+    tat: float,
+    now: float,
+    rate_limit: RateLimit,
+) -> tuple[float, RateLimitDecision]:
+    """
+    Apply one GCRA step.
+
+    Args:
+        tat: The key's stored theoretical arrival time (0 for a new key).
+        now: Current time in epoch seconds.
+        rate_limit: The rule's rate limit.
+
+    Returns:
+        (new_tat, decision). new_tat equals tat when the request is denied.
+        A limit of zero requests denies every request.
+    """
+    window = WINDOW_SECONDS[rate_limit.window]
+    if rate_limit.requests <= 0:
+        return tat, RateLimitDecision(
+            allowed=False,
+            remaining=0,
+            retry_after=window,
+            reset_at=now + window,
+        )
+    interval = window / rate_limit.requests
+    tat = max(tat, now)
+    new_tat = tat + interval
+
+    # Half an interval of slack absorbs float drift from summing intervals
+    # onto epoch timestamps without ever admitting an extra request
+    slack = interval / 2
+    if new_tat - now > window + slack:
+        wait = new_tat - window - now
+        return tat, RateLimitDecision(
+            allowed=False,
+            remaining=0,
+            retry_after=max(1, math.ceil(wait)),
+            reset_at=tat,
+        )
+
+    remaining = max(0, int((window - (new_tat - now) + slack) / interval))
+    return new_tat, RateLimitDecision(
+        allowed=True,
+        remaining=remaining,
+        retry_after=0,
+        reset_at=new_tat,
+    )
+
+
+RateLimitHit = tuple[Hashable, RateLimit]
+"""One request to count: (key, rate limit)."""
+
+
+class RateLimitBackend(Protocol):
+    """
+    Storage for rate-limit state.
+
+    enforce() calls ``hit`` once per allowed request; ``hit_many`` counts a
+    batch in one round trip for backends that talk to a remote store.
+    Implementations in the SDK:
+
+      - RateLimiter: in this process (also the reference implementation)
+      - apop.sharedmem.SharedMemoryRateLimiter: shared by the workers of a host
+      - apop.redis.RedisRateLimiter: shared through a Redis-protocol server
+    """
+
+    def hit(
+        self,
+        key: Hashable,
+        rate_limit: RateLimit,
+        now: Optional[float] = None,
+    ) -> RateLimitDecision:
+        """Count one request against key and report whether it is within the limit."""
+        ...
+
+    def hit_many(
+        self,
+        hits: Sequence[RateLimitHit],
+        now: Optional[float] = None,
+    ) -> list[RateLimitDecision]:
+        """Count a batch of requests; decisions are returned in input order."""
+        ...
+
+
+class AsyncRateLimitBackend(Protocol):
+    """
+    Awaitable counterpart of RateLimitBackend, for use from asyncio servers.
+
+    apop.redis.AsyncRedisRateLimiter implements it; RateLimiter implements
+    both protocols, since an in-memory hit never blocks.
+    """
+
+    async def ahit(
+        self,
+        key: Hashable,
+        rate_limit: RateLimit,
+        now: Optional[float] = None,
+    ) -> RateLimitDecision:
+        """Count one request against key without blocking the event loop."""
+        ...
+
+    async def ahit_many(
+        self,
+        hits: Sequence[RateLimitHit],
+        now: Optional[float] = None,
+    ) -> list[RateLimitDecision]:
+        """Count a batch of requests without blocking the event loop."""
+        ...
+
+
+def as_sync_backend(limiter: Any, where: str) -> Optional[RateLimitBackend]:
+    """
+    Check that limiter can be used from synchronous code.
+
+    Args:
+        limiter: A rate limiter taken from middleware options, or None.
+        where: What is asking, for the error message.
+
+    Raises:
+        TypeError: limiter has no hit() method (an async-only backend such
+            as AsyncRedisRateLimiter).
+    """
+    if limiter is None or callable(getattr(limiter, "hit", None)):
+        return cast(Optional[RateLimitBackend], limiter)
+    raise TypeError(
+        f"{where} needs a RateLimitBackend with a hit() method; "
+        f"{type(limiter).__name__} is async-only and works with the FastAPI middleware"
+    )
+
+
+class _Shard:
+    """One lock stripe of a RateLimiter: TATs by key digest, in LRU order."""
+
+    __slots__ = ("tats", "lock", "wheel", "evictions", "expirations")
+
+    def __init__(self, now: float) -> None:
+        self.tats: dict[int, float] = {}
+        self.lock = threading.Lock()
+        self.wheel: TimingWheel[int] = TimingWheel(now)
+        self.evictions = 0
+        self.expirations = 0
+
+
+class RateLimiter:
+    """
+    In-memory GCRA rate limiter.
+
+    Keys are arbitrary hashables; the enforcer uses ``(agent, rule_index)``
+    so each agent gets its own budget per matched rule.
+
+    State is split across ``shards`` stripes, each a dict with its own lock,
+    and a key always maps to the same stripe. Threads working on different
+    agents rarely wait on each other, which matters under multi-threaded
+    WSGI workers (gunicorn ``--threads``, uwsgi) where one global lock would
+    serialize every request.
+
+    Agent-Id is client-supplied, so an agent rotating IDs must not be able
+    to grow the table without bound:
+
+      - keys are stored as 64-bit digests (see key_digest), so entry size
+        does not depend on the key
+      - a key is dropped once its budget has fully refilled, found by a
+        timing wheel (see apop.wheel) rather than by sweeping the table
+      - at most ``max_keys`` keys are held; past that the least recently
+        used key of the stripe is evicted (and starts over with a full budget)
+
+    Example::
+
+        limiter = RateLimiter()
+        decision = limiter.hit(("did:web:bot.example", 0), RateLimit(100, "hour"))
+        if not decision.allowed:
+            ...  # 438, Retry-After: decision.retry_after
+    """
+
+    def __init__(
+        self,
+        clock: Callable[[], float] = time.time,
+        *,
+        shards: int = 16,
+        max_keys: Optional[int] = 100_000,
+    ) -> None:
+        if shards < 1:
+            raise ValueError("RateLimiter shards must be at least 1")
+        if max_keys is not None and max_keys < shards:
+            raise ValueError("RateLimiter max_keys must be at least the number of shards")
+        self.clock = clock
+        self.max_keys = max_keys
+        self._shard_cap = -(-max_keys // shards) if max_keys is not None else None
+        now = clock()
+        self._shards = tuple(_Shard(now) for _ in range(shards))
+
+    @property
+    def shards(self) -> int:
+        """Number of lock stripes."""
+        return len(self._shards)
+
+    def __len__(self) -> int:
+        return sum(len(shard.tats) for shard in self._shards)
+
+    @property
+    def live_keys(self) -> int:
+        """Gauge: keys currently holding state."""
+        return len(self)
+
+    @property
+    def evictions(self) -> int:
+        """Counter: keys dropped because the table was full."""
+        return sum(shard.evictions for shard in self._shards)
+
+    @property
+    def expirations(self) -> int:
+        """Counter: keys dropped because their budget had fully refilled."""
+        return sum(shard.expirations for shard in self._shards)
+
+    def hit(
+        self,
+        key: Hashable,
+        rate_limit: RateLimit,
+        now: Optional[float] = None,
+    ) -> RateLimitDecision:
+        """Count one request against key and report whether it is within the limit."""
+        if now is None:
+            now = self.clock()
+        digest = key_digest(key)
+        shards = self._shards
+        shard = shards[digest % len(shards)]
+        with shard.lock:
+            tats = shard.tats
+            if now >= shard.wheel.tick + 1:
+                self._expire(shard, now)
+            # Re-inserting on every hit keeps the dict in least-recently-used order
+            tat = tats.pop(digest, None)
+            new_tat, decision = gcra(tat or 0.0, now, rate_limit)
+            if not decision.allowed:
+                if tat is None:
+                    return decision  # Nothing to remember (a zero-request limit)
+                new_tat = tat
+            elif tat is None:
+                if self._shard_cap is not None and len(tats) >= self._shard_cap:
+                    victim = next(iter(tats))
+                    del tats[victim]
+                    shard.wheel.cancel(victim)
+                    shard.evictions += 1
+                shard.wheel.schedule(digest, new_tat)
+            tats[digest] = new_tat
+        return decision
+
+    @staticmethod
+    def _expire(shard: _Shard, now: float) -> None:
+        # Wheel deadlines are each key's TAT when first scheduled; keys hit
+        # since then have a later TAT and are simply scheduled again
+        tats = shard.tats
+        for digest in shard.wheel.advance(now):
+            tat = tats.get(digest)
+            if tat is None:
+                continue
+            if tat <= now:
+                del tats[digest]
+                shard.expirations += 1
+            else:
+                shard.wheel.schedule(digest, tat)
+
+    def hit_many(
+        self,
+        hits: Sequence[RateLimitHit],
+        now: Optional[float] = None,
+    ) -> list[RateLimitDecision]:
+        """Count a batch of requests; decisions are returned in input order."""
+        if now is None:
+            now = self.clock()
+        return [self.hit(key, rate_limit, now) for key, rate_limit in hits]
+
+    async def ahit(
+        self,
+        key: Hashable,
+        rate_limit: RateLimit,
+        now: Optional[float] = None,
+    ) -> RateLimitDecision:
+        """Same as hit(); provided so RateLimiter is also an AsyncRateLimitBackend."""
+        return self.hit(key, rate_limit, now)
+
+    async def ahit_many(
+        self,
+        hits: Sequence[RateLimitHit],
+        now: Optional[float] = None,
+    ) -> list[RateLimitDecision]:
+        """Same as hit_many()."""
+        return self.hit_many(hits, now)
+
+    def reset(self) -> None:
+        """Forget all keys."""
+        now = self.clock()
+        for shard in self._shards:
+            with shard.lock:
+                shard.tats.clear()
+                shard.wheel = TimingWheel(now)
+
+
+def key_digest(key: Hashable) -> int:
+    """
+    A non-zero 64-bit digest of a rate-limit key, stable across processes.
+
+    Built-in hash() is salted per process, so keys are hashed from their
+    repr; the enforcer's ``(agent, rule_index)`` tuples have a stable repr.
+    Backends that store keys outside the process use it to bound key size,
+    since Agent-Id is client-supplied.
+    """
+    digest = hashlib.blake2b(repr(key).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little") or 1
+
+
+def rate_limit_key(agent_id: Optional[str], agent_name: Optional[str]) -> str:
+    """The identity a request is counted against: Agent-Id, else Agent-Name."""
+    return agent_id or agent_name or ""
+
+
+@lru_cache(maxsize=4096)
+def format_reset(epoch_seconds: int) -> str:
+    """Format an Agent-Policy-Rate-Reset value (ISO 8601, UTC, whole seconds)."""
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(epoch_seconds))
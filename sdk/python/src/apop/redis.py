@@ -0,0 +1,498 @@
+"""
+APoP v1.0 — Redis Rate Limiting
+
+Rate-limit backends that keep counters in a Redis-protocol (RESP) server,
+such as Redis, Valkey or KeyDB, so every host behind a load balancer shares
+one budget per agent. The client speaks RESP over a plain socket (no
+redis-py dependency) and sends each batch of counter updates as a single
+pipeline: one write and one round trip however many requests it counts.
+
+Counting uses fixed windows aligned to the epoch. A request in window ``i``
+of a rule increments ``<prefix><key digest>:<window>:<i>`` and sets it to
+expire when the window ends. Unlike the in-process GCRA limiter this can
+admit up to twice the budget across a window boundary, in exchange for
+two pipelineable commands per request and no server-side scripting.
+
+  - RedisRateLimiter: blocking client with a small connection pool (WSGI)
+  - AsyncRedisRateLimiter: asyncio client that coalesces concurrent ahit()
+    calls into one pipeline per event-loop iteration (ASGI)
+
+Usage::
+
+    from apop.redis import RedisRateLimiter
+
+    limiter = RedisRateLimiter("redis.internal", 6379)
+    options = MiddlewareOptions(policy=policy, rate_limiter=limiter)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import math
+import socket
+import threading
+import time
+from typing import Any, BinaryIO, Callable, Hashable, Optional, Sequence, Union
+
+from apop.lease import LeaseGrant, LeaseRequest, LeaseReturn
+from apop.ratelimit import WINDOW_SECONDS, RateLimitDecision, RateLimitHit, key_digest
+from apop.types import RateLimit
+
+RespValue = Union[None, int, str, bytes, "RespError", list[Any]]
+
+
+class RespError(Exception):
+    """An error reply from the server, or a reply the client cannot parse."""
+
+
+def encode_command(*args: Union[str, bytes, int]) -> bytes:
+    """Encode one command as a RESP array of bulk strings."""
+    out = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        if isinstance(arg, str):
+            arg = arg.encode("utf-8")
+        elif isinstance(arg, int):
+            arg = b"%d" % arg
+        out.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+    return b"".join(out)
+
+
+def _parse_line(line: bytes) -> tuple[bytes, bytes]:
+    if len(line) < 3 or not line.endswith(b"\r\n"):
+        raise ConnectionError("Connection closed mid-reply")
+    return line[:1], line[1:-2]
+
+
+def read_reply(stream: BinaryIO) -> RespValue:
+    """
+    Read one reply from a buffered stream.
+
+    Error replies are returned as RespError rather than raised, so the rest
+    of a pipeline's replies can still be consumed.
+    """
+    kind, rest = _parse_line(stream.readline())
+    if kind == b":":
+        return int(rest)
+    if kind == b"+":
+        return rest.decode("utf-8")
+    if kind == b"-":
+        return RespError(rest.decode("utf-8"))
+    if kind == b"$":
+        n = int(rest)
+        return None if n < 0 else stream.read(n + 2)[:-2]
+    if kind == b"*":
+        n = int(rest)
+        return None if n < 0 else [read_reply(stream) for _ in range(n)]
+    raise RespError(f"Unexpected RESP reply type {kind!r}")
+
+
+async def aread_reply(reader: asyncio.StreamReader) -> RespValue:
+    """Async counterpart of read_reply()."""
+    kind, rest = _parse_line(await reader.readline())
+    if kind == b":":
+        return int(rest)
+    if kind == b"+":
+        return rest.decode("utf-8")
+    if kind == b"-":
+        return RespError(rest.decode("utf-8"))
+    if kind == b"$":
+        n = int(rest)
+        return None if n < 0 else (await reader.readexactly(n + 2))[:-2]
+    if kind == b"*":
+        n = int(rest)
+        return None if n < 0 else [await aread_reply(reader) for _ in range(n)]
+    raise RespError(f"Unexpected RESP reply type {kind!r}")
+
+
+def _expire_at(window: int, index: int) -> int:
+    # Unix ms just after the window ends, so late replies still see the counter
+    return ((index + 1) * window + 1) * 1000
+
+
+class _FixedWindowCounter:
+    """Command building and reply decoding shared by the sync and async clients."""
+
+    def __init__(
+        self,
+        *,
+        db: int,
+        password: Optional[str],
+        prefix: str,
+        clock: Callable[[], float],
+    ) -> None:
+        self.prefix = prefix
+        self.clock = clock
+        # Pipelines sent to the server so far
+        self.round_trips = 0
+
+        handshake = []
+        if password is not None:
+            handshake.append(encode_command("AUTH", password))
+        if db:
+            handshake.append(encode_command("SELECT", db))
+        self._handshake = b"".join(handshake)
+        self._handshake_replies = len(handshake)
+
+    def _commands(
+        self,
+        hits: Sequence[RateLimitHit],
+        now: float,
+    ) -> tuple[bytes, list[float]]:
+        # Two commands per hit: INCR the window's counter, expire it at window end
+        commands = []
+        window_ends = []
+        for key, rate_limit in hits:
+            window = WINDOW_SECONDS[rate_limit.window]
+            index = int(now // window)
+            counter = self._counter(key, window, index)
+            commands.append(encode_command("INCR", counter))
+            commands.append(encode_command("PEXPIREAT", counter, _expire_at(window, index)))
+            window_ends.append(float((index + 1) * window))
+        return b"".join(commands), window_ends
+
+    def _counter(self, key: Hashable, window: int, index: int) -> str:
+        return f"{self.prefix}{key_digest(key):016x}:{window}:{index}"
+
+    @staticmethod
+    def _decisions(
+        hits: Sequence[RateLimitHit],
+        replies: list[RespValue],
+        window_ends: list[float],
+        now: float,
+    ) -> list[RateLimitDecision]:
+        for reply in replies:
+            if isinstance(reply, RespError):
+                raise reply
+        decisions = []
+        for (_, rate_limit), count, window_end in zip(hits, replies[0::2], window_ends):
+            assert isinstance(count, int)
+            if count <= rate_limit.requests:
+                decisions.append(
+                    RateLimitDecision(
+                        allowed=True,
+                        remaining=rate_limit.requests - count,
+                        retry_after=0,
+                        reset_at=window_end,
+                    )
+                )
+            else:
+                decisions.append(
+                    RateLimitDecision(
+                        allowed=False,
+                        remaining=0,
+                        retry_after=max(1, math.ceil(window_end - now)),
+                        reset_at=window_end,
+                    )
+                )
+        return decisions
+
+    def _check_handshake(self, replies: list[RespValue]) -> None:
+        for reply in replies:
+            if isinstance(reply, RespError):
+                raise reply
+
+
+class RedisRateLimiter(_FixedWindowCounter):
+    """
+    Blocking Redis-protocol rate-limit backend.
+
+    Each hit() or hit_many() call takes a connection from a small pool,
+    writes all of its commands at once and reads the replies back, so a
+    batch of any size costs one round trip.
+
+    Args:
+        host: Server host.
+        port: Server port.
+        db: Database number (SELECT), if not 0.
+        password: Password (AUTH), if the server requires one.
+        prefix: Prefix for counter keys.
+        timeout: Socket connect/read timeout in seconds.
+        max_connections: Idle connections kept for reuse.
+        clock: Time source in epoch seconds.
+
+    Server and connection errors propagate (RespError, OSError); the failed
+    connection is dropped rather than returned to the pool.
+    """
+
+    def __init__(
+        self,
+        host: str = "localhost",
+        port: int = 6379,
+        *,
+        db: int = 0,
+        password: Optional[str] = None,
+        prefix: str = "apop:rl:",
+        timeout: float = 1.0,
+        max_connections: int = 16,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        super().__init__(db=db, password=password, prefix=prefix, clock=clock)
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self._idle: list[tuple[socket.socket, BinaryIO]] = []
+        self._lock = threading.Lock()
+
+    def hit(
+        self,
+        key: Hashable,
+        rate_limit: RateLimit,
+        now: Optional[float] = None,
+    ) -> RateLimitDecision:
+        """Count one request against key and report whether it is within the limit."""
+        return self.hit_many([(key, rate_limit)], now)[0]
+
+    def hit_many(
+        self,
+        hits: Sequence[RateLimitHit],
+        now: Optional[float] = None,
+    ) -> list[RateLimitDecision]:
+        """Count a batch of requests in one round trip; decisions are in input order."""
+        if not hits:
+            return []
+        if now is None:
+            now = self.clock()
+        payload, window_ends = self._commands(hits, now)
+        replies = self.execute(payload, 2 * len(hits))
+        return self._decisions(hits, replies, window_ends, now)
+
+    def lease_many(
+        self,
+        acquire: Sequence[LeaseRequest],
+        release: Sequence[LeaseReturn] = (),
+        now: Optional[float] = None,
+    ) -> list[LeaseGrant]:
+        """
+        Grant budget slices and take back unused units, in one round trip.
+
+        Implements apop.lease.LeaseBackend on the same counters as hit(), so
+        leased and unleased workers can share a budget. Each lease is an
+        INCRBY; the caller returns the part of it that was not granted.
+        """
+        if not acquire and not release:
+            return []
+        if now is None:
+            now = self.clock()
+        commands = []
+        for key, rate_limit, index, units in release:
+            window = WINDOW_SECONDS[rate_limit.window]
+            if index != int(now // window):
+                continue  # that window's counter has expired
+            counter = self._counter(key, window, index)
+            commands.append(encode_command("DECRBY", counter, units))
+            commands.append(encode_command("PEXPIREAT", counter, _expire_at(window, index)))
+        returned = len(commands)
+        window_ends = []
+        for key, rate_limit, units in acquire:
+            window = WINDOW_SECONDS[rate_limit.window]
+            index = int(now // window)
+            counter = self._counter(key, window, index)
+            commands.append(encode_command("INCRBY", counter, units))
+            commands.append(encode_command("PEXPIREAT", counter, _expire_at(window, index)))
+            window_ends.append(float((index + 1) * window))
+
+        replies = self.execute(b"".join(commands), len(commands))
+        for reply in replies:
+            if isinstance(reply, RespError):
+                raise reply
+        grants = []
+        for (_, rate_limit, units), total, window_end in zip(
+            acquire, replies[returned::2], window_ends
+        ):
+            assert isinstance(total, int)
+            granted = max(0, min(units, rate_limit.requests - (total - units)))
+            grants.append(
+                LeaseGrant(
+                    granted=granted,
+                    remaining=max(0, rate_limit.requests - total),
+                    window_end=window_end,
+                )
+            )
+        return grants
+
+    def execute(self, payload: bytes, replies: int) -> list[RespValue]:
+        """Send pre-encoded commands as one pipeline and read back their replies."""
+        conn = self._acquire()
+        sock, stream = conn
+        try:
+            sock.sendall(payload)
+            result = [read_reply(stream) for _ in range(replies)]
+        except BaseException:
+            sock.close()
+            raise
+        self.round_trips += 1
+        self._release(conn)
+        return result
+
+    def _acquire(self) -> tuple[socket.socket, BinaryIO]:
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        stream = sock.makefile("rb")
+        if self._handshake:
+            try:
+                sock.sendall(self._handshake)
+                self._check_handshake(
+                    [read_reply(stream) for _ in range(self._handshake_replies)]
+                )
+            except BaseException:
+                sock.close()
+                raise
+        return sock, stream
+
+    def _release(self, conn: tuple[socket.socket, BinaryIO]) -> None:
+        with self._lock:
+            if len(self._idle) < self.max_connections:
+                self._idle.append(conn)
+                return
+        conn[0].close()
+
+    def close(self) -> None:
+        """Close pooled connections."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for sock, _ in idle:
+            sock.close()
+
+
+class AsyncRedisRateLimiter(_FixedWindowCounter):
+    """
+    Asyncio Redis-protocol rate-limit backend.
+
+    ahit() never blocks the event loop. Calls made during the same
+    event-loop iteration, such as one per in-flight request, are queued and
+    sent together as a single pipeline over one connection. Under load the
+    number of round trips therefore grows with event-loop iterations, not
+    with requests.
+
+    Takes the same arguments as RedisRateLimiter, except max_connections.
+    Must be used from a single event loop.
+    """
+
+    def __init__(
+        self,
+        host: str = "localhost",
+        port: int = 6379,
+        *,
+        db: int = 0,
+        password: Optional[str] = None,
+        prefix: str = "apop:rl:",
+        timeout: float = 1.0,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        super().__init__(db=db, password=password, prefix=prefix, clock=clock)
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._pending: list[tuple[bytes, int, asyncio.Future[list[RespValue]]]] = []
+        self._flushes: set[asyncio.Task[None]] = set()
+        self._lock: Optional[asyncio.Lock] = None
+
+    async def ahit(
+        self,
+        key: Hashable,
+        rate_limit: RateLimit,
+        now: Optional[float] = None,
+    ) -> RateLimitDecision:
+        """Count one request against key without blocking the event loop."""
+        return (await self.ahit_many([(key, rate_limit)], now))[0]
+
+    async def ahit_many(
+        self,
+        hits: Sequence[RateLimitHit],
+        now: Optional[float] = None,
+    ) -> list[RateLimitDecision]:
+        """Count a batch of requests; decisions are returned in input order."""
+        if not hits:
+            return []
+        if now is None:
+            now = self.clock()
+        payload, window_ends = self._commands(hits, now)
+        replies = await self.execute(payload, 2 * len(hits))
+        return self._decisions(hits, replies, window_ends, now)
+
+    async def execute(self, payload: bytes, replies: int) -> list[RespValue]:
+        """Queue pre-encoded commands for the next pipeline and await their replies."""
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future[list[RespValue]] = loop.create_future()
+        if not self._pending:
+            loop.call_soon(self._start_flush)
+        self._pending.append((payload, replies, future))
+        return await future
+
+    def _start_flush(self) -> None:
+        batch, self._pending = self._pending, []
+        task = asyncio.get_running_loop().create_task(self._flush(batch))
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    async def _flush(
+        self,
+        batch: list[tuple[bytes, int, asyncio.Future[list[RespValue]]]],
+    ) -> None:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        try:
+            # One pipeline in flight per connection; calls arriving meanwhile
+            # queue up and go out together in the next one
+            async with self._lock:
+                reader, writer = await self._connect()
+                writer.write(b"".join(payload for payload, _, _ in batch))
+                await asyncio.wait_for(writer.drain(), self.timeout)
+                for _, count, future in batch:
+                    replies = [
+                        await asyncio.wait_for(aread_reply(reader), self.timeout)
+                        for _ in range(count)
+                    ]
+                    if not future.done():
+                        future.set_result(replies)
+                self.round_trips += 1
+        except BaseException as exc:
+            self._drop_connection()
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            if not isinstance(exc, Exception):
+                raise
+
+    async def _connect(self) -> tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        if self._reader is None or self._writer is None:
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_connection(self.host, self.port), self.timeout
+            )
+            if self._handshake:
+                try:
+                    writer.write(self._handshake)
+                    self._check_handshake(
+                        [
+                            await asyncio.wait_for(aread_reply(reader), self.timeout)
+                            for _ in range(self._handshake_replies)
+                        ]
+                    )
+                except BaseException:
+                    writer.close()
+                    raise
+            self._reader, self._writer = reader, writer
+        return self._reader, self._writer
+
+    def _drop_connection(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = self._writer = None
+
+    async def aclose(self) -> None:
+        """Wait for in-flight pipelines and close the connection."""
+        if self._flushes:
+            await asyncio.gather(*self._flushes, return_exceptions=True)
+        writer = self._writer
+        self._drop_connection()
+        if writer is not None:
+            try:
+                await writer.wait_closed()
+            except OSError:
+                pass
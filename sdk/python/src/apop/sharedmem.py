@@ -0,0 +1,206 @@
+"""
+APoP v1.0 — Shared-Memory Rate Limiting
+
+A rate-limit backend whose state lives in a memory-mapped file, so every
+worker process of a prefork server (gunicorn, uwsgi) counts against the
+same budget without an external service.
+
+The file holds a fixed-size open-addressing hash table. Each 16-byte slot
+stores a 64-bit key digest and the key's GCRA theoretical arrival time
+(see apop.ratelimit). The table is split into stripes; a key probes only
+within its home stripe, and each stripe is guarded by a thread lock plus
+an fcntl byte-range lock on the file, so processes and threads touching
+different stripes never wait on each other.
+
+Slots whose budget has fully refilled hold no information and are reused
+in place. When a stripe has no free or refilled slot within the probe
+window, the slot closest to refilling is evicted.
+
+Usage::
+
+    from apop.sharedmem import SharedMemoryRateLimiter
+
+    # Created by the first worker, opened by the rest
+    limiter = SharedMemoryRateLimiter("/run/apop/ratelimit.bin")
+    options = MiddlewareOptions(policy=policy, rate_limiter=limiter)
+"""
+
+from __future__ import annotations
+
+import mmap
+import os
+import struct
+import threading
+import time
+from typing import Callable, Hashable, Optional, Sequence
+
+from apop.ratelimit import RateLimitDecision, RateLimitHit, gcra, key_digest
+from apop.types import RateLimit
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None  # type: ignore[assignment]
+
+_MAGIC = b"APOPRL01"
+_HEADER = struct.Struct("<8sQQ")  # magic, slots, stripes
+_HEADER_SIZE = 64
+_SLOT = struct.Struct("<Qd")  # key digest (0 = empty), TAT
+PROBE_LIMIT = 16
+"""Maximum slots examined per lookup."""
+
+
+class SharedMemoryRateLimiter:
+    """
+    GCRA rate limiter backed by a memory-mapped file shared between processes.
+
+    Args:
+        path: File holding the table. Created (and sized) if missing or
+            empty; an existing table keeps its own size.
+        slots: Table capacity when creating the file. Rounded up to a
+            multiple of stripes.
+        stripes: Number of independently locked regions.
+        clock: Time source in epoch seconds.
+
+    Raises:
+        RuntimeError: On platforms without fcntl (Windows).
+        ValueError: If path holds something other than a rate-limit table.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        slots: int = 65_536,
+        *,
+        stripes: int = 64,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        if fcntl is None:
+            raise RuntimeError("SharedMemoryRateLimiter requires fcntl (POSIX only)")
+        if slots < 1 or stripes < 1:
+            raise ValueError("SharedMemoryRateLimiter slots and stripes must be at least 1")
+
+        self.path = path
+        self.clock = clock
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            self.slots, self.stripes = self._open_table(slots, stripes)
+            self._map = mmap.mmap(self._fd, _HEADER_SIZE + self.slots * _SLOT.size)
+        except BaseException:
+            os.close(self._fd)
+            raise
+        self._stripe_size = self.slots // self.stripes
+        self._locks = tuple(threading.Lock() for _ in range(self.stripes))
+
+    def _open_table(self, slots: int, stripes: int) -> tuple[int, int]:
+        # Whole-file lock so concurrent workers agree on who initializes
+        fcntl.lockf(self._fd, fcntl.LOCK_EX)
+        try:
+            header = os.pread(self._fd, _HEADER.size, 0)
+            if not header:
+                stripes = min(stripes, slots)
+                slots = -(-slots // stripes) * stripes
+                os.ftruncate(self._fd, _HEADER_SIZE + slots * _SLOT.size)
+                os.pwrite(self._fd, _HEADER.pack(_MAGIC, slots, stripes), 0)
+                return slots, stripes
+
+            magic, slots, stripes = _HEADER.unpack(header.ljust(_HEADER.size, b"\0"))
+            size = os.fstat(self._fd).st_size
+            if magic != _MAGIC or size != _HEADER_SIZE + slots * _SLOT.size:
+                raise ValueError(f"'{self.path}' is not an APoP rate-limit table")
+            return slots, stripes
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN)
+
+    def hit(
+        self,
+        key: Hashable,
+        rate_limit: RateLimit,
+        now: Optional[float] = None,
+    ) -> RateLimitDecision:
+        """Count one request against key and report whether it is within the limit."""
+        if now is None:
+            now = self.clock()
+        digest = key_digest(key)
+        stripe, home = divmod(digest % self.slots, self._stripe_size)
+        base = _HEADER_SIZE + stripe * self._stripe_size * _SLOT.size
+
+        with self._locks[stripe]:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX, 1, stripe)
+            try:
+                offset = self._find_slot(base, home, digest, now)
+                found, tat = _SLOT.unpack_from(self._map, offset)
+                new_tat, decision = gcra(tat if found == digest else 0.0, now, rate_limit)
+                if decision.allowed:
+                    _SLOT.pack_into(self._map, offset, digest, new_tat)
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, 1, stripe)
+        return decision
+
+    def hit_many(
+        self,
+        hits: Sequence[RateLimitHit],
+        now: Optional[float] = None,
+    ) -> list[RateLimitDecision]:
+        """Count a batch of requests; decisions are returned in input order."""
+        if now is None:
+            now = self.clock()
+        return [self.hit(key, rate_limit, now) for key, rate_limit in hits]
+
+    def _find_slot(self, base: int, home: int, digest: int, now: float) -> int:
+        # The key's own slot if present, else the first empty or refilled slot,
+        # else the slot nearest to refilling
+        mm = self._map
+        size = self._stripe_size
+        reusable = -1
+        victim, victim_tat = -1, float("inf")
+        for i in range(min(PROBE_LIMIT, size)):
+            offset = base + ((home + i) % size) * _SLOT.size
+            found, tat = _SLOT.unpack_from(mm, offset)
+            if found == digest:
+                return offset
+            if found == 0:
+                # Inserts never skip an empty slot, so the key is not further on
+                return reusable if reusable >= 0 else offset
+            if reusable < 0:
+                if tat <= now:
+                    reusable = offset
+                elif tat < victim_tat:
+                    victim, victim_tat = offset, tat
+        return reusable if reusable >= 0 else victim
+
+    def __len__(self) -> int:
+        """Number of keys whose budget is not yet fully refilled."""
+        now = self.clock()
+        return sum(
+            1
+            for digest, tat in _SLOT.iter_unpack(self._map[_HEADER_SIZE:])
+            if digest and tat > now
+        )
+
+    def reset(self) -> None:
+        """Forget all keys, for every process sharing the table."""
+        for lock in self._locks:
+            lock.acquire()
+        try:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX)
+            try:
+                self._map[_HEADER_SIZE:] = bytes(self.slots * _SLOT.size)
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN)
+        finally:
+            for lock in self._locks:
+                lock.release()
+
+    def close(self) -> None:
+        """Unmap the table and close the file. The file itself is kept."""
+        if self._fd >= 0:
+            self._map.close()
+            os.close(self._fd)
+            self._fd = -1
+
+    def __enter__(self) -> SharedMemoryRateLimiter:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
@@ -3,13 +3,25 @@ APoP v1.0 — Python Type Definitions
 
 Dataclass-based types matching the APoP JSON Schema.
 All types use snake_case per Python conventions.
+
+Types created per request (RequestContext, AgentRequestHeaders,
+EnforcementResult) and small value types (RateLimit) are slotted. They are
+not frozen: a frozen dataclass costs about twice as much to construct, and
+instances shared across threads are treated as read-only instead.
 """
 
 from __future__ import annotations
 
+import json
 from dataclasses import dataclass, field
 from enum import Enum
-from typing import Literal, Optional, Union
+from typing import TYPE_CHECKING, Literal, Mapping, Optional, Protocol, Union
+
+if TYPE_CHECKING:
+    from apop.enforcer import DecisionCache, Verifier
+    from apop.enumeration import EnumerationGuard
+    from apop.loader import PolicyLoader
+    from apop.ratelimit import AsyncRateLimitBackend, RateLimitBackend
 
 
 # ---------------------------------------------------------------------------
@@ -42,6 +54,11 @@ ACTION_TYPES: tuple[ActionType, ...] = (
     "all",
 )
 
+ACTION_BITS: dict[str, int] = {action: 1 << i for i, action in enumerate(ACTION_TYPES)}
+"""Bit assigned to each ActionType for integer-mask action sets."""
+
+ALL_ACTIONS_MASK: int = (1 << len(ACTION_TYPES)) - 1
+
 VerificationMethod = Literal[
     "pkix",
     "did",
@@ -87,7 +104,7 @@ APOP_STATUS_CODES = {
 # ---------------------------------------------------------------------------
 
 
-@dataclass
+@dataclass(slots=True)
 class RateLimit:
     """Rate limiting configuration for agent requests."""
 
@@ -106,7 +123,7 @@ class PolicyRule:
     require_verification: bool = False
 
 
-@dataclass
+@dataclass(slots=True)
 class PathPolicy:
     """Path-specific policy override."""
 
@@ -181,7 +198,7 @@ class AgentPolicy:
 # ---------------------------------------------------------------------------
 
 
-@dataclass
+@dataclass(slots=True)
 class AgentRequestHeaders:
     """Agent request headers parsed from an incoming HTTP request."""
 
@@ -198,17 +215,61 @@ AgentResponseHeaders = dict[str, str]
 """APoP response headers to set on the outgoing HTTP response."""
 
 
-@dataclass
+class BodySource(Protocol):
+    """Produces an error body on demand (see apop.bodies.LazyBody)."""
+
+    def to_dict(self) -> dict[str, object]: ...
+
+    def to_bytes(self) -> bytes: ...
+
+
+@dataclass(slots=True)
 class EnforcementResult:
-    """Result of policy enforcement evaluation."""
+    """
+    Result of policy enforcement evaluation.
+
+    A denial built by the enforcer may leave ``body`` unset and carry a
+    ``body_source`` instead: the dict is only rendered when ``body`` is first
+    read, so middleware that writes ``body_bytes`` never builds it at all.
+    Results may be shared between requests (compiled rules, DecisionCache);
+    treat them as read-only. Their ``headers`` are then a read-only mapping:
+    copy with ``dict(result.headers)`` to add headers. Enforcing an
+    uncompiled AgentPolicy returns a fresh dict.
+    """
 
     status: EnforcementStatus
     http_status: int
-    headers: AgentResponseHeaders
+    headers: Mapping[str, str]
     body: Optional[dict[str, object]] = None
-
-
-@dataclass
+    body_source: Optional[BodySource] = field(default=None, repr=False, compare=False)
+    """Renders the error body on demand when ``body`` is not given."""
+
+    def __post_init__(self) -> None:
+        if self.body is None and self.body_source is not None:
+            # Left unset until read; see __getattr__
+            del self.body
+
+    def __getattr__(self, name: str) -> Optional[dict[str, object]]:
+        # Only reached for an unset slot, i.e. a body not rendered yet
+        if name != "body" or self.body_source is None:
+            raise AttributeError(name)
+        body = self.body = self.body_source.to_dict()
+        return body
+
+    @property
+    def body_bytes(self) -> Optional[bytes]:
+        """The JSON error body encoded as UTF-8 bytes, ready to write to the response."""
+        try:
+            body = object.__getattribute__(self, "body")
+        except AttributeError:
+            assert self.body_source is not None
+            return self.body_source.to_bytes()
+        if body is None:
+            return None
+        return json.dumps(body, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+@dataclass(slots=True)
 class RequestContext:
     """Request context used by the enforcer."""
 
@@ -228,6 +289,23 @@ class MiddlewareOptions:
 
     policy: AgentPolicy
     skip_non_agents: bool = True
+    decision_cache: Optional[DecisionCache] = None
+    """Optional LRU cache of enforcement decisions shared by all requests."""
+    rate_limiter: Optional[Union[RateLimitBackend, AsyncRateLimitBackend]] = None
+    """
+    Optional limiter that enforces rateLimit rules with 438 responses. The
+    FastAPI middleware awaits async limiters (AsyncRedisRateLimiter); Flask
+    and Django need a synchronous one and raise TypeError at setup otherwise.
+    """
+    enumeration_guard: Optional[EnumerationGuard] = None
+    """Optional IP-level block for clients cycling through Agent-Id values."""
+    verifier: Optional[Verifier] = None
+    """Optional async credential check for requireVerification rules (FastAPI only)."""
+    policy_loader: Optional[PolicyLoader] = None
+    """
+    Optional loader whose current policy is enforced instead of policy, so
+    edits to the policy file take effect without a restart.
+    """
 
 
 @dataclass
@@ -238,3 +316,5 @@ class DiscoveryResult:
     policy_url: Optional[str] = None
     method: Optional[Literal["well-known", "http-header", "meta-tag", "dns-txt"]] = None
     error: Optional[str] = None
+    latency_saved: Optional[float] = None
+    """Seconds saved over running the steps in sequence (hedged discovery only)."""
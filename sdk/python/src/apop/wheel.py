@@ -0,0 +1,132 @@
+"""
+APoP v1.0 — Timing Wheel
+
+A hierarchical timing wheel for expiring rate-limiter keys without sweeping
+the whole table. Deadlines are bucketed by whole-second tick into three
+levels of 64 slots:
+
+  - level 0: the next 64 seconds, one slot per second
+  - level 1: the next ~68 minutes, one slot per 64 seconds
+  - level 2: the next ~3 days, one slot per ~68 minutes
+
+Scheduling and cancelling are O(1). Advancing the clock visits one level-0
+slot per elapsed second; whenever a lower level wraps, the next slot of the
+level above is cascaded down. Each entry is touched at most once per level,
+however long its deadline.
+"""
+
+from __future__ import annotations
+
+import math
+from typing import Generic, Hashable, Iterator, TypeVar
+
+SLOTS = 64
+LEVELS = 3
+_BITS = 6  # log2(SLOTS)
+SPAN = SLOTS**LEVELS
+"""Ticks (seconds) covered by the wheel; later deadlines wait in the last level."""
+
+K = TypeVar("K", bound=Hashable)
+
+
+class TimingWheel(Generic[K]):
+    """
+    Hierarchical timing wheel keyed by hashable items of type K.
+
+    Example::
+
+        wheel = TimingWheel(now=time.time())
+        wheel.schedule("key", deadline=time.time() + 30)
+        for item in wheel.advance(time.time()):
+            ...  # item's deadline has passed
+    """
+
+    __slots__ = ("_tick", "_levels", "_where")
+
+    def __init__(self, now: float = 0.0) -> None:
+        self._tick = math.floor(now)
+        self._levels: list[list[dict[K, float]]] = [
+            [{} for _ in range(SLOTS)] for _ in range(LEVELS)
+        ]
+        self._where: dict[K, dict[K, float]] = {}
+
+    def __len__(self) -> int:
+        return len(self._where)
+
+    @property
+    def tick(self) -> int:
+        """The last whole second the wheel has advanced to."""
+        return self._tick
+
+    def __contains__(self, item: object) -> bool:
+        return item in self._where
+
+    def schedule(self, item: K, deadline: float) -> None:
+        """Schedule item to fire once deadline has passed, replacing any earlier schedule."""
+        self.cancel(item)
+        self._place(item, deadline)
+
+    def cancel(self, item: K) -> None:
+        """Remove item from the wheel, if present."""
+        bucket = self._where.pop(item, None)
+        if bucket is not None:
+            del bucket[item]
+
+    def _place(self, item: K, deadline: float) -> None:
+        due = max(math.ceil(deadline), self._tick + 1)
+        delta = due - self._tick
+        if delta < SLOTS:
+            bucket = self._levels[0][due & (SLOTS - 1)]
+        elif delta < SLOTS**2:
+            bucket = self._levels[1][(due >> _BITS) & (SLOTS - 1)]
+        else:
+            # Deadlines past the wheel's span sit in the furthest level-2 slot
+            # and are placed again when it cascades
+            due = min(due, self._tick + SPAN - 1)
+            bucket = self._levels[2][(due >> (2 * _BITS)) & (SLOTS - 1)]
+        bucket[item] = deadline
+        self._where[item] = bucket
+
+    def advance(self, now: float) -> Iterator[K]:
+        """Move the wheel to now and yield every item whose deadline has passed."""
+        target = math.floor(now)
+        if target - self._tick >= SPAN:
+            yield from self._rebuild(target)
+            return
+
+        levels = self._levels
+        mask = SLOTS - 1
+        while self._tick < target:
+            self._tick = tick = self._tick + 1
+            if tick & mask == 0:
+                if (tick >> _BITS) & mask == 0:
+                    self._cascade(levels[2][(tick >> (2 * _BITS)) & mask])
+                self._cascade(levels[1][(tick >> _BITS) & mask])
+            bucket = levels[0][tick & mask]
+            if bucket:
+                due = list(bucket)
+                bucket.clear()
+                for item in due:
+                    del self._where[item]
+                yield from due
+
+    def _cascade(self, bucket: dict[K, float]) -> None:
+        entries = list(bucket.items())
+        bucket.clear()
+        for item, deadline in entries:
+            del self._where[item]
+            self._place(item, deadline)
+
+    def _rebuild(self, target: int) -> Iterator[K]:
+        # The clock jumped past the whole wheel: re-place everything at once
+        entries = [(item, bucket[item]) for item, bucket in self._where.items()]
+        for level in self._levels:
+            for bucket in level:
+                bucket.clear()
+        self._where.clear()
+        self._tick = target
+        for item, deadline in entries:
+            if deadline <= target:
+                yield item
+            else:
+                self._place(item, deadline)
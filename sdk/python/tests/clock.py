@@ -0,0 +1,13 @@
+"""A manually advanced clock for tests of time-dependent components."""
+
+from __future__ import annotations
+
+
+class FakeClock:
+    """Callable returning a fixed time; tests move it by setting ``now``."""
+
+    def __init__(self, now: float = 1_700_000_000.0) -> None:
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
@@ -0,0 +1,147 @@
+"""A minimal in-process RESP server standing in for Redis in tests."""
+
+from __future__ import annotations
+
+import socketserver
+import threading
+import time
+from typing import Callable, Optional
+
+
+def parse_commands(buffer: bytearray) -> list[list[bytes]]:
+    """Remove and return every complete RESP command at the start of buffer."""
+    commands = []
+    while True:
+        pos = 0
+        end = buffer.find(b"\r\n", pos)
+        if end < 0:
+            break
+        if buffer[:1] != b"*":
+            raise ValueError("inline commands are not supported")
+        count = int(buffer[1:end])
+        pos = end + 2
+        args: list[bytes] = []
+        for _ in range(count):
+            end = buffer.find(b"\r\n", pos)
+            if end < 0:
+                break
+            size = int(buffer[pos + 1 : end])
+            if len(buffer) < end + 2 + size + 2:
+                break
+            args.append(bytes(buffer[end + 2 : end + 2 + size]))
+            pos = end + 2 + size + 2
+        if len(args) < count:
+            break
+        del buffer[:pos]
+        commands.append(args)
+    return commands
+
+
+class RespServer:
+    """
+    Threaded TCP server speaking enough RESP for the rate-limit backends.
+
+    Supports PING, AUTH, SELECT, GET, SET, INCR, INCRBY, DECRBY, PEXPIREAT,
+    DEL and FLUSHALL. Expiry is checked against ``clock`` so tests can use
+    a fake time source. ``commands`` records every command received.
+    """
+
+    def __init__(
+        self,
+        *,
+        password: Optional[str] = None,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.password = password
+        self.clock = clock
+        self.data: dict[bytes, tuple[int, Optional[float]]] = {}
+        self.commands: list[list[bytes]] = []
+        self.lock = threading.Lock()
+        server = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self) -> None:
+                authed = server.password is None
+                buffer = bytearray()
+                while True:
+                    try:
+                        chunk = self.request.recv(65536)
+                    except OSError:
+                        return
+                    if not chunk:
+                        return
+                    buffer += chunk
+                    batch = parse_commands(buffer)
+                    if not batch:
+                        continue
+                    with server.lock:
+                        server.commands.extend(batch)
+                    out = []
+                    for command in batch:
+                        if command[0].upper() == b"AUTH":
+                            authed = command[1].decode() == server.password
+                            out.append(b"+OK\r\n" if authed else b"-ERR invalid password\r\n")
+                        elif not authed:
+                            out.append(b"-NOAUTH Authentication required.\r\n")
+                        else:
+                            out.append(server.execute(command))
+                    self.request.sendall(b"".join(out))
+
+        self._server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, args=(0.05,), daemon=True
+        )
+
+    def __enter__(self) -> RespServer:
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _live(self, key: bytes) -> Optional[tuple[int, Optional[float]]]:
+        entry = self.data.get(key)
+        if entry is not None and entry[1] is not None and entry[1] <= self.clock():
+            del self.data[key]
+            return None
+        return entry
+
+    def execute(self, command: list[bytes]) -> bytes:
+        name, args = command[0].upper(), command[1:]
+        with self.lock:
+            if name == b"PING":
+                return b"+PONG\r\n"
+            if name == b"SELECT":
+                return b"+OK\r\n"
+            if name == b"FLUSHALL":
+                self.data.clear()
+                return b"+OK\r\n"
+            if name == b"GET":
+                entry = self._live(args[0])
+                if entry is None:
+                    return b"$-1\r\n"
+                value = b"%d" % entry[0]
+                return b"$%d\r\n%s\r\n" % (len(value), value)
+            if name == b"SET":
+                self.data[args[0]] = (int(args[1]), None)
+                return b"+OK\r\n"
+            if name in (b"INCR", b"INCRBY", b"DECRBY"):
+                entry = self._live(args[0]) or (0, None)
+                delta = 1 if name == b"INCR" else int(args[1])
+                if name == b"DECRBY":
+                    delta = -delta
+                self.data[args[0]] = (entry[0] + delta, entry[1])
+                return b":%d\r\n" % (entry[0] + delta)
+            if name == b"PEXPIREAT":
+                entry = self._live(args[0])
+                if entry is None:
+                    return b":0\r\n"
+                self.data[args[0]] = (entry[0], int(args[1]) / 1000)
+                return b":1\r\n"
+            if name == b"DEL":
+                removed = sum(self.data.pop(key, None) is not None for key in args)
+                return b":%d\r\n" % removed
+        return b"-ERR unknown command '%s'\r\n" % name
@@ -0,0 +1,57 @@
+"""Tests for apop.bloom — Agent ID Sets."""
+
+import pytest
+
+from apop.bloom import AgentIdSet, BloomFilter
+
+
+class TestBloomFilter:
+    def test_no_false_negatives(self):
+        bloom = BloomFilter(capacity=2000, error_rate=0.01)
+        ids = [f"did:web:agent{i}.example" for i in range(2000)]
+        for agent_id in ids:
+            bloom.add(agent_id)
+        assert all(agent_id in bloom for agent_id in ids)
+
+    def test_false_positive_rate_near_target(self):
+        bloom = BloomFilter(capacity=2000, error_rate=0.01)
+        for i in range(2000):
+            bloom.add(f"did:web:agent{i}.example")
+        false_positives = sum(f"did:web:other{i}.example" in bloom for i in range(10000))
+        assert false_positives < 300  # 1% target, generous margin
+
+    def test_memory_bounded_per_entry(self):
+        bloom = BloomFilter(capacity=100_000, error_rate=0.01)
+        assert bloom.nbytes * 8 / 100_000 < 10
+
+    def test_rejects_invalid_error_rate(self):
+        with pytest.raises(ValueError):
+            BloomFilter(capacity=10, error_rate=1.5)
+
+
+class TestAgentIdSet:
+    def test_exact_membership(self):
+        ids = [f"did:web:bad{i}.example" for i in range(500)]
+        members = set(ids)
+        agent_set = AgentIdSet(ids, confirm=members.__contains__, error_rate=0.2)
+        assert all(agent_id in agent_set for agent_id in ids)
+        # A loose filter lets non-members through; confirmation rejects them
+        assert not any(f"did:web:good{i}.example" in agent_set for i in range(2000))
+        assert len(agent_set) == 500
+
+    def test_confirmation_only_called_after_filter_hit(self):
+        members = {"did:web:bad.example"}
+        calls: list[str] = []
+
+        def confirm(agent_id: str) -> bool:
+            calls.append(agent_id)
+            return agent_id in members
+
+        agent_set = AgentIdSet(members, confirm=confirm)
+        assert "did:web:bad.example" in agent_set
+        assert "did:web:good.example" not in agent_set
+        assert calls[0] == "did:web:bad.example"
+        assert len(calls) <= 2
+
+    def test_non_string_is_absent(self):
+        assert 42 not in AgentIdSet(["did:web:a.example"], confirm=lambda agent_id: True)
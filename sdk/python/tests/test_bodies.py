@@ -0,0 +1,154 @@
+"""Tests for apop.bodies — Error Response Bodies."""
+
+import json
+from dataclasses import replace
+
+import pytest
+
+from apop.bodies import (
+    DECISION_ACCESS_DENIED,
+    DECISION_INTENT_BLOCKED,
+    DECISION_NOT_ON_ALLOWLIST,
+    DECISION_ON_DENYLIST,
+    DECISION_VERIFICATION_REQUIRED,
+    LazyBody,
+    build_body_template,
+    encode_json,
+)
+from apop.compiler import compile_policy
+from apop.enforcer import enforce
+from apop.matcher import merge_policy
+from apop.types import EnforcementResult, RequestContext
+from tests.test_enforcer import TEST_POLICY
+
+DECISIONS = [
+    DECISION_ON_DENYLIST,
+    DECISION_NOT_ON_ALLOWLIST,
+    DECISION_ACCESS_DENIED,
+    DECISION_INTENT_BLOCKED,
+    DECISION_VERIFICATION_REQUIRED,
+]
+
+TRICKY_PATHS = ["/plain", '/quote"d', "/back\\slash", "/ünïcode/☃", "/ctrl\n\t"]
+
+
+class TestBodyTemplate:
+    @pytest.mark.parametrize("decision", DECISIONS)
+    @pytest.mark.parametrize("path", TRICKY_PATHS)
+    def test_bytes_match_encoded_dict(self, decision: int, path: str):
+        effective = merge_policy(TEST_POLICY.default_policy, None)
+        template = build_body_template(TEST_POLICY, effective, decision, ["did", "pkix"])
+        agent_id = 'did:web:"odd".example'
+        intent = "read, extract, automated_purchase"
+
+        as_dict = template.build(path, agent_id, intent)
+        as_bytes = template.render(path, agent_id, intent)
+        assert json.loads(as_bytes) == as_dict
+        assert as_bytes == encode_json(as_dict)
+
+    def test_blocked_intents_in_message(self):
+        effective = merge_policy(TEST_POLICY.default_policy, None)
+        template = build_body_template(TEST_POLICY, effective, DECISION_INTENT_BLOCKED)
+        body = template.build("/x", None, " extract ,read,automated_purchase")
+        assert body["message"] == (
+            "Action(s) 'extract, automated_purchase' not permitted on this path."
+        )
+        assert body["allowedActions"] == ["read", "render"]
+
+    def test_build_returns_independent_dicts(self):
+        effective = merge_policy(TEST_POLICY.default_policy, None)
+        template = build_body_template(
+            TEST_POLICY, effective, DECISION_VERIFICATION_REQUIRED, ["did"]
+        )
+        first = template.build("/x", None, None)
+        first["acceptedMethods"].append("tampered")  # type: ignore[attr-defined]
+        assert template.build("/x", None, None)["acceptedMethods"] == ["did"]
+
+    def test_rejects_allowed_decision(self):
+        effective = merge_policy(TEST_POLICY.default_policy, None)
+        with pytest.raises(ValueError):
+            build_body_template(TEST_POLICY, effective, 0)
+
+
+class TestLazyEnforcementBody:
+    def test_body_not_built_until_read(self):
+        calls = []
+
+        class Source:
+            def to_dict(self):
+                calls.append("dict")
+                return {"error": "x"}
+
+            def to_bytes(self):
+                calls.append("bytes")
+                return b'{"error":"x"}'
+
+        result = EnforcementResult("denied", 430, {}, body_source=Source())
+        assert calls == []
+        assert result.body_bytes == b'{"error":"x"}'
+        assert calls == ["bytes"]
+        assert result.body == {"error": "x"}
+        assert result.body == {"error": "x"}
+        assert calls == ["bytes", "dict"]
+
+    def test_equality_compares_rendered_bodies(self):
+        effective = merge_policy(TEST_POLICY.default_policy, None)
+        template = build_body_template(TEST_POLICY, effective, DECISION_ON_DENYLIST)
+
+        def denied(agent_id: str) -> EnforcementResult:
+            body = LazyBody(template, "/x", agent_id)
+            return EnforcementResult("denied", 430, {}, body_source=body)
+
+        assert denied("did:web:a.example") != denied("did:web:b.example")
+        assert denied("did:web:a.example") == denied("did:web:a.example")
+        lazy = denied("did:web:a.example")
+        assert lazy == EnforcementResult("denied", 430, {}, lazy.body)
+
+    def test_replace(self):
+        result = EnforcementResult("denied", 430, {}, {"error": "x"})
+        changed = replace(result, http_status=438, body={"error": "y"})
+        assert (changed.http_status, changed.body) == (438, {"error": "y"})
+        assert result.body == {"error": "x"}
+
+    def test_body_keyword_constructor(self):
+        result = EnforcementResult(
+            status="denied",
+            http_status=430,
+            headers={"Agent-Policy-Status": "denied"},
+            body={"error": "ünï"},
+        )
+        assert result.body == {"error": "ünï"}
+        assert result.body_bytes == '{"error":"ünï"}'.encode()
+        result.body = {"error": "changed"}
+        assert result.body_bytes == b'{"error":"changed"}'
+
+    def test_assigned_body_replaces_lazy_body(self):
+        effective = merge_policy(TEST_POLICY.default_policy, None)
+        template = build_body_template(TEST_POLICY, effective, DECISION_ON_DENYLIST)
+        result = EnforcementResult(
+            "denied", 430, {}, body_source=LazyBody(template, "/x", "did:web:a.example")
+        )
+        result.body = {"error": "custom"}
+        assert result.body == {"error": "custom"}
+        assert result.body_bytes == b'{"error":"custom"}'
+
+    def test_allowed_result_has_no_body(self):
+        result = enforce(compile_policy(TEST_POLICY), RequestContext(path="/public/a"))
+        assert result.body is None
+        assert result.body_bytes is None
+
+    def test_denied_result_bytes_match_body(self):
+        result = enforce(
+            compile_policy(TEST_POLICY),
+            RequestContext(path="/blocked/x", agent_id="did:web:bad-agent.com"),
+        )
+        assert result.body_bytes is not None
+        assert json.loads(result.body_bytes) == result.body
+        assert isinstance(result.body_source, LazyBody)
+
+    def test_uncompiled_denial_has_plain_body(self):
+        ctx = RequestContext(path="/blocked/x", agent_id="did:web:bad-agent.com")
+        result = enforce(TEST_POLICY, ctx)
+        assert result.body_source is None
+        assert result == enforce(compile_policy(TEST_POLICY), ctx)
+
@@ -0,0 +1,194 @@
+"""Tests for apop.codegen — Schema Code Generation (differential against jsonschema)."""
+
+import json
+import random
+from pathlib import Path
+from typing import Any
+
+import jsonschema
+import pytest
+
+from apop.codegen import compile_validator, generate_validator_source
+from apop.parser import APOP_SCHEMA, parse_policy_file, validate_policy
+
+EXAMPLES = Path(__file__).resolve().parents[3] / "examples"
+
+ACTIONS = ["read", "index", "extract", "summarize", "render", "api_call", "all", "hack"]
+JUNK: list[Any] = [None, True, False, 0, -1, 2.5, 3.0, "", "x", [], ["read"], {}, {"a": 1}]
+
+
+def reference_errors(schema: dict[str, Any], data: Any) -> list[tuple[tuple, str]]:
+    validator = jsonschema.Draft202012Validator(schema)
+    return [(tuple(e.absolute_path), e.message) for e in validator.iter_errors(data)]
+
+
+# ---------------------------------------------------------------------------
+# Random policy generator: mostly valid, with every kind of schema violation
+# ---------------------------------------------------------------------------
+
+
+class PolicyFuzzer:
+    def __init__(self, seed: int) -> None:
+        self.rng = random.Random(seed)
+
+    def maybe(self, p: float = 0.5) -> bool:
+        return self.rng.random() < p
+
+    def corrupt(self, value: Any) -> Any:
+        return self.rng.choice(JUNK) if self.maybe(0.08) else value
+
+    def obj(self, fields: dict[str, Any], required: tuple[str, ...] = ()) -> dict[str, Any]:
+        out = {}
+        for key, make in fields.items():
+            if key in required and not self.maybe(0.05) or self.maybe(0.4):
+                out[key] = self.corrupt(make())
+        if self.maybe(0.05):
+            out[self.rng.choice(["extra", "Allow", "zzz", "$x"])] = 1
+        keys = list(out)
+        self.rng.shuffle(keys)
+        return {key: out[key] for key in keys}
+
+    def actions(self) -> list[Any]:
+        return [self.corrupt(self.rng.choice(ACTIONS)) for _ in range(self.rng.randint(0, 3))]
+
+    def allow(self) -> Any:
+        return self.rng.choice([True, False]) if self.maybe() else self.actions()
+
+    def rate_limit(self) -> dict[str, Any]:
+        return self.obj(
+            {
+                "requests": lambda: self.rng.choice([0, 10, 1000, -5, 1.0, 1.5, True]),
+                "window": lambda: self.rng.choice(["minute", "hour", "day", "week"]),
+            },
+            ("requests", "window"),
+        )
+
+    def rule_fields(self) -> dict[str, Any]:
+        return {
+            "allow": self.allow,
+            "disallow": self.actions,
+            "actions": self.actions,
+            "rateLimit": self.rate_limit,
+            "requireVerification": lambda: self.rng.choice([True, False]),
+        }
+
+    def path_policy(self) -> dict[str, Any]:
+        fields = {"path": lambda: self.rng.choice(["/api/*", "/a/**", "/"]), **self.rule_fields()}
+        fields["agentAllowlist"] = lambda: [self.corrupt("did:web:a.example")]
+        fields["agentDenylist"] = lambda: [self.corrupt("did:web:b.example")]
+        return self.obj(fields, ("path",))
+
+    def verification(self) -> dict[str, Any]:
+        methods = ["pkix", "did", "verifiable-credential", "partner-token", "magic"]
+        return self.obj(
+            {
+                "method": lambda: (
+                    self.rng.choice(methods)
+                    if self.maybe()
+                    else [self.rng.choice(methods) for _ in range(self.rng.randint(0, 3))]
+                ),
+                "registry": lambda: "https://registry.example",
+                "trustedIssuers": lambda: [self.corrupt("did:web:issuer.example")],
+                "verificationEndpoint": lambda: "https://example.com/verify",
+            },
+            ("method",),
+        )
+
+    def policy(self) -> Any:
+        url = lambda: "https://example.com/x"  # noqa: E731
+        return self.obj(
+            {
+                "$schema": url,
+                "version": lambda: self.rng.choice(["1.0", "0.1", "2.0"]),
+                "policyUrl": url,
+                "defaultPolicy": lambda: self.obj(self.rule_fields(), ("allow",)),
+                "pathPolicies": lambda: [self.path_policy() for _ in range(self.rng.randint(0, 3))],
+                "verification": self.verification,
+                "contact": lambda: self.obj({"email": lambda: "a@b.c", "abuseUrl": url}),
+                "metadata": lambda: self.obj({"owner": lambda: "Example", "license": lambda: 1}),
+                "interop": lambda: self.obj(
+                    {"webmcpEnabled": lambda: True, "mcpServerUrl": url}
+                ),
+            },
+            ("version", "defaultPolicy"),
+        )
+
+
+# ---------------------------------------------------------------------------
+# Differential tests
+# ---------------------------------------------------------------------------
+
+
+class TestDifferential:
+    def test_matches_jsonschema_on_generated_policies(self):
+        validate = compile_validator(APOP_SCHEMA)
+        fuzzer = PolicyFuzzer(seed=2024)
+        invalid = 0
+        for _ in range(3000):
+            data = fuzzer.policy()
+            expected = reference_errors(APOP_SCHEMA, data)
+            assert validate(data) == expected, json.dumps(data)
+            invalid += bool(expected)
+        # The corpus exercises both outcomes
+        assert 500 < invalid < 2900
+
+    def test_fused_engine_matches_jsonschema(self):
+        fuzzer = PolicyFuzzer(seed=2025)
+        valid = 0
+        for _ in range(3000):
+            data = fuzzer.policy()
+            fused = validate_policy(data)
+            reference = validate_policy(data, engine="jsonschema")
+            assert fused == reference, json.dumps(data)
+            valid += fused.valid
+        assert 100 < valid < 2500
+
+    @pytest.mark.parametrize("data", JUNK)
+    def test_fused_engine_on_non_objects(self, data: Any):
+        assert validate_policy(data) == validate_policy(data, engine="jsonschema")
+
+    @pytest.mark.parametrize("data", JUNK)
+    def test_matches_jsonschema_on_non_objects(self, data: Any):
+        assert compile_validator(APOP_SCHEMA)(data) == reference_errors(APOP_SCHEMA, data)
+
+    @pytest.mark.parametrize("path", sorted(EXAMPLES.glob("*.json")), ids=lambda p: p.name)
+    def test_examples_agree(self, path: Path):
+        fused = parse_policy_file(path)
+        generated = parse_policy_file(path, engine="generated")
+        reference = parse_policy_file(path, engine="jsonschema")
+        assert fused.valid and generated.valid and reference.valid
+        assert fused.policy == generated.policy == reference.policy
+
+    def test_validate_policy_engines_agree(self):
+        data = {"version": "9", "defaultPolicy": {"allow": ["read", "fly"]}, "extra": 1}
+        generated = validate_policy(data, engine="generated")
+        reference = validate_policy(data, engine="jsonschema")
+        assert generated.errors == reference.errors
+        assert [e.path for e in generated.errors] == ["version", "defaultPolicy/allow", "/"]
+
+    def test_unknown_engine(self):
+        with pytest.raises(ValueError):
+            validate_policy({}, engine="fast")  # type: ignore[arg-type]
+
+
+# ---------------------------------------------------------------------------
+# Generator
+# ---------------------------------------------------------------------------
+
+
+class TestGenerator:
+    def test_rejects_unsupported_keywords(self):
+        with pytest.raises(ValueError, match="pattern"):
+            compile_validator({"type": "string", "pattern": "^a"})
+        with pytest.raises(ValueError):
+            compile_validator({"$ref": "https://example.com/schema.json"})
+
+    def test_one_of_reports_every_valid_branch(self):
+        schema = {"oneOf": [{"type": "integer"}, {"minimum": 0}, {"type": "number"}]}
+        for value in (1, -1.5, "x", 2.5):
+            assert compile_validator(schema)(value) == reference_errors(schema, value)
+
+    def test_source_is_straight_line(self):
+        source, _ = generate_validator_source(APOP_SCHEMA)
+        assert source.startswith("def validate(data):")
+        assert "$ref" not in source
@@ -0,0 +1,165 @@
+"""Tests for apop.compiler — Policy Compiler."""
+
+import pytest
+
+from apop.compiler import compile_policy
+from apop.enforcer import enforce
+from apop.headers import action_mask
+from apop.types import ALL_ACTIONS_MASK, AgentPolicy, PathPolicy, PolicyRule, RequestContext
+from tests.test_enforcer import TEST_POLICY
+
+CONTEXTS = [
+    RequestContext(path="/public/page", agent_name="Bot", agent_signature="sig"),
+    RequestContext(path="/public/page", agent_name="Bot", agent_intent="read, extract"),
+    RequestContext(path="/admin/settings", agent_name="Bot", agent_signature="sig"),
+    RequestContext(path="/api/v1/data", agent_name="Bot", agent_id="did:web:random.com"),
+    RequestContext(
+        path="/api/v1/data",
+        agent_name="Bot",
+        agent_id="did:web:perplexity.ai",
+        agent_signature="sig",
+    ),
+    RequestContext(path="/blocked/x", agent_name="Bot", agent_id="did:web:bad-agent.com"),
+    RequestContext(path="/deep/nested/a/b", agent_name="Bot"),
+    RequestContext(path="/unmatched/path", agent_name="Bot"),
+    RequestContext(path="/unmatched/path", agent_name="Bot", agent_vc="vc"),
+]
+
+
+class TestCompilePolicy:
+    @pytest.mark.parametrize("ctx", CONTEXTS, ids=lambda c: c.path)
+    def test_same_result_as_uncompiled(self, ctx: RequestContext):
+        expected = enforce(TEST_POLICY, ctx)
+        actual = enforce(compile_policy(TEST_POLICY), ctx)
+        assert actual.status == expected.status
+        assert actual.http_status == expected.http_status
+        assert dict(actual.headers) == dict(expected.headers)
+        assert actual.body == expected.body
+
+    def test_one_compiled_rule_per_path_policy(self):
+        compiled = compile_policy(TEST_POLICY)
+        assert TEST_POLICY.path_policies is not None
+        assert len(compiled.rules) == len(TEST_POLICY.path_policies)
+        assert [r.index for r in compiled.rules] == list(range(len(compiled.rules)))
+        assert compiled.default_rule.index == -1
+
+    def test_rule_for_falls_back_to_default(self):
+        compiled = compile_policy(TEST_POLICY)
+        assert compiled.rule_for("/admin/settings").effective.allow is False
+        assert compiled.rule_for("/nowhere") is compiled.default_rule
+
+    def test_results_reuse_precomputed_headers(self):
+        compiled = compile_policy(TEST_POLICY)
+        ctx = RequestContext(path="/public/page", agent_name="Bot")
+        assert enforce(compiled, ctx).headers is enforce(compiled, ctx).headers
+
+    def test_headers_are_read_only(self):
+        compiled = compile_policy(TEST_POLICY)
+        result = enforce(compiled, RequestContext(path="/public/page", agent_name="Bot"))
+        with pytest.raises(TypeError):
+            result.headers["Agent-Policy-Status"] = "denied"  # type: ignore[index]
+
+    def test_uncompiled_results_have_own_headers(self):
+        ctx = RequestContext(path="/public/page", agent_name="Bot")
+        first = enforce(TEST_POLICY, ctx)
+        assert isinstance(first.headers, dict)
+        first.headers["X-Extra"] = "1"  # type: ignore[index]
+        assert "X-Extra" not in enforce(TEST_POLICY, ctx).headers
+
+    def test_minimal_policy(self):
+        policy = AgentPolicy(version="1.0", default_policy=PolicyRule(allow=True))
+        compiled = compile_policy(policy)
+        assert compiled.rules == ()
+        result = enforce(compiled, RequestContext(path="/", agent_name="Bot"))
+        assert result.status == "allowed"
+        assert result.headers["Agent-Policy-Version"] == "1.0"
+
+    def test_rule_list_captured_at_compile_time(self):
+        policy = AgentPolicy(
+            version="1.0",
+            default_policy=PolicyRule(allow=True),
+            path_policies=[PathPolicy(path="/x/*", allow=False)],
+        )
+        compiled = compile_policy(policy)
+        policy.path_policies = []
+        result = enforce(compiled, RequestContext(path="/x/y", agent_name="Bot"))
+        assert result.http_status == 430
+
+
+class TestCompiledAgentLists:
+    def _policy(self, denylist: list[str]) -> AgentPolicy:
+        return AgentPolicy(
+            version="1.0",
+            default_policy=PolicyRule(allow=True),
+            path_policies=[
+                PathPolicy(path="/feed/**", agent_denylist=denylist),
+                PathPolicy(path="/vip/*", agent_allowlist=["did:web:vip.example"]),
+                PathPolicy(path="/open/*", agent_allowlist=[]),
+            ],
+        )
+
+    def test_lists_become_frozensets(self):
+        compiled = compile_policy(self._policy(["did:web:bad.example"]))
+        assert compiled.rules[0].agent_denylist == frozenset({"did:web:bad.example"})
+        assert compiled.rules[1].agent_allowlist == frozenset({"did:web:vip.example"})
+
+    def test_empty_list_is_not_enforced(self):
+        compiled = compile_policy(self._policy([]))
+        assert compiled.rules[0].agent_denylist is None
+        assert compiled.rules[2].agent_allowlist is None
+        result = enforce(compiled, RequestContext(path="/open/x", agent_name="Bot"))
+        assert result.status == "allowed"
+
+    def test_large_lists_are_exact(self):
+        denylist = [f"did:web:abuse{i}.example" for i in range(5000)]
+        compiled = compile_policy(self._policy(denylist))
+        assert isinstance(compiled.rules[0].agent_denylist, frozenset)
+
+        denied = enforce(
+            compiled,
+            RequestContext(path="/feed/a", agent_name="Bot", agent_id="did:web:abuse4242.example"),
+        )
+        assert denied.body is not None
+        assert denied.body["error"] == "agent_on_denylist"
+
+        allowed = enforce(
+            compiled,
+            RequestContext(path="/feed/a", agent_name="Bot", agent_id="did:web:fine.example"),
+        )
+        assert allowed.status == "allowed"
+
+
+class TestCompiledActionMasks:
+    def test_masks_follow_merged_rule(self):
+        compiled = compile_policy(TEST_POLICY)
+        public = compiled.rule_for("/public/page")
+        assert public.disallow_mask == action_mask(["extract", "automated_purchase"])
+        assert public.actions_mask == action_mask(["read", "index", "summarize"])
+        assert public.allow_mask == ALL_ACTIONS_MASK
+        assert compiled.rule_for("/admin/x").allow_mask == 0
+
+    def test_unknown_disallow_entries_fall_back_to_list_check(self):
+        policy = AgentPolicy(
+            version="1.0",
+            default_policy=PolicyRule(allow=True, disallow=["scrape"]),  # type: ignore[list-item]
+        )
+        compiled = compile_policy(policy)
+        assert compiled.default_rule.disallow_mask is None
+        result = enforce(
+            compiled, RequestContext(path="/", agent_name="Bot", agent_intent="read, scrape")
+        )
+        assert result.http_status == 430
+
+    def test_blocked_intents_listed_in_header_order(self):
+        result = enforce(
+            compile_policy(TEST_POLICY),
+            RequestContext(
+                path="/public/page",
+                agent_name="Bot",
+                agent_intent="automated_purchase, read, extract",
+            ),
+        )
+        assert result.body is not None
+        assert result.body["message"] == (
+            "Action(s) 'automated_purchase, extract' not permitted on this path."
+        )
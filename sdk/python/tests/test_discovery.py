@@ -1,12 +1,15 @@
 """Tests for apop.discovery — Policy Discovery Chain."""
 
+import asyncio
 import json
 
 import httpx
 import pytest
 
-from apop.discovery import DiscoveryOptions, discover_policy
-
+from apop.discovery import DiscoveryOptions, DiscoveryProgress, discover_many, discover_policy
+from apop.policycache import PolicyCache, freshness
+from apop.types import DiscoveryResult
+from tests.clock import FakeClock
 
 # ---------------------------------------------------------------------------
 # Fixtures
@@ -124,6 +127,27 @@ class TestDiscoverPolicy:
         assert result.policy is not None
         assert result.method == "meta-tag"
 
+    @pytest.mark.asyncio
+    async def test_root_page_is_fetched_once(self):
+        requested: list[str] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requested.append(request.url.path)
+            if request.url.path == "/":
+                return httpx.Response(200, text="<html><head></head></html>")
+            return httpx.Response(404)
+
+        async def dns_resolve(hostname: str, rrtype: str) -> list[list[str]]:
+            return []
+
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        result = await discover_policy(
+            "example.com",
+            DiscoveryOptions(http_client=client, dns_resolve=dns_resolve),
+        )
+        assert result.policy is None
+        assert requested == ["/.well-known/agent-policy.json", "/"]
+
     @pytest.mark.asyncio
     async def test_discover_from_dns_txt(self):
         policy_url = "https://example.com/dns-policy.json"
@@ -190,3 +214,443 @@ class TestDiscoverPolicy:
             DiscoveryOptions(http_client=client),
         )
         assert result.method == "well-known"
+
+
+# ---------------------------------------------------------------------------
+# Streaming meta-tag scanner
+# ---------------------------------------------------------------------------
+
+META_POLICY = "https://example.com/meta-policy.json"
+
+
+class ChunkedSite:
+    """Serves a homepage in small chunks and counts the bytes actually read."""
+
+    def __init__(self, page: str, chunk_size: int = 7, headers: dict | None = None) -> None:
+        self.page = page.encode()
+        self.chunk_size = chunk_size
+        self.headers = headers or {}
+        self.sent = 0
+
+    async def body(self):
+        for start in range(0, len(self.page), self.chunk_size):
+            chunk = self.page[start : start + self.chunk_size]
+            self.sent += len(chunk)
+            yield chunk
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        url = str(request.url)
+        if url == META_POLICY:
+            return httpx.Response(200, text=VALID_POLICY_JSON)
+        if url == "https://example.com/":
+            return httpx.Response(200, content=self.body(), headers=self.headers)
+        return httpx.Response(404)
+
+    async def discover(self, **options) -> DiscoveryResult:
+        client = httpx.AsyncClient(transport=httpx.MockTransport(self))
+        return await discover_policy(
+            "example.com",
+            DiscoveryOptions(http_client=client, dns_resolve=_no_dns, max_retries=0, **options),
+        )
+
+
+class TestMetaTagScanner:
+    @pytest.mark.parametrize(
+        "tag",
+        [
+            f'<meta name="agent-policy" content="{META_POLICY}">',
+            f"<META CONTENT='{META_POLICY}' Name='Agent-Policy' />",
+            f'<meta charset="utf-8"><meta id=x name=agent-policy content={META_POLICY}>',
+            f'<meta name="agent-policy"\n      content="{META_POLICY}"\n    />',
+            f'<meta data-note="1 > 0" name="agent-policy" content = \'{META_POLICY}\'>',
+        ],
+    )
+    async def test_finds_tag_split_across_chunks(self, tag: str):
+        site = ChunkedSite(f"<!doctype html><html><head><title>x</title>{tag}</head><body>")
+        result = await site.discover()
+        assert result.method == "meta-tag"
+        assert result.policy_url == META_POLICY
+
+    async def test_stops_at_end_of_head(self):
+        tag = f'<meta name="agent-policy" content="{META_POLICY}">'
+        site = ChunkedSite("<html><head></head><body>" + tag + "x" * 100_000, chunk_size=64)
+        result = await site.discover()
+        assert result.policy is None
+        assert site.sent < 1_000
+
+    async def test_stops_at_byte_cap(self):
+        tag = f'<meta name="agent-policy" content="{META_POLICY}">'
+        site = ChunkedSite(
+            "<html><head><style>" + "x" * 50_000 + "</style>" + tag, chunk_size=1024
+        )
+        assert (await site.discover(max_head_bytes=10_000)).policy is None
+        assert site.sent <= 11_000
+        assert (await site.discover()).method == "meta-tag"
+
+    async def test_skips_comments_and_scripts(self):
+        decoy = '<meta name="agent-policy" content="https://example.com/decoy.json">'
+        tag = f'<meta name="agent-policy" content="{META_POLICY}">'
+        page = f"<head><!-- {decoy} --><script>'{decoy}'</script>{tag}</head>"
+        assert (await ChunkedSite(page, chunk_size=3).discover()).policy_url == META_POLICY
+
+    async def test_long_comment_in_small_chunks(self):
+        tag = f'<meta name="agent-policy" content="{META_POLICY}">'
+        page = "<head><!--" + "x" * 200_000 + "-->" + tag
+        assert (await ChunkedSite(page, chunk_size=64).discover()).policy_url == META_POLICY
+
+    async def test_body_is_not_read_when_header_is_set(self):
+        site = ChunkedSite("<html>" + "x" * 10_000, headers={"Agent-Policy": META_POLICY})
+        result = await site.discover()
+        assert result.method == "http-header"
+        assert site.sent == 0
+
+
+# ---------------------------------------------------------------------------
+# Policy cache
+# ---------------------------------------------------------------------------
+
+NOW = 1_700_000_000.0
+WELL_KNOWN = "https://example.com/.well-known/agent-policy.json"
+
+
+class PolicyServer:
+    """Serves the well-known policy with caching headers and honors If-None-Match."""
+
+    def __init__(self, cache_control: str = "public, max-age=300", etag: str = '"v1"') -> None:
+        self.cache_control = cache_control
+        self.etag = etag
+        self.body = VALID_POLICY_JSON
+        self.requests: list[httpx.Request] = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        if str(request.url) != WELL_KNOWN:
+            return httpx.Response(404)
+        headers = {"Cache-Control": self.cache_control, "ETag": self.etag}
+        if request.headers.get("if-none-match") == self.etag:
+            return httpx.Response(304, headers=headers)
+        return httpx.Response(200, text=self.body, headers=headers)
+
+    def options(self, cache: PolicyCache) -> DiscoveryOptions:
+        client = httpx.AsyncClient(transport=httpx.MockTransport(self))
+        return DiscoveryOptions(http_client=client, cache=cache, max_retries=0)
+
+
+class TestPolicyCache:
+    async def test_fresh_entry_is_served_without_requests(self):
+        server = PolicyServer()
+        cache = PolicyCache(clock=FakeClock(NOW))
+        options = server.options(cache)
+        first = await discover_policy("example.com", options)
+        second = await discover_policy("Example.com", options)
+        assert second == first and second is not first
+        assert len(server.requests) == 1
+        assert (cache.hits, cache.misses) == (1, 1)
+        assert cache.get("example.com").expires == NOW + 300
+
+    async def test_callers_get_copies(self):
+        server = PolicyServer()
+        cache = PolicyCache(clock=FakeClock(NOW))
+        options = server.options(cache)
+        first = await discover_policy("example.com", options)
+        first.error = "changed by the caller"
+        first.latency_saved = 1.0
+        second = await discover_policy("example.com", options)
+        assert (second.error, second.latency_saved) == (None, None)
+        assert cache.get("example.com").result.error is None
+
+    async def test_expired_entry_is_revalidated_with_etag(self):
+        server = PolicyServer()
+        clock = FakeClock(NOW)
+        cache = PolicyCache(clock=clock)
+        options = server.options(cache)
+        first = await discover_policy("example.com", options)
+
+        clock.now += 301
+        second = await discover_policy("example.com", options)
+        assert second.policy is first.policy  # 304: not parsed again
+        assert server.requests[-1].headers["If-None-Match"] == '"v1"'
+        assert cache.revalidated == 1
+        assert cache.get("example.com").expires == clock.now + 300
+
+    async def test_changed_policy_replaces_entry(self):
+        server = PolicyServer()
+        clock = FakeClock(NOW)
+        cache = PolicyCache(clock=clock)
+        options = server.options(cache)
+        await discover_policy("example.com", options)
+
+        server.etag = '"v2"'
+        server.body = json.dumps({"version": "1.0", "defaultPolicy": {"allow": False}})
+        clock.now += 301
+        result = await discover_policy("example.com", options)
+        assert result.policy.default_policy.allow is False
+        assert cache.get("example.com").etag == '"v2"'
+        assert cache.revalidated == 0
+
+    async def test_no_store_is_not_cached(self):
+        server = PolicyServer(cache_control="no-store")
+        cache = PolicyCache(clock=FakeClock(NOW))
+        options = server.options(cache)
+        await discover_policy("example.com", options)
+        await discover_policy("example.com", options)
+        assert len(cache) == 0
+        assert len(server.requests) == 2
+
+    async def test_stale_while_revalidate(self):
+        server = PolicyServer(cache_control="max-age=60, stale-while-revalidate=30")
+        clock = FakeClock(NOW)
+        cache = PolicyCache(clock=clock)
+        options = server.options(cache)
+        first = await discover_policy("example.com", options)
+
+        clock.now += 70
+        stale = await discover_policy("example.com", options)
+        again = await discover_policy("example.com", options)
+        assert stale == first and again == first
+        assert cache.stale_hits == 2
+        assert cache.refreshing == 1  # one background refresh per domain
+        await cache.drain()
+        assert cache.revalidated == 1
+        assert cache.get("example.com").expires == clock.now + 60
+
+        # Past the stale window the caller waits for the network
+        clock.now += 200
+        await discover_policy("example.com", options)
+        assert cache.misses == 2
+
+    async def test_policy_gone_drops_entry(self):
+        server = PolicyServer()
+        clock = FakeClock(NOW)
+        cache = PolicyCache(clock=clock)
+        options = server.options(cache)
+        await discover_policy("example.com", options)
+
+        clock.now += 301
+        options.http_client = httpx.AsyncClient(
+            transport=httpx.MockTransport(lambda request: httpx.Response(404))
+        )
+        options.dns_resolve = _no_dns
+        result = await discover_policy("example.com", options)
+        assert result.policy is None
+        assert len(cache) == 0
+
+
+async def _no_dns(hostname: str, rrtype: str) -> list[list[str]]:
+    return []
+
+
+class TestFreshness:
+    def test_max_age_less_age(self):
+        assert freshness({"cache-control": "max-age=600", "age": "100"}, NOW) == (
+            NOW + 500,
+            NOW + 500,
+        )
+
+    def test_s_maxage_is_for_shared_caches(self):
+        assert freshness({"cache-control": "s-maxage=60, max-age=600"}, NOW) == (
+            NOW + 600,
+            NOW + 600,
+        )
+
+    def test_default_ttl(self):
+        assert freshness({}, NOW) == (NOW + 3600, NOW + 3600)
+
+    def test_expires_relative_to_date(self):
+        headers = {
+            "date": "Tue, 14 Nov 2023 22:00:00 GMT",
+            "expires": "Tue, 14 Nov 2023 22:10:00 GMT",
+        }
+        assert freshness(headers, NOW) == (NOW + 600, NOW + 600)
+        assert freshness({"expires": "0"}, NOW) == (NOW, NOW)
+
+    def test_no_cache_and_no_store(self):
+        assert freshness({"cache-control": "no-cache, max-age=600"}, NOW) == (NOW, NOW)
+        assert freshness({"cache-control": "public, no-store"}, NOW) is None
+
+
+# ---------------------------------------------------------------------------
+# Bulk discovery
+# ---------------------------------------------------------------------------
+
+
+class ConcurrencyProbe:
+    """Async handler recording the peak number of concurrent requests, overall and per host."""
+
+    def __init__(self, handler) -> None:
+        self.handler = handler
+        self.active: dict[str, int] = {}
+        self.peak = 0
+        self.peak_per_host: dict[str, int] = {}
+        self.requests = 0
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        self.requests += 1
+        self.active[host] = self.active.get(host, 0) + 1
+        self.peak = max(self.peak, sum(self.active.values()))
+        self.peak_per_host[host] = max(self.peak_per_host.get(host, 0), self.active[host])
+        try:
+            await asyncio.sleep(0.001)
+            return self.handler(request)
+        finally:
+            self.active[host] -= 1
+
+
+def bulk_handler(request: httpx.Request) -> httpx.Response:
+    """Even domains publish a well-known policy; odd ones point at a shared CDN."""
+    host = request.url.host
+    if host == "cdn.example":
+        return httpx.Response(200, text=VALID_POLICY_JSON)
+    index = int(host.split(".")[0][1:])
+    if request.url.path == "/.well-known/agent-policy.json":
+        if index % 2 == 0:
+            return httpx.Response(200, text=VALID_POLICY_JSON)
+        return httpx.Response(404)
+    if index % 4 == 1:
+        return httpx.Response(200, headers={"Agent-Policy": f"https://cdn.example/{host}.json"})
+    return httpx.Response(200, text="<html></html>")
+
+
+class TestDiscoverMany:
+    async def test_discovers_every_domain_within_limits(self):
+        probe = ConcurrencyProbe(bulk_handler)
+        progress = DiscoveryProgress()
+        domains = [f"d{i}.example" for i in range(200)]
+        results = {}
+        async for domain, result in discover_many(
+            domains,
+            DiscoveryOptions(max_retries=0, dns_resolve=_no_dns),
+            concurrency=16,
+            per_host_limit=2,
+            progress=progress,
+            transport=httpx.MockTransport(probe),
+        ):
+            results[domain] = result
+            assert progress.in_flight <= 16
+
+        assert set(results) == set(domains)
+        assert results["d0.example"].method == "well-known"
+        assert results["d1.example"].method == "http-header"
+        assert results["d3.example"].policy is None
+        assert (progress.submitted, progress.completed, progress.found) == (200, 200, 150)
+        assert progress.not_found == 50
+        assert probe.peak <= 16
+        assert probe.peak_per_host["cdn.example"] <= 2
+
+    async def test_accepts_async_iterable(self):
+        async def domains():
+            for i in range(10):
+                yield f"d{i * 2}.example"
+
+        found = [
+            result.method
+            async for _, result in discover_many(
+                domains(), transport=httpx.MockTransport(bulk_handler)
+            )
+        ]
+        assert found == ["well-known"] * 10
+
+    async def test_stopping_early_cancels_the_rest(self):
+        probe = ConcurrencyProbe(bulk_handler)
+        crawl = discover_many(
+            (f"d{i}.example" for i in range(10_000)),
+            DiscoveryOptions(max_retries=0, dns_resolve=_no_dns),
+            concurrency=8,
+            transport=httpx.MockTransport(probe),
+        )
+        async for _ in crawl:
+            break
+        await crawl.aclose()
+        assert probe.requests < 100
+
+    async def test_rejects_bad_limits(self):
+        with pytest.raises(ValueError):
+            async for _ in discover_many(["example.com"], concurrency=0):
+                pass
+
+
+# ---------------------------------------------------------------------------
+# Hedged discovery
+# ---------------------------------------------------------------------------
+
+DELAY = 0.05
+
+
+def slow_site(well_known: bool = False, header: bool = False, wk_delay: float = DELAY):
+    """A site whose well-known URI and root page each take a while to answer."""
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        if path == "/policy.json":
+            return httpx.Response(200, text=VALID_POLICY_JSON)
+        if path == "/.well-known/agent-policy.json":
+            await asyncio.sleep(wk_delay)
+            return httpx.Response(200 if well_known else 404, text=VALID_POLICY_JSON)
+        await asyncio.sleep(DELAY)
+        headers = {"Agent-Policy": "https://example.com/policy.json"} if header else {}
+        return httpx.Response(200, text="<html><head></head></html>", headers=headers)
+
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+class TestHedgedDiscovery:
+    async def test_dns_only_domain_does_not_wait_for_each_step(self):
+        async def dns_resolve(hostname: str, rrtype: str) -> list[list[str]]:
+            await asyncio.sleep(DELAY)
+            return [["apop=1 policy=https://example.com/policy.json"]]
+
+        sequential = await discover_policy(
+            "example.com", DiscoveryOptions(http_client=slow_site(), dns_resolve=dns_resolve)
+        )
+        hedged = await discover_policy(
+            "example.com",
+            DiscoveryOptions(http_client=slow_site(), dns_resolve=dns_resolve, hedged=True),
+        )
+        assert sequential.method == hedged.method == "dns-txt"
+        assert sequential.latency_saved is None
+        # Three DELAY-long steps ran side by side instead of back to back
+        assert hedged.latency_saved > DELAY
+
+    async def test_priority_wins_over_speed(self):
+        cancelled = []
+
+        async def dns_resolve(hostname: str, rrtype: str) -> list[list[str]]:
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(hostname)
+                raise
+            return []
+
+        # The header answers first, but the well-known URI has priority
+        result = await discover_policy(
+            "example.com",
+            DiscoveryOptions(
+                http_client=slow_site(well_known=True, header=True, wk_delay=3 * DELAY),
+                dns_resolve=dns_resolve,
+                hedged=True,
+            ),
+        )
+        assert result.method == "well-known"
+        assert cancelled == ["_agentpolicy.example.com"]
+
+    async def test_lower_priority_success_waits_for_higher_to_fail(self):
+        result = await discover_policy(
+            "example.com",
+            DiscoveryOptions(
+                http_client=slow_site(header=True, wk_delay=3 * DELAY),
+                dns_resolve=_no_dns,
+                hedged=True,
+            ),
+        )
+        assert result.method == "http-header"
+        assert result.latency_saved > 0
+
+    async def test_nothing_found(self):
+        result = await discover_policy(
+            "example.com",
+            DiscoveryOptions(http_client=slow_site(), dns_resolve=_no_dns, hedged=True),
+        )
+        assert result.policy is None
+        assert result.latency_saved > 0
@@ -1,8 +1,12 @@
 """Tests for apop.enforcer — Policy Enforcement Engine."""
 
+import asyncio
+
 import pytest
 
-from apop.enforcer import enforce
+from apop.compiler import compile_policy
+from apop.enforcer import DecisionCache, aenforce, enforce, enforce_many
+from apop.ratelimit import RateLimiter
 from apop.types import (
     AgentPolicy,
     PathPolicy,
@@ -441,3 +445,259 @@ class TestMinimalPolicy:
         )
         assert result.status == "denied"
         assert result.http_status == 430
+
+
+# ---------------------------------------------------------------------------
+# Decision cache
+# ---------------------------------------------------------------------------
+
+
+class TestDecisionCache:
+    def test_hit_returns_same_decision(self):
+        cache = DecisionCache(maxsize=8)
+        ctx = RequestContext(path="/public/page", agent_name="Bot", agent_intent="read")
+        first = cache.enforce(TEST_POLICY, ctx)
+        second = cache.enforce(TEST_POLICY, ctx)
+        assert second is first
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_key_includes_signature_presence(self):
+        cache = DecisionCache(maxsize=8)
+        unsigned = cache.enforce(
+            TEST_POLICY, RequestContext(path="/unmatched/path", agent_name="Bot")
+        )
+        signed = cache.enforce(
+            TEST_POLICY,
+            RequestContext(path="/unmatched/path", agent_name="Bot", agent_vc="vc"),
+        )
+        assert unsigned.http_status == 439
+        assert signed.http_status == 200
+        assert cache.misses == 2
+
+    def test_agent_name_does_not_split_entries(self):
+        cache = DecisionCache(maxsize=8)
+        cache.enforce(TEST_POLICY, RequestContext(path="/public/page", agent_name="A"))
+        cache.enforce(TEST_POLICY, RequestContext(path="/public/page", agent_name="B"))
+        assert cache.hits == 1
+
+    def test_evicts_least_recently_used(self):
+        cache = DecisionCache(maxsize=2)
+        a = RequestContext(path="/public/a", agent_name="Bot")
+        b = RequestContext(path="/public/b", agent_name="Bot")
+        c = RequestContext(path="/public/c", agent_name="Bot")
+        cache.enforce(TEST_POLICY, a)
+        cache.enforce(TEST_POLICY, b)
+        cache.enforce(TEST_POLICY, a)  # a is now most recent
+        cache.enforce(TEST_POLICY, c)  # evicts b
+        assert len(cache) == 2
+        cache.enforce(TEST_POLICY, a)
+        assert cache.hits == 2
+        cache.enforce(TEST_POLICY, b)
+        assert cache.misses == 4
+
+    def test_invalidated_when_policy_replaced(self):
+        cache = DecisionCache(maxsize=8)
+        ctx = RequestContext(path="/", agent_name="Bot")
+        allow_all = compile_policy(
+            AgentPolicy(version="1.0", default_policy=PolicyRule(allow=True))
+        )
+        deny_all = compile_policy(
+            AgentPolicy(version="1.0", default_policy=PolicyRule(allow=False))
+        )
+        assert cache.enforce(allow_all, ctx).http_status == 200
+        assert cache.enforce(deny_all, ctx).http_status == 430
+        assert cache.hits == 0
+        assert len(cache) == 1
+
+    def test_clear_resets_counters(self):
+        cache = DecisionCache(maxsize=8)
+        ctx = RequestContext(path="/", agent_name="Bot")
+        cache.enforce(TEST_POLICY, ctx)
+        cache.enforce(TEST_POLICY, ctx)
+        cache.clear()
+        assert len(cache) == 0
+        assert (cache.hits, cache.misses) == (0, 0)
+
+    def test_rejects_non_positive_size(self):
+        with pytest.raises(ValueError):
+            DecisionCache(maxsize=0)
+
+
+# ---------------------------------------------------------------------------
+# Batch enforcement
+# ---------------------------------------------------------------------------
+
+BATCH_ROWS = [
+    ("/public/page", None, None, False),
+    ("/public/page", None, "read, extract", False),
+    ("/admin/settings", None, None, True),
+    ("/api/v1/data", "did:web:random.com", None, True),
+    ("/api/v1/data", "did:web:perplexity.ai", "read", True),
+    ("/blocked/x", "did:web:bad-agent.com", None, False),
+    ("/deep/nested/a/b", None, None, False),
+    ("/unmatched/path", None, None, False),
+    ("/unmatched/path", None, None, True),
+]
+
+
+class TestEnforceMany:
+    def test_matches_enforce_row_by_row(self):
+        paths, ids, intents, signed = (list(col) for col in zip(*BATCH_ROWS))
+        result = enforce_many(TEST_POLICY, paths, ids, intents, signed)
+
+        for i, (path, agent_id, intent, sig) in enumerate(BATCH_ROWS):
+            expected = enforce(
+                TEST_POLICY,
+                RequestContext(
+                    path=path,
+                    agent_name="Bot",
+                    agent_id=agent_id,
+                    agent_intent=intent,
+                    agent_signature="sig" if sig else None,
+                ),
+            )
+            assert result.http_status[i] == expected.http_status, BATCH_ROWS[i]
+
+    def test_rule_indices(self):
+        result = enforce_many(TEST_POLICY, ["/public/a", "/admin/b", "/nowhere", "/public/a"])
+        assert list(result.rule_index) == [0, 1, -1, 0]
+        assert result.http_status.itemsize == 2
+
+    def test_empty_batch(self):
+        result = enforce_many(TEST_POLICY, [])
+        assert len(result.http_status) == 0
+        assert len(result.rule_index) == 0
+
+    def test_mismatched_columns(self):
+        with pytest.raises(ValueError):
+            enforce_many(TEST_POLICY, ["/a", "/b"], agent_ids=["did:web:x"])
+
+    def test_numpy_columns(self):
+        np = pytest.importorskip("numpy")
+        paths = np.array(["/public/page", "/admin/settings", "/unmatched/path"])
+        signed = np.array([False, True, False])
+        result = enforce_many(TEST_POLICY, paths, has_signature=signed)
+        statuses = np.frombuffer(result.http_status, dtype=np.uint16)
+        assert statuses.tolist() == [200, 430, 439]
+
+
+# ---------------------------------------------------------------------------
+# Async enforcement
+# ---------------------------------------------------------------------------
+
+
+class CountingLimiter:
+    """Async limiter that records calls and answers after a short wait."""
+
+    def __init__(self) -> None:
+        self.inner = RateLimiter(clock=lambda: 1_700_000_000.0)
+        self.calls = 0
+
+    async def ahit(self, key, rate_limit, now=None):
+        self.calls += 1
+        await asyncio.sleep(0.05)
+        return self.inner.hit(key, rate_limit, now)
+
+    async def ahit_many(self, hits, now=None):
+        return [await self.ahit(key, rate_limit, now) for key, rate_limit in hits]
+
+
+class TestAenforce:
+    SIGNED = {"agent_name": "Bot", "agent_id": "did:web:bot.example", "agent_signature": "sig"}
+
+    @pytest.mark.parametrize("compiled", [False, True], ids=["policy", "compiled"])
+    async def test_same_results_as_enforce(self, compiled: bool):
+        policy = compile_policy(TEST_POLICY) if compiled else TEST_POLICY
+        for path in ("/public/page", "/admin/x", "/api/v1/data", "/blocked/x", "/other"):
+            ctx = RequestContext(path=path, agent_name="Bot", agent_id="did:web:bad-agent.com")
+            expected = enforce(policy, ctx)
+            result = await aenforce(policy, ctx)
+            assert (result.http_status, result.body) == (expected.http_status, expected.body)
+
+    async def test_fast_path_awaits_nothing(self):
+        limiter = CountingLimiter()
+        ctx = RequestContext(path="/admin/x", agent_name="Bot")
+        coro = aenforce(TEST_POLICY, ctx, limiter)
+        # A coroutine that never suspends finishes on its first send()
+        with pytest.raises(StopIteration) as done:
+            coro.send(None)
+        assert done.value.value.http_status == 430
+        assert limiter.calls == 0
+
+    async def test_async_rate_limiter(self):
+        policy = AgentPolicy(
+            version="1.0",
+            default_policy=PolicyRule(allow=True, rate_limit=RateLimit(requests=1, window="hour")),
+        )
+        limiter = CountingLimiter()
+        ctx = RequestContext(path="/", agent_name="Bot")
+        assert (await aenforce(policy, ctx, limiter)).http_status == 200
+        limited = await aenforce(policy, ctx, limiter)
+        assert limited.http_status == 438
+        assert limited.body["error"] == "agent_rate_limited"
+
+    async def test_sync_rate_limiter(self):
+        policy = compile_policy(
+            AgentPolicy(
+                version="1.0",
+                default_policy=PolicyRule(
+                    allow=True, rate_limit=RateLimit(requests=1, window="hour")
+                ),
+            )
+        )
+
+        class SyncOnly:
+            def __init__(self) -> None:
+                self.inner = RateLimiter()
+
+            def hit(self, key, rate_limit, now=None):
+                return self.inner.hit(key, rate_limit, now)
+
+        limiter = SyncOnly()
+        ctx = RequestContext(path="/", agent_name="Bot")
+        statuses = [(await aenforce(policy, ctx, limiter)).http_status for _ in range(2)]
+        assert statuses == [200, 438]
+
+    async def test_verifier_rejects(self):
+        async def verifier(ctx: RequestContext) -> bool:
+            return ctx.agent_signature == "good"
+
+        ctx = RequestContext(path="/other", **self.SIGNED)
+        result = await aenforce(compile_policy(TEST_POLICY), ctx, verifier=verifier)
+        assert result.http_status == 439
+        assert result.body["error"] == "agent_verification_required"
+
+        ok = RequestContext(path="/other", agent_name="Bot", agent_signature="good")
+        assert (await aenforce(TEST_POLICY, ok, verifier=verifier)).http_status == 200
+
+    async def test_verifier_skipped_when_not_required(self):
+        async def verifier(ctx: RequestContext) -> bool:
+            raise AssertionError("not called")
+
+        ctx = RequestContext(path="/public/page", agent_name="Bot")
+        assert (await aenforce(TEST_POLICY, ctx, verifier=verifier)).http_status == 200
+
+    async def test_lookups_run_concurrently(self):
+        async def verifier(ctx: RequestContext) -> bool:
+            await asyncio.sleep(0.05)
+            return True
+
+        limiter = CountingLimiter()
+        ctx = RequestContext(path="/other", **self.SIGNED)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        result = await aenforce(TEST_POLICY, ctx, limiter, verifier)
+        assert loop.time() - start < 0.09
+        assert result.http_status == 200
+        assert result.headers["Agent-Policy-Rate-Remaining"] == "99"
+
+    async def test_decision_cache(self):
+        async def verifier(ctx: RequestContext) -> bool:
+            return False
+
+        cache = DecisionCache()
+        compiled = compile_policy(TEST_POLICY)
+        ctx = RequestContext(path="/other", **self.SIGNED)
+        for _ in range(3):
+            assert (await cache.aenforce(compiled, ctx, verifier=verifier)).http_status == 439
+        assert cache.hits == 2
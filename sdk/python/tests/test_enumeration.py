@@ -0,0 +1,117 @@
+"""Tests for apop.enumeration — Anti-Enumeration."""
+
+import pytest
+
+from apop.enumeration import EnumerationGuard, hll_estimate
+from apop.types import AgentPolicy, PolicyRule
+from tests.clock import FakeClock
+
+NOW = 1_700_000_000.0  # start of a minute window
+
+
+POLICY = AgentPolicy(
+    version="1.0",
+    policy_url="https://example.com/.well-known/agent-policy.json",
+    default_policy=PolicyRule(allow=True),
+)
+
+
+# ---------------------------------------------------------------------------
+# HyperLogLog estimate
+# ---------------------------------------------------------------------------
+
+
+class TestHllEstimate:
+    def test_empty(self):
+        assert hll_estimate(bytes(64)) == 0
+
+    @pytest.mark.parametrize("count", [10, 100, 1000, 10_000])
+    def test_within_error_bounds(self, count: int):
+        guard = EnumerationGuard(width=1, depth=1, precision=10, max_ids=10**9)
+        for i in range(count):
+            guard.check("10.0.0.1", f"did:web:bot{i}.example", now=NOW)
+        assert guard.distinct_ids("10.0.0.1", now=NOW) == pytest.approx(count, rel=0.1)
+
+
+# ---------------------------------------------------------------------------
+# EnumerationGuard
+# ---------------------------------------------------------------------------
+
+
+class TestEnumerationGuard:
+    @pytest.fixture
+    def clock(self) -> FakeClock:
+        return FakeClock(NOW)
+
+    def test_repeated_id_is_not_enumeration(self, clock: FakeClock):
+        guard = EnumerationGuard(max_ids=5, clock=clock)
+        assert all(guard.check("10.0.0.1", "did:web:bot.example") == 0 for _ in range(1000))
+        assert guard.distinct_ids("10.0.0.1") == pytest.approx(1, abs=0.1)
+
+    def test_blocks_ip_cycling_ids(self, clock: FakeClock):
+        guard = EnumerationGuard(max_ids=20, block_for=300, clock=clock)
+        results = [guard.check("10.0.0.1", f"did:web:bot{i}.example") for i in range(100)]
+        first = next(i for i, blocked in enumerate(results) if blocked)
+        assert 15 <= first <= 30
+        assert all(results[first:])
+        assert guard.blocks == 1
+        assert len(guard) == 1
+
+        # The block covers every request from the IP, with or without an ID
+        assert guard.check("10.0.0.1", None) == 300
+        assert guard.check("10.0.0.2", "did:web:bot0.example") == 0
+
+    def test_block_expires(self, clock: FakeClock):
+        guard = EnumerationGuard(max_ids=5, window=60, block_for=30, clock=clock)
+        for i in range(50):
+            guard.check("10.0.0.1", f"id{i}")
+        clock.now += 10
+        assert guard.check("10.0.0.1", None) == 20
+        clock.now += 20
+        assert guard.check("10.0.0.1", None) == 0
+        assert len(guard) == 0
+
+    def test_ids_are_forgotten_after_two_windows(self, clock: FakeClock):
+        guard = EnumerationGuard(max_ids=30, window=60, clock=clock)
+        for i in range(20):
+            guard.check("10.0.0.1", f"id{i}")
+        clock.now += 60
+        assert guard.distinct_ids("10.0.0.1") > 15  # previous window still counts
+        clock.now += 60
+        assert guard.distinct_ids("10.0.0.1") == 0
+
+    def test_memory_is_constant(self, clock: FakeClock):
+        guard = EnumerationGuard(width=64, depth=2, precision=4, max_blocked=10, clock=clock)
+        before = guard.memory
+        for ip in range(200):
+            for i in range(30):
+                guard.check(f"10.0.{ip // 256}.{ip % 256}", f"ip{ip}-id{i}")
+        assert guard.memory == before == 2 * 2 * 64 * 16
+        assert len(guard) == 10
+
+    def test_no_ip_passes(self, clock: FakeClock):
+        guard = EnumerationGuard(max_ids=1, clock=clock)
+        assert all(guard.check(None, f"id{i}") == 0 for i in range(50))
+
+    def test_enforce_result(self, clock: FakeClock):
+        guard = EnumerationGuard(max_ids=3, block_for=120, clock=clock)
+        assert guard.enforce(POLICY, "10.0.0.1", "id0") is None
+        for i in range(20):
+            guard.check("10.0.0.1", f"id{i}")
+        result = guard.enforce(POLICY, "10.0.0.1", "id0")
+        assert result is not None
+        assert result.http_status == 438
+        assert result.status == "rate-limited"
+        assert result.headers["Retry-After"] == "120"
+        assert result.headers["Agent-Policy"] == POLICY.policy_url
+        # Nothing about the policy's rules is disclosed
+        assert set(result.body) == {"error", "message", "retryAfter"}
+        assert "Agent-Policy-Rate-Limit" not in result.headers
+
+    def test_rejects_bad_options(self):
+        with pytest.raises(ValueError):
+            EnumerationGuard(max_ids=0)
+        with pytest.raises(ValueError):
+            EnumerationGuard(window=0)
+        with pytest.raises(ValueError):
+            EnumerationGuard(precision=3)
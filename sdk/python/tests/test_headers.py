@@ -3,16 +3,18 @@
 import pytest
 
 from apop.headers import (
+    action_mask,
     build_allowed_headers,
     build_denied_headers,
     build_discovery_headers,
     build_rate_limited_headers,
     build_verification_headers,
     is_agent,
+    parse_intent_mask,
     parse_intents,
     parse_request_headers,
 )
-from apop.types import AgentRequestHeaders, RateLimit
+from apop.types import ACTION_BITS, ALL_ACTIONS_MASK, ACTION_TYPES, AgentRequestHeaders, RateLimit
 
 
 # ---------------------------------------------------------------------------
@@ -97,6 +99,38 @@ class TestParseIntents:
         assert parse_intents("  read , summarize  ") == ["read", "summarize"]
 
 
+# ---------------------------------------------------------------------------
+# Action bitmask tests
+# ---------------------------------------------------------------------------
+
+
+class TestActionMasks:
+    def test_one_bit_per_action_type(self):
+        assert sorted(ACTION_BITS.values()) == [1 << i for i in range(len(ACTION_TYPES))]
+        assert action_mask(ACTION_TYPES) == ALL_ACTIONS_MASK
+
+    def test_action_mask_of_list(self):
+        assert action_mask(["read", "index"]) == ACTION_BITS["read"] | ACTION_BITS["index"]
+        assert action_mask([]) == 0
+        assert action_mask(None) == 0
+
+    def test_action_mask_rejects_unknown_actions(self):
+        assert action_mask(["read", "scrape"]) is None
+
+    def test_intent_mask_matches_parse_intents(self):
+        assert parse_intent_mask("  read , extract ") == action_mask(["read", "extract"])
+
+    def test_intent_mask_ignores_unknown_intents(self):
+        assert parse_intent_mask("scrape, read") == ACTION_BITS["read"]
+        assert parse_intent_mask(None) == 0
+
+    def test_intent_mask_is_cached(self):
+        parse_intent_mask.cache_clear()
+        parse_intent_mask("read, summarize")
+        parse_intent_mask("read, summarize")
+        assert parse_intent_mask.cache_info().hits == 1
+
+
 # ---------------------------------------------------------------------------
 # buildDiscoveryHeaders tests
 # ---------------------------------------------------------------------------
@@ -0,0 +1,157 @@
+"""Tests for apop.lease — Leased Rate Limiting."""
+
+import pytest
+
+from apop.compiler import compile_policy
+from apop.enforcer import enforce
+from apop.lease import LeasedRateLimiter
+from apop.redis import RedisRateLimiter
+from apop.types import AgentPolicy, PolicyRule, RateLimit, RequestContext
+from tests.clock import FakeClock
+from tests.resp_server import RespServer
+
+NOW = 1_699_999_980.0  # start of a minute window
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    return FakeClock(NOW)
+
+
+@pytest.fixture
+def backend(clock: FakeClock):
+    with RespServer(clock=clock) as server:
+        client = RedisRateLimiter("127.0.0.1", server.port, clock=clock)
+        yield client
+        client.close()
+
+
+class TestLeasedRateLimiter:
+    def test_one_backend_call_per_lease(self, backend: RedisRateLimiter, clock: FakeClock):
+        limiter = LeasedRateLimiter(backend, lease_fraction=0.1, lease_ttl=3600, clock=clock)
+        limit = RateLimit(requests=100, window="hour")
+        decisions = [limiter.hit("hot", limit) for _ in range(100)]
+        assert all(d.allowed for d in decisions)
+        assert limiter.backend_calls == 10
+        assert backend.round_trips == 10
+        assert decisions[0].remaining == 99
+        assert decisions[-1].remaining == 0
+
+    def test_never_exceeds_budget_across_workers(
+        self, backend: RedisRateLimiter, clock: FakeClock
+    ):
+        limit = RateLimit(requests=25, window="hour")
+        workers = [
+            LeasedRateLimiter(backend, lease_fraction=0.2, lease_ttl=3600, clock=clock)
+            for _ in range(3)
+        ]
+        allowed = sum(workers[i % 3].hit("agent", limit).allowed for i in range(100))
+        assert allowed == 25
+
+    def test_exhausted_budget_is_cached_until_lease_expires(
+        self, backend: RedisRateLimiter, clock: FakeClock
+    ):
+        limiter = LeasedRateLimiter(backend, lease_fraction=0.5, lease_ttl=5, clock=clock)
+        limit = RateLimit(requests=2, window="minute")
+        assert [limiter.hit("a", limit).allowed for _ in range(2)] == [True, True]
+        calls = limiter.backend_calls
+
+        denied = [limiter.hit("a", limit) for _ in range(10)]
+        assert not any(d.allowed for d in denied)
+        assert denied[0].retry_after == 60
+        assert limiter.backend_calls == calls
+
+        clock.now += 5
+        assert not limiter.hit("a", limit).allowed
+        assert limiter.backend_calls == calls + 1
+
+    def test_zero_request_limit(self, backend: RedisRateLimiter, clock: FakeClock):
+        limiter = LeasedRateLimiter(backend, clock=clock)
+        denied = limiter.hit("a", RateLimit(requests=0, window="minute"))
+        assert not denied.allowed
+        assert denied.retry_after == 60
+        assert limiter.backend_calls == 0
+
+    def test_expired_lease_returns_unused_units(
+        self, backend: RedisRateLimiter, clock: FakeClock
+    ):
+        limit = RateLimit(requests=10, window="minute")
+        idle = LeasedRateLimiter(backend, lease_fraction=1.0, lease_ttl=5, clock=clock)
+        busy = LeasedRateLimiter(backend, lease_fraction=0.1, lease_ttl=5, clock=clock)
+
+        assert idle.hit("a", limit).allowed  # leases all 10, spends 1
+        assert not busy.hit("a", limit).allowed
+
+        # idle stops seeing "a"; its next lease for any key returns the 9 units
+        clock.now += 5
+        idle.hit("b", limit)
+        assert len(idle) == 1
+        assert sum(busy.hit("a", limit).allowed for _ in range(20)) == 9
+
+    def test_release_expired(self, backend: RedisRateLimiter, clock: FakeClock):
+        limit = RateLimit(requests=4, window="minute")
+        first = LeasedRateLimiter(backend, lease_fraction=1.0, lease_ttl=5, clock=clock)
+        second = LeasedRateLimiter(backend, lease_fraction=1.0, lease_ttl=5, clock=clock)
+        assert first.hit("a", limit).allowed
+        clock.now += 5
+        first.release_expired()
+        assert len(first) == 0
+        assert sum(second.hit("a", limit).allowed for _ in range(5)) == 3
+
+    def test_release_all(self, backend: RedisRateLimiter, clock: FakeClock):
+        limit = RateLimit(requests=10, window="minute")
+        first = LeasedRateLimiter(backend, lease_fraction=1.0, lease_ttl=60, clock=clock)
+        second = LeasedRateLimiter(backend, lease_fraction=0.5, lease_ttl=60, clock=clock)
+        assert first.hit("a", limit).allowed
+        assert not second.hit("a", limit).allowed
+
+        first.release_all()
+        second.release_all()
+        assert sum(second.hit("a", limit).allowed for _ in range(20)) == 9
+
+    def test_window_rollover_starts_a_new_lease(
+        self, backend: RedisRateLimiter, clock: FakeClock
+    ):
+        limiter = LeasedRateLimiter(backend, lease_fraction=1.0, lease_ttl=3600, clock=clock)
+        limit = RateLimit(requests=3, window="minute")
+        assert sum(limiter.hit("a", limit).allowed for _ in range(5)) == 3
+        clock.now += 60
+        assert sum(limiter.hit("a", limit).allowed for _ in range(5)) == 3
+        assert limiter.backend_calls == 2
+
+    def test_lease_size(self, backend: RedisRateLimiter):
+        limiter = LeasedRateLimiter(backend, lease_fraction=0.05)
+        assert limiter.lease_size(RateLimit(requests=1000, window="hour")) == 50
+        assert limiter.lease_size(RateLimit(requests=3, window="hour")) == 1
+
+    def test_rejects_bad_options(self, backend: RedisRateLimiter):
+        with pytest.raises(ValueError):
+            LeasedRateLimiter(backend, lease_fraction=0)
+        with pytest.raises(ValueError):
+            LeasedRateLimiter(backend, lease_ttl=0)
+
+    def test_backend_error_keeps_pending_returns(self, clock: FakeClock):
+        class FailingBackend:
+            def lease_many(self, acquire, release=(), now=None):
+                raise ConnectionError("down")
+
+        limiter = LeasedRateLimiter(FailingBackend(), clock=clock)
+        limiter._queue_return("a", RateLimit(requests=1, window="hour"), 0, 1)
+        with pytest.raises(ConnectionError):
+            limiter.hit("b", RateLimit(requests=1, window="hour"))
+        assert len(limiter._returns) == 1
+
+    def test_enforce_with_leases(self, backend: RedisRateLimiter, clock: FakeClock):
+        policy = compile_policy(
+            AgentPolicy(
+                version="1.0",
+                default_policy=PolicyRule(
+                    allow=True, rate_limit=RateLimit(requests=2, window="minute")
+                ),
+            )
+        )
+        limiter = LeasedRateLimiter(backend, lease_fraction=1.0, clock=clock)
+        ctx = RequestContext(path="/", agent_name="Bot")
+        statuses = [enforce(policy, ctx, limiter).http_status for _ in range(3)]
+        assert statuses == [200, 200, 438]
+        assert limiter.backend_calls == 1
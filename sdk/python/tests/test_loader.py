@@ -0,0 +1,153 @@
+"""Tests for apop.loader — Policy Loader."""
+
+import json
+import os
+import time
+from pathlib import Path
+
+import pytest
+
+from apop.loader import PolicyLoader, load_policy_file
+
+
+def policy_json(allow: object = True, version: str = "1.0") -> str:
+    return json.dumps({"version": version, "defaultPolicy": {"allow": allow}})
+
+
+def write(path: Path, text: str) -> None:
+    """Write text and move the mtime on, so back-to-back writes are told apart."""
+    before = path.stat().st_mtime_ns if path.exists() else 0
+    path.write_text(text, encoding="utf-8")
+    if path.stat().st_mtime_ns <= before:
+        os.utime(path, ns=(before + 1_000_000, before + 1_000_000))
+
+
+def replace(path: Path, text: str) -> None:
+    """Replace the file by rename, as deploy tools and many editors do."""
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(text, encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def wait_for(condition, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+@pytest.fixture
+def policy_file(tmp_path: Path) -> Path:
+    path = tmp_path / "agent-policy.json"
+    write(path, policy_json())
+    return path
+
+
+# ---------------------------------------------------------------------------
+# load_policy_file
+# ---------------------------------------------------------------------------
+
+
+class TestLoadPolicyFile:
+    def test_unchanged_file_is_memoized(self, policy_file: Path):
+        first = load_policy_file(policy_file)
+        assert first.policy.default_policy.allow is True
+        assert load_policy_file(policy_file) is first
+        assert load_policy_file(str(policy_file)) is first
+
+    def test_same_contents_are_not_parsed_again(self, policy_file: Path, tmp_path: Path):
+        first = load_policy_file(policy_file)
+        write(policy_file, policy_json())
+        second = load_policy_file(policy_file)
+        assert second.stat != first.stat
+        assert second.policy is first.policy and second.compiled is first.compiled
+
+        # A copy elsewhere with the same bytes shares the compiled policy too
+        copy = tmp_path / "copy.json"
+        copy.write_bytes(policy_file.read_bytes())
+        assert load_policy_file(copy).compiled is first.compiled
+
+    def test_changed_contents_are_reloaded(self, policy_file: Path):
+        first = load_policy_file(policy_file)
+        write(policy_file, policy_json(allow=False))
+        second = load_policy_file(policy_file)
+        assert second.digest != first.digest
+        assert second.policy.default_policy.allow is False
+
+    def test_invalid_file(self, tmp_path: Path):
+        path = tmp_path / "bad.json"
+        write(path, json.dumps({"version": "1.0"}))
+        with pytest.raises(ValueError, match="Invalid APoP policy file"):
+            load_policy_file(path)
+        with pytest.raises(OSError):
+            load_policy_file(tmp_path / "missing.json")
+
+
+# ---------------------------------------------------------------------------
+# PolicyLoader
+# ---------------------------------------------------------------------------
+
+
+class TestPolicyLoader:
+    def test_refresh_swaps_in_changes(self, policy_file: Path):
+        loader = PolicyLoader(policy_file)
+        assert loader.refresh() is False
+        write(policy_file, policy_json(allow=False))
+        assert loader.refresh() is True
+        assert loader.policy.default_policy.allow is False
+        assert loader.snapshot() == (loader.current.policy, loader.current.compiled)
+        assert loader.reloads == 1
+
+    def test_rewrite_with_same_contents_is_not_a_reload(self, policy_file: Path):
+        loader = PolicyLoader(policy_file)
+        compiled = loader.compiled
+        write(policy_file, policy_json())
+        assert loader.refresh() is False
+        assert loader.compiled is compiled
+        assert loader.reloads == 0
+
+    def test_bad_edit_keeps_previous_policy(self, policy_file: Path):
+        errors: list[Exception] = []
+        loader = PolicyLoader(policy_file, on_error=errors.append)
+        write(policy_file, "{not json")
+        assert loader.refresh() is False
+        assert loader.refresh() is False  # the broken file is not parsed twice
+        assert loader.policy.default_policy.allow is True
+        assert loader.failures == 1
+        assert isinstance(errors[0], ValueError)
+
+        write(policy_file, policy_json(allow=False))
+        assert loader.refresh() is True
+        assert loader.policy.default_policy.allow is False
+
+    def test_missing_file_keeps_previous_policy(self, policy_file: Path):
+        loader = PolicyLoader(policy_file)
+        policy_file.unlink()
+        assert loader.refresh() is False
+        assert loader.policy.default_policy.allow is True
+        assert loader.failures == 1
+
+    def test_invalid_initial_file_raises(self, tmp_path: Path):
+        path = tmp_path / "agent-policy.json"
+        write(path, policy_json(version="9"))
+        with pytest.raises(ValueError):
+            PolicyLoader(path)
+        with pytest.raises(ValueError):
+            PolicyLoader(tmp_path / "x.json", interval=0)
+
+    @pytest.mark.parametrize("mode", ["inotify", "poll"])
+    def test_watcher_picks_up_edits(self, policy_file: Path, mode: str):
+        # With inotify, the long interval means only file events can trigger a reload
+        interval = 60.0 if mode == "inotify" else 0.05
+        loader = PolicyLoader(policy_file, interval=interval, use_inotify=mode == "inotify")
+        with loader:
+            if loader.watch_mode != mode:
+                pytest.skip("inotify is not available")
+            write(policy_file, policy_json(allow=False))
+            assert wait_for(lambda: loader.reloads == 1)
+            replace(policy_file, policy_json(allow=["read"]))
+            assert wait_for(lambda: loader.reloads == 2)
+            assert loader.policy.default_policy.allow == ["read"]
+        assert loader.watch_mode is None
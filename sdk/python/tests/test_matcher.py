@@ -2,7 +2,7 @@
 
 import pytest
 
-from apop.matcher import match_path_policy, merge_policy, path_matches
+from apop.matcher import PolicyIndex, match_path_policy, merge_policy, path_matches
 from apop.types import AgentPolicy, PathPolicy, PolicyRule, RateLimit
 
 
@@ -118,6 +118,98 @@ class TestMatchPathPolicy:
         assert result.actions == ["read"]
 
 
+# ---------------------------------------------------------------------------
+# PolicyIndex tests
+# ---------------------------------------------------------------------------
+
+INDEX_PATTERNS = [
+    "/",
+    "/*",
+    "/**",
+    "/foo",
+    "/foo/*",
+    "/foo/**",
+    "/foo/bar",
+    "/foo/bar/*",
+    "/foo/*/baz",
+    "/api/v1/**",
+    "/api/v1/users",
+    "foo/**",
+    "/a/b/c/d/*",
+]
+
+INDEX_PATHS = [
+    "/",
+    "",
+    "/foo",
+    "/foo/",
+    "/foo/bar",
+    "/foo/bar/",
+    "/foo/bar/baz",
+    "/foo//bar",
+    "/foo/*/baz",
+    "/foobar",
+    "/api/v1",
+    "/api/v1/users",
+    "/api/v1/users/42",
+    "/api/v2/users",
+    "foo",
+    "foo/x/y",
+    "/a/b/c/d/e",
+    "/a/b/c/d/e/f",
+    "/other/page",
+]
+
+
+class TestPolicyIndex:
+    def _policy(self, patterns: list[str]) -> AgentPolicy:
+        return AgentPolicy(
+            version="1.0",
+            default_policy=PolicyRule(allow=True),
+            path_policies=[PathPolicy(path=p) for p in patterns],
+        )
+
+    def test_matches_linear_scan_for_every_rule_order(self):
+        # Rotate the rule list so each pattern kind gets a turn at being first
+        for shift in range(len(INDEX_PATTERNS)):
+            patterns = INDEX_PATTERNS[shift:] + INDEX_PATTERNS[:shift]
+            policy = self._policy(patterns)
+            index = PolicyIndex.from_policy(policy)
+            for path in INDEX_PATHS:
+                assert index.match(path) is match_path_policy(policy, path), (patterns, path)
+
+    def test_match_index_returns_rule_position(self):
+        index = PolicyIndex.from_policy(self._policy(["/admin/*", "/api/**"]))
+        assert index.match_index("/api/v1/users") == 1
+        assert index.match_index("/admin/settings") == 0
+        assert index.match_index("/other") == -1
+
+    def test_first_rule_wins_for_duplicate_patterns(self):
+        policy = AgentPolicy(
+            version="1.0",
+            default_policy=PolicyRule(allow=True),
+            path_policies=[
+                PathPolicy(path="/data/*", actions=["read"]),
+                PathPolicy(path="/data/*", actions=["read", "index"]),
+            ],
+        )
+        result = PolicyIndex.from_policy(policy).match("/data/file")
+        assert result is not None
+        assert result.actions == ["read"]
+
+    def test_empty_policy_matches_nothing(self):
+        policy = AgentPolicy(version="1.0", default_policy=PolicyRule(allow=True))
+        assert PolicyIndex.from_policy(policy).match("/any/path") is None
+
+    def test_large_rule_set(self):
+        patterns = [f"/tenant{i}/**" for i in range(5000)] + ["/shared/*"]
+        policy = self._policy(patterns)
+        index = PolicyIndex.from_policy(policy)
+        assert index.match_index("/tenant4321/a/b") == 4321
+        assert index.match_index("/shared/x") == 5000
+        assert index.match_index("/shared/x/y") == -1
+
+
 # ---------------------------------------------------------------------------
 # mergePolicy tests
 # ---------------------------------------------------------------------------
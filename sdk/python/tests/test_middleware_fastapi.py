@@ -1,6 +1,7 @@
 """Tests for apop.middleware.fastapi — FastAPI/Starlette Middleware."""
 
 import json
+import os
 
 import pytest
 
@@ -128,3 +129,128 @@ class TestDiscoveryRoute:
         body = response.json()
         assert body["version"] == "1.0"
         assert "defaultPolicy" in body
+
+
+class TestFastAPIEnumerationGuard:
+    def test_blocks_ip_cycling_agent_ids(self):
+        try:
+            from fastapi import FastAPI
+            from fastapi.testclient import TestClient
+        except ImportError:
+            pytest.skip("FastAPI not installed")
+
+        from apop.enumeration import EnumerationGuard
+        from apop.middleware.fastapi import create_fastapi_middleware
+
+        app = FastAPI()
+        guard = EnumerationGuard(max_ids=5)
+        app.add_middleware(
+            create_fastapi_middleware(
+                MiddlewareOptions(policy=TEST_POLICY, enumeration_guard=guard)
+            )
+        )
+
+        @app.get("/public/page")
+        async def public_page():
+            return {"message": "Hello"}
+
+        client = TestClient(app)
+        statuses = [
+            client.get(
+                "/public/page", headers={"Agent-Name": "Bot", "Agent-Id": f"did:web:bot{i}.example"}
+            ).status_code
+            for i in range(30)
+        ]
+        assert statuses[0] == 200
+        assert statuses[-1] == 438
+        assert client.get("/public/page", headers={"Agent-Name": "Bot"}).status_code == 438
+
+
+class TestFastAPIAsyncBackends:
+    def test_async_rate_limiter_and_verifier(self):
+        try:
+            from fastapi import FastAPI
+            from fastapi.testclient import TestClient
+        except ImportError:
+            pytest.skip("FastAPI not installed")
+
+        from apop.middleware.fastapi import create_fastapi_middleware
+        from apop.ratelimit import RateLimiter
+
+        class AsyncLimiter:
+            def __init__(self) -> None:
+                self.inner = RateLimiter()
+                self.calls = 0
+
+            async def ahit(self, key, rate_limit, now=None):
+                self.calls += 1
+                return self.inner.hit(key, rate_limit, now)
+
+        async def verifier(ctx) -> bool:
+            return ctx.agent_signature == "valid"
+
+        policy = AgentPolicy(
+            version="1.0",
+            default_policy=PolicyRule(
+                allow=True,
+                rate_limit=RateLimit(requests=2, window="hour"),
+                require_verification=True,
+            ),
+        )
+        limiter = AsyncLimiter()
+        app = FastAPI()
+        app.add_middleware(
+            create_fastapi_middleware(
+                MiddlewareOptions(policy=policy, rate_limiter=limiter, verifier=verifier)
+            )
+        )
+
+        @app.get("/data")
+        async def data():
+            return {"message": "Data"}
+
+        client = TestClient(app)
+        forged = client.get("/data", headers={"Agent-Name": "Bot", "Agent-Signature": "forged"})
+        assert forged.status_code == 439
+
+        headers = {"Agent-Name": "Bot", "Agent-Signature": "valid"}
+        assert client.get("/data", headers=headers).status_code == 200
+        response = client.get("/data", headers=headers)
+        assert response.status_code == 438
+        assert int(response.headers["Retry-After"]) > 0
+        assert limiter.calls == 3
+
+
+class TestFastAPIPolicyLoader:
+    def test_edits_take_effect_without_restart(self, tmp_path):
+        try:
+            from fastapi import FastAPI
+            from fastapi.testclient import TestClient
+        except ImportError:
+            pytest.skip("FastAPI not installed")
+
+        from apop.loader import PolicyLoader
+        from apop.middleware.fastapi import create_fastapi_middleware
+
+        path = tmp_path / "agent-policy.json"
+        path.write_text(json.dumps({"version": "1.0", "defaultPolicy": {"allow": True}}))
+        loader = PolicyLoader(path)
+        app = FastAPI()
+        app.add_middleware(
+            create_fastapi_middleware(
+                MiddlewareOptions(policy=loader.policy, policy_loader=loader)
+            )
+        )
+
+        @app.get("/page")
+        async def page():
+            return {"message": "ok"}
+
+        client = TestClient(app)
+        headers = {"Agent-Name": "Bot"}
+        assert client.get("/page", headers=headers).status_code == 200
+
+        path.write_text(json.dumps({"version": "1.0", "defaultPolicy": {"allow": False}}))
+        os.utime(path, ns=(path.stat().st_mtime_ns + 10**9,) * 2)
+        assert loader.refresh()
+        assert client.get("/page", headers=headers).status_code == 430
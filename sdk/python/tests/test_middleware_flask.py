@@ -1,6 +1,7 @@
 """Tests for apop.middleware.flask — Flask Middleware."""
 
 import json
+import os
 
 import pytest
 
@@ -126,3 +127,143 @@ class TestFlaskDiscovery:
         body = response.get_json()
         assert body["version"] == "1.0"
         assert "defaultPolicy" in body
+
+
+class TestFlaskDecisionCache:
+    def test_repeated_requests_hit_cache(self):
+        try:
+            from flask import Flask
+        except ImportError:
+            pytest.skip("Flask not installed")
+
+        from apop.enforcer import DecisionCache
+        from apop.middleware.flask import create_flask_middleware
+
+        cache = DecisionCache(maxsize=16)
+        app = Flask(__name__)
+        create_flask_middleware(app, MiddlewareOptions(policy=TEST_POLICY, decision_cache=cache))
+
+        @app.route("/admin/settings")
+        def admin_settings():
+            return {"message": "Admin"}
+
+        client = app.test_client()
+        for _ in range(3):
+            response = client.get("/admin/settings", headers={"Agent-Name": "TestBot/1.0"})
+            assert response.status_code == 430
+        assert (cache.hits, cache.misses) == (2, 1)
+
+
+class TestFlaskRateLimiter:
+    def test_438_with_retry_after(self):
+        try:
+            from flask import Flask
+        except ImportError:
+            pytest.skip("Flask not installed")
+
+        from apop.middleware.flask import create_flask_middleware
+        from apop.ratelimit import RateLimiter
+
+        policy = AgentPolicy(
+            version="1.0",
+            default_policy=PolicyRule(allow=True, rate_limit=RateLimit(requests=2, window="hour")),
+        )
+        app = Flask(__name__)
+        create_flask_middleware(
+            app, MiddlewareOptions(policy=policy, rate_limiter=RateLimiter())
+        )
+
+        @app.route("/page")
+        def page():
+            return {"message": "ok"}
+
+        client = app.test_client()
+        headers = {"Agent-Name": "TestBot/1.0"}
+        assert client.get("/page", headers=headers).headers["Agent-Policy-Rate-Remaining"] == "1"
+        assert client.get("/page", headers=headers).status_code == 200
+
+        response = client.get("/page", headers=headers)
+        assert response.status_code == 438
+        assert int(response.headers["Retry-After"]) > 0
+        assert response.get_json()["error"] == "agent_rate_limited"
+
+    def test_async_only_limiter_is_rejected_at_setup(self):
+        try:
+            from flask import Flask
+        except ImportError:
+            pytest.skip("Flask not installed")
+
+        from apop.middleware.flask import create_flask_middleware
+        from apop.redis import AsyncRedisRateLimiter
+
+        options = MiddlewareOptions(policy=TEST_POLICY, rate_limiter=AsyncRedisRateLimiter())
+        with pytest.raises(TypeError, match="AsyncRedisRateLimiter is async-only"):
+            create_flask_middleware(Flask(__name__), options)
+
+
+class TestFlaskEnumerationGuard:
+    def test_blocks_ip_cycling_agent_ids(self):
+        try:
+            from flask import Flask
+        except ImportError:
+            pytest.skip("Flask not installed")
+
+        from apop.enumeration import EnumerationGuard
+        from apop.middleware.flask import create_flask_middleware
+
+        app = Flask(__name__)
+        guard = EnumerationGuard(max_ids=5)
+        create_flask_middleware(
+            app, MiddlewareOptions(policy=TEST_POLICY, enumeration_guard=guard)
+        )
+
+        @app.route("/public/page")
+        def page():
+            return {"message": "ok"}
+
+        client = app.test_client()
+        statuses = [
+            client.get(
+                "/public/page", headers={"Agent-Name": "Bot", "Agent-Id": f"did:web:bot{i}.example"}
+            ).status_code
+            for i in range(30)
+        ]
+        assert statuses[0] == 200
+        assert statuses[-1] == 438
+
+        response = client.get("/public/page", headers={"Agent-Name": "Bot"})
+        assert response.status_code == 438
+        assert int(response.headers["Retry-After"]) > 0
+        assert response.get_json()["error"] == "agent_rate_limited"
+
+
+class TestFlaskPolicyLoader:
+    def test_edits_take_effect_without_restart(self, tmp_path):
+        try:
+            from flask import Flask
+        except ImportError:
+            pytest.skip("Flask not installed")
+
+        from apop.loader import PolicyLoader
+        from apop.middleware.flask import create_flask_middleware
+
+        path = tmp_path / "agent-policy.json"
+        path.write_text(json.dumps({"version": "1.0", "defaultPolicy": {"allow": True}}))
+        loader = PolicyLoader(path)
+        app = Flask(__name__)
+        create_flask_middleware(
+            app, MiddlewareOptions(policy=loader.policy, policy_loader=loader)
+        )
+
+        @app.route("/page")
+        def page():
+            return {"message": "ok"}
+
+        client = app.test_client()
+        headers = {"Agent-Name": "Bot"}
+        assert client.get("/page", headers=headers).status_code == 200
+
+        path.write_text(json.dumps({"version": "1.0", "defaultPolicy": {"allow": False}}))
+        os.utime(path, ns=(path.stat().st_mtime_ns + 10**9,) * 2)
+        assert loader.refresh()
+        assert client.get("/page", headers=headers).status_code == 430
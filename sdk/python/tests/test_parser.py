@@ -1,10 +1,12 @@
 """Tests for apop.parser — Policy Parsing & Validation."""
 
 import json
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 
 import pytest
 
-from apop.parser import get_schema, parse_policy, validate_policy
+from apop.parser import get_schema, get_validator, parse_policy, validate_policy
 
 
 # ---------------------------------------------------------------------------
@@ -92,6 +94,16 @@ class TestParsePolicy:
         assert result.errors is not None
         assert "Invalid JSON" in result.errors[0].message
 
+    def test_parse_bytes(self):
+        result = parse_policy(FULL_POLICY.encode("utf-8"))
+        assert result.valid is True
+        assert result.policy == parse_policy(FULL_POLICY).policy
+
+    def test_engines_build_the_same_policy(self):
+        fused = parse_policy(FULL_POLICY)
+        assert fused.policy == parse_policy(FULL_POLICY, engine="generated").policy
+        assert fused.policy == parse_policy(FULL_POLICY, engine="jsonschema").policy
+
     def test_reject_missing_default_policy(self):
         result = parse_policy(json.dumps({"version": "1.0"}))
         assert result.valid is False
@@ -207,6 +219,20 @@ class TestValidatePolicy:
         result = validate_policy({"version": "1.0"})
         assert result.valid is False
 
+    def test_validator_is_shared(self):
+        assert get_validator() is get_validator()
+        assert get_validator().schema is get_schema()
+
+    def test_shared_validator_across_threads(self):
+        good = {"version": "1.0", "defaultPolicy": {"allow": True}}
+        bad = {"version": "2.0", "defaultPolicy": {"allow": "yes"}}
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(
+                pool.map(partial(validate_policy, engine="jsonschema"), [good, bad] * 200)
+            )
+        assert [r.valid for r in results] == [True, False] * 200
+        assert all(len(r.errors) == 2 for r in results[1::2])
+
 
 # ---------------------------------------------------------------------------
 # getSchema tests
@@ -0,0 +1,275 @@
+"""Tests for apop.ratelimit — Rate Limiting."""
+
+import threading
+
+import pytest
+
+from apop.compiler import compile_policy
+from apop.enforcer import DecisionCache, enforce
+from apop.parser import parse_policy
+from apop.ratelimit import RateLimiter, format_reset, gcra
+from apop.types import AgentPolicy, PathPolicy, PolicyRule, RateLimit, RequestContext
+from tests.clock import FakeClock
+
+POLICY = AgentPolicy(
+    version="1.0",
+    policy_url="https://example.com/.well-known/agent-policy.json",
+    default_policy=PolicyRule(allow=True, rate_limit=RateLimit(requests=3, window="minute")),
+    path_policies=[
+        PathPolicy(path="/api/*", rate_limit=RateLimit(requests=2, window="minute")),
+        PathPolicy(path="/free/*", allow=True),
+    ],
+)
+
+
+# ---------------------------------------------------------------------------
+# gcra / RateLimiter
+# ---------------------------------------------------------------------------
+
+
+class TestGcra:
+    def test_burst_up_to_limit(self):
+        limit = RateLimit(requests=3, window="minute")
+        tat, now = 0.0, 1000.0
+        remaining = []
+        for _ in range(3):
+            tat, decision = gcra(tat, now, limit)
+            assert decision.allowed
+            remaining.append(decision.remaining)
+        assert remaining == [2, 1, 0]
+
+        _, decision = gcra(tat, now, limit)
+        assert not decision.allowed
+        assert decision.remaining == 0
+        assert decision.retry_after == 20
+
+    def test_denied_request_does_not_advance_tat(self):
+        limit = RateLimit(requests=1, window="minute")
+        tat, _ = gcra(0.0, 1000.0, limit)
+        new_tat, decision = gcra(tat, 1000.0, limit)
+        assert not decision.allowed
+        assert new_tat == tat
+
+    def test_reset_at_is_when_budget_is_full(self):
+        limit = RateLimit(requests=2, window="minute")
+        _, decision = gcra(0.0, 1000.0, limit)
+        assert decision.reset_at == 1030.0
+
+    def test_zero_requests_always_denies(self):
+        limit = RateLimit(requests=0, window="minute")
+        tat, decision = gcra(0.0, 1000.0, limit)
+        assert not decision.allowed
+        assert tat == 0.0
+        assert decision.retry_after == 60
+        assert decision.reset_at == 1060.0
+
+
+class TestRateLimiter:
+    def test_refills_continuously(self):
+        clock = FakeClock()
+        limiter = RateLimiter(clock=clock)
+        limit = RateLimit(requests=2, window="minute")
+        assert limiter.hit("a", limit).allowed
+        assert limiter.hit("a", limit).allowed
+        assert not limiter.hit("a", limit).allowed
+
+        clock.now += 30
+        assert limiter.hit("a", limit).allowed
+        assert not limiter.hit("a", limit).allowed
+
+    def test_keys_are_independent(self):
+        limiter = RateLimiter(clock=FakeClock())
+        limit = RateLimit(requests=1, window="hour")
+        assert limiter.hit("a", limit).allowed
+        assert limiter.hit("b", limit).allowed
+        assert not limiter.hit("a", limit).allowed
+        assert len(limiter) == 2
+
+    def test_reset(self):
+        limiter = RateLimiter(clock=FakeClock())
+        limit = RateLimit(requests=1, window="day")
+        limiter.hit("a", limit)
+        limiter.reset()
+        assert len(limiter) == 0
+        assert limiter.hit("a", limit).allowed
+
+    def test_shards(self):
+        assert RateLimiter().shards == 16
+        assert RateLimiter(shards=1).shards == 1
+        with pytest.raises(ValueError):
+            RateLimiter(shards=0)
+
+    def test_keys_spread_across_shards(self):
+        limiter = RateLimiter(clock=FakeClock(), shards=4)
+        limit = RateLimit(requests=1, window="hour")
+        for i in range(100):
+            limiter.hit(f"agent{i}", limit)
+        assert len(limiter) == 100
+        assert all(shard.tats for shard in limiter._shards)
+
+    def test_max_keys_evicts_least_recently_used(self):
+        limiter = RateLimiter(clock=FakeClock(), shards=1, max_keys=3)
+        limit = RateLimit(requests=1, window="hour")
+        for key in ("a", "b", "c"):
+            limiter.hit(key, limit)
+        assert not limiter.hit("a", limit).allowed  # "a" is now the most recent
+        limiter.hit("d", limit)
+        assert limiter.live_keys == 3
+        assert limiter.evictions == 1
+        assert limiter.hit("b", limit).allowed  # "b" was evicted: full budget again
+        assert not limiter.hit("a", limit).allowed
+
+    def test_rotating_ids_stay_bounded(self):
+        limiter = RateLimiter(clock=FakeClock(), shards=4, max_keys=100)
+        limit = RateLimit(requests=10, window="hour")
+        for i in range(10_000):
+            limiter.hit(f"did:web:bot{i}.example", limit)
+        assert len(limiter) <= 100
+        assert limiter.evictions >= 9_900
+
+    def test_refilled_keys_expire(self):
+        clock = FakeClock()
+        limiter = RateLimiter(clock=clock, shards=1)
+        limiter.hit("a", RateLimit(requests=1, window="minute"))
+        limiter.hit("b", RateLimit(requests=1, window="hour"))
+        clock.now += 61
+        limiter.hit("c", RateLimit(requests=1, window="hour"))
+        assert limiter.live_keys == 2
+        assert limiter.expirations == 1
+
+    def test_rehit_key_is_not_expired_early(self):
+        clock = FakeClock()
+        limiter = RateLimiter(clock=clock, shards=1)
+        limit = RateLimit(requests=2, window="minute")
+        limiter.hit("a", limit)
+        clock.now += 20
+        limiter.hit("a", limit)
+        clock.now += 20  # the first deadline (30 s) has passed, but the TAT moved on
+        assert limiter.hit("a", limit).remaining == 0
+        assert limiter.expirations == 0
+
+    def test_rejects_max_keys_below_shards(self):
+        with pytest.raises(ValueError):
+            RateLimiter(shards=16, max_keys=8)
+        assert RateLimiter(max_keys=None).max_keys is None
+
+    def test_concurrent_hits_never_exceed_budget(self):
+        limiter = RateLimiter(clock=FakeClock(), shards=4)
+        limit = RateLimit(requests=500, window="hour")
+        allowed = [0] * 8
+        barrier = threading.Barrier(8)
+
+        def worker(t: int) -> None:
+            barrier.wait()
+            for _ in range(200):
+                if limiter.hit("shared", limit).allowed:
+                    allowed[t] += 1
+
+        threads = [threading.Thread(target=worker, args=(t,)) for t in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert sum(allowed) == 500
+
+    def test_format_reset(self):
+        assert format_reset(0) == "1970-01-01T00:00:00Z"
+
+
+# ---------------------------------------------------------------------------
+# enforce() with a rate limiter
+# ---------------------------------------------------------------------------
+
+
+class TestEnforceRateLimit:
+    @pytest.fixture
+    def clock(self) -> FakeClock:
+        return FakeClock()
+
+    @pytest.fixture
+    def limiter(self, clock: FakeClock) -> RateLimiter:
+        return RateLimiter(clock=clock)
+
+    @pytest.mark.parametrize("compiled", [False, True], ids=["policy", "compiled"])
+    def test_438_after_limit(self, limiter: RateLimiter, compiled: bool):
+        policy = compile_policy(POLICY) if compiled else POLICY
+        ctx = RequestContext(path="/api/data", agent_name="Bot", agent_id="did:web:bot.example")
+
+        first = enforce(policy, ctx, limiter)
+        assert first.http_status == 200
+        assert first.headers["Agent-Policy-Rate-Limit"] == "2/minute"
+        assert first.headers["Agent-Policy-Rate-Remaining"] == "1"
+        assert first.headers["Agent-Policy-Rate-Reset"] == "2023-11-14T22:13:50Z"
+        assert enforce(policy, ctx, limiter).headers["Agent-Policy-Rate-Remaining"] == "0"
+
+        limited = enforce(policy, ctx, limiter)
+        assert limited.status == "rate-limited"
+        assert limited.http_status == 438
+        assert limited.headers["Retry-After"] == "30"
+        assert limited.headers["Agent-Policy-Rate-Remaining"] == "0"
+        assert limited.body is not None
+        assert limited.body["error"] == "agent_rate_limited"
+        assert limited.body["retryAfter"] == 30
+        assert limited.body["limit"] == 2
+
+    def test_zero_request_limit(self, limiter: RateLimiter):
+        policy = parse_policy(
+            '{"version": "1.0", "defaultPolicy": {"allow": true,'
+            ' "rateLimit": {"requests": 0, "window": "minute"}}}'
+        ).policy
+        assert policy is not None
+        ctx = RequestContext(path="/", agent_name="Bot", agent_id="did:web:bot.example")
+        for _ in range(2):
+            limited = enforce(policy, ctx, limiter)
+            assert limited.http_status == 438
+            assert limited.headers["Retry-After"] == "60"
+        assert len(limiter) == 0
+
+    def test_budget_is_per_rule(self, limiter: RateLimiter):
+        compiled = compile_policy(POLICY)
+        api = RequestContext(path="/api/data", agent_name="Bot")
+        other = RequestContext(path="/page", agent_name="Bot")
+        for _ in range(2):
+            enforce(compiled, api, limiter)
+        assert enforce(compiled, api, limiter).http_status == 438
+        assert enforce(compiled, other, limiter).http_status == 200
+
+    def test_agent_id_preferred_over_name(self, limiter: RateLimiter):
+        compiled = compile_policy(POLICY)
+        first = RequestContext(path="/api/x", agent_name="A", agent_id="did:1")
+        for _ in range(2):
+            enforce(compiled, first, limiter)
+        shared_id = RequestContext(path="/api/x", agent_name="B", agent_id="did:1")
+        name_only = RequestContext(path="/api/x", agent_name="B")
+        assert enforce(compiled, shared_id, limiter).http_status == 438
+        assert enforce(compiled, name_only, limiter).http_status == 200
+
+    def test_denied_requests_are_not_counted(self, limiter: RateLimiter):
+        policy = AgentPolicy(
+            version="1.0",
+            default_policy=PolicyRule(allow=False, rate_limit=RateLimit(requests=1, window="hour")),
+        )
+        ctx = RequestContext(path="/", agent_name="Bot")
+        assert enforce(policy, ctx, limiter).http_status == 430
+        assert len(limiter) == 0
+
+    def test_no_rate_limit_on_rule(self, limiter: RateLimiter):
+        policy = AgentPolicy(version="1.0", default_policy=PolicyRule(allow=True))
+        result = enforce(policy, RequestContext(path="/", agent_name="Bot"), limiter)
+        assert result.http_status == 200
+        assert "Agent-Policy-Rate-Remaining" not in result.headers
+
+    def test_without_limiter_headers_are_advisory(self):
+        ctx = RequestContext(path="/api/x", agent_name="Bot")
+        for _ in range(5):
+            result = enforce(POLICY, ctx)
+        assert result.http_status == 200
+        assert result.headers["Agent-Policy-Rate-Remaining"] == "2"
+
+    def test_decision_cache_still_counts(self, limiter: RateLimiter):
+        cache = DecisionCache(maxsize=8)
+        compiled = compile_policy(POLICY)
+        ctx = RequestContext(path="/api/x", agent_name="Bot")
+        statuses = [cache.enforce(compiled, ctx, limiter).http_status for _ in range(3)]
+        assert statuses == [200, 200, 438]
+        assert cache.hits == 2
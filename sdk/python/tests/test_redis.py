@@ -0,0 +1,192 @@
+"""Tests for apop.redis — Redis Rate Limiting (against a local RESP stand-in)."""
+
+import asyncio
+import io
+
+import pytest
+
+from apop.compiler import compile_policy
+from apop.enforcer import enforce
+from apop.ratelimit import RateLimiter
+from apop.redis import (
+    AsyncRedisRateLimiter,
+    RedisRateLimiter,
+    RespError,
+    encode_command,
+    read_reply,
+)
+from apop.types import AgentPolicy, PolicyRule, RateLimit, RequestContext
+from tests.clock import FakeClock
+from tests.resp_server import RespServer
+
+NOW = 1_699_999_990.0  # 10 s into a minute window
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    return FakeClock(NOW)
+
+
+@pytest.fixture
+def server(clock: FakeClock):
+    with RespServer(clock=clock) as srv:
+        yield srv
+
+
+# ---------------------------------------------------------------------------
+# RESP encoding
+# ---------------------------------------------------------------------------
+
+
+class TestResp:
+    def test_encode_command(self):
+        assert encode_command("INCR", "k") == b"*2\r\n$4\r\nINCR\r\n$1\r\nk\r\n"
+        assert encode_command("PEXPIREAT", b"k", 42) == (
+            b"*3\r\n$9\r\nPEXPIREAT\r\n$1\r\nk\r\n$2\r\n42\r\n"
+        )
+
+    def test_read_reply(self):
+        stream = io.BytesIO(b"+OK\r\n:7\r\n$3\r\nabc\r\n$-1\r\n*2\r\n:1\r\n$0\r\n\r\n-ERR no\r\n")
+        assert read_reply(stream) == "OK"
+        assert read_reply(stream) == 7
+        assert read_reply(stream) == b"abc"
+        assert read_reply(stream) is None
+        assert read_reply(stream) == [1, b""]
+        error = read_reply(stream)
+        assert isinstance(error, RespError)
+        assert str(error) == "ERR no"
+
+    def test_truncated_reply(self):
+        with pytest.raises(ConnectionError):
+            read_reply(io.BytesIO(b""))
+
+
+# ---------------------------------------------------------------------------
+# RedisRateLimiter
+# ---------------------------------------------------------------------------
+
+
+class TestRedisRateLimiter:
+    def test_fixed_window_counting(self, server: RespServer, clock: FakeClock):
+        limiter = RedisRateLimiter("127.0.0.1", server.port, clock=clock)
+        limit = RateLimit(requests=2, window="minute")
+        assert limiter.hit("a", limit).remaining == 1
+        assert limiter.hit("a", limit).remaining == 0
+
+        denied = limiter.hit("a", limit)
+        assert not denied.allowed
+        assert denied.retry_after == 50
+        assert denied.reset_at == 1_700_000_040.0
+
+        assert limiter.hit("b", limit).allowed
+        clock.now += 50
+        assert limiter.hit("a", limit).allowed
+        limiter.close()
+
+    def test_batch_is_one_round_trip(self, server: RespServer, clock: FakeClock):
+        limiter = RedisRateLimiter("127.0.0.1", server.port, clock=clock)
+        limit = RateLimit(requests=10, window="hour")
+        decisions = limiter.hit_many([(f"agent{i % 5}", limit) for i in range(100)])
+        assert [d.allowed for d in decisions] == [True] * 50 + [False] * 50
+        assert limiter.round_trips == 1
+        assert len(server.commands) == 200
+        limiter.close()
+
+    def test_same_decisions_as_reference_within_a_window(
+        self, server: RespServer, clock: FakeClock
+    ):
+        # Within a single window both count n requests, then deny
+        limit = RateLimit(requests=5, window="day")
+        remote = RedisRateLimiter("127.0.0.1", server.port, clock=clock)
+        local = RateLimiter(clock=clock)
+        hits = [("k", limit)] * 8
+        assert [d.allowed for d in remote.hit_many(hits)] == [
+            d.allowed for d in local.hit_many(hits)
+        ]
+        remote.close()
+
+    def test_connections_are_reused(self, server: RespServer, clock: FakeClock):
+        limiter = RedisRateLimiter("127.0.0.1", server.port, clock=clock)
+        for _ in range(5):
+            limiter.hit("a", RateLimit(requests=100, window="hour"))
+        assert len(limiter._idle) == 1
+        limiter.close()
+        assert limiter._idle == []
+
+    def test_auth(self, clock: FakeClock):
+        with RespServer(password="s3cret", clock=clock) as srv:
+            limit = RateLimit(requests=1, window="hour")
+            limiter = RedisRateLimiter("127.0.0.1", srv.port, password="s3cret")
+            assert limiter.hit("a", limit).allowed
+            with pytest.raises(RespError):
+                RedisRateLimiter("127.0.0.1", srv.port, password="wrong").hit("a", limit)
+
+    def test_connection_error_propagates(self):
+        limiter = RedisRateLimiter("127.0.0.1", 1, timeout=0.5)
+        with pytest.raises(OSError):
+            limiter.hit("a", RateLimit(requests=1, window="hour"))
+
+    def test_enforce_returns_438(self, server: RespServer, clock: FakeClock):
+        policy = compile_policy(
+            AgentPolicy(
+                version="1.0",
+                default_policy=PolicyRule(
+                    allow=True, rate_limit=RateLimit(requests=1, window="minute")
+                ),
+            )
+        )
+        limiter = RedisRateLimiter("127.0.0.1", server.port, clock=clock)
+        ctx = RequestContext(path="/", agent_name="Bot", agent_id="did:web:bot.example")
+        assert enforce(policy, ctx, limiter).http_status == 200
+        limited = enforce(policy, ctx, limiter)
+        assert limited.http_status == 438
+        assert limited.headers["Retry-After"] == "50"
+        limiter.close()
+
+
+# ---------------------------------------------------------------------------
+# AsyncRedisRateLimiter
+# ---------------------------------------------------------------------------
+
+
+class TestAsyncRedisRateLimiter:
+    async def test_concurrent_hits_share_one_pipeline(
+        self, server: RespServer, clock: FakeClock
+    ):
+        limiter = AsyncRedisRateLimiter("127.0.0.1", server.port, clock=clock)
+        limit = RateLimit(requests=30, window="minute")
+        decisions = await asyncio.gather(*(limiter.ahit("a", limit) for _ in range(50)))
+        assert sum(d.allowed for d in decisions) == 30
+        assert sorted(d.remaining for d in decisions if d.allowed) == list(range(30))
+        assert limiter.round_trips == 1
+        await limiter.aclose()
+
+    async def test_sequential_hits(self, server: RespServer, clock: FakeClock):
+        limiter = AsyncRedisRateLimiter("127.0.0.1", server.port, clock=clock)
+        limit = RateLimit(requests=2, window="hour")
+        results = [await limiter.ahit("a", limit) for _ in range(3)]
+        assert [r.allowed for r in results] == [True, True, False]
+        assert limiter.round_trips == 3
+        await limiter.aclose()
+
+    async def test_ahit_many(self, server: RespServer, clock: FakeClock):
+        limiter = AsyncRedisRateLimiter("127.0.0.1", server.port, clock=clock)
+        limit = RateLimit(requests=1, window="day")
+        decisions = await limiter.ahit_many([("a", limit), ("b", limit), ("a", limit)])
+        assert [d.allowed for d in decisions] == [True, True, False]
+        await limiter.aclose()
+
+    async def test_connection_error_fails_every_waiter(self):
+        limiter = AsyncRedisRateLimiter("127.0.0.1", 1, timeout=0.5)
+        limit = RateLimit(requests=1, window="hour")
+        results = await asyncio.gather(
+            *(limiter.ahit("a", limit) for _ in range(3)), return_exceptions=True
+        )
+        assert all(isinstance(r, OSError) for r in results)
+        await limiter.aclose()
+
+    async def test_in_memory_limiter_is_also_async(self, clock: FakeClock):
+        limiter = RateLimiter(clock=clock)
+        limit = RateLimit(requests=1, window="hour")
+        assert (await limiter.ahit("a", limit)).allowed
+        assert not (await limiter.ahit_many([("a", limit)]))[0].allowed
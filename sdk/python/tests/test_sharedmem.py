@@ -0,0 +1,143 @@
+"""Tests for apop.sharedmem — Shared-Memory Rate Limiting."""
+
+import multiprocessing
+import sys
+
+import pytest
+
+from apop.compiler import compile_policy
+from apop.enforcer import enforce
+from apop.ratelimit import key_digest
+from apop.sharedmem import SharedMemoryRateLimiter
+from apop.types import AgentPolicy, PolicyRule, RateLimit, RequestContext
+from tests.clock import FakeClock
+
+pytestmark = pytest.mark.skipif(sys.platform == "win32", reason="requires fcntl")
+
+
+def _hammer(path: str, hits: int, results: "multiprocessing.Queue[int]") -> None:
+    limiter = SharedMemoryRateLimiter(path)
+    limit = RateLimit(requests=300, window="hour")
+    allowed = sum(limiter.hit("shared", limit, now=1_700_000_000.0).allowed for _ in range(hits))
+    limiter.close()
+    results.put(allowed)
+
+
+class TestSharedMemoryRateLimiter:
+    def test_counts_like_in_memory_limiter(self, tmp_path):
+        clock = FakeClock()
+        with SharedMemoryRateLimiter(str(tmp_path / "rl.bin"), clock=clock) as limiter:
+            limit = RateLimit(requests=2, window="minute")
+            assert limiter.hit("a", limit).remaining == 1
+            assert limiter.hit("a", limit).remaining == 0
+            denied = limiter.hit("a", limit)
+            assert not denied.allowed
+            assert denied.retry_after == 30
+            assert limiter.hit("b", limit).allowed
+
+            clock.now += 30
+            assert limiter.hit("a", limit).allowed
+            # "b" has fully refilled, so only "a" still holds state
+            assert len(limiter) == 1
+
+    def test_zero_request_limit_denies(self, tmp_path):
+        with SharedMemoryRateLimiter(str(tmp_path / "rl.bin"), clock=FakeClock()) as limiter:
+            denied = limiter.hit("a", RateLimit(requests=0, window="hour"))
+            assert not denied.allowed
+            assert denied.retry_after == 3600
+            assert len(limiter) == 0
+
+    def test_state_shared_between_handles(self, tmp_path):
+        path = str(tmp_path / "rl.bin")
+        limit = RateLimit(requests=1, window="hour")
+        clock = FakeClock()
+        with SharedMemoryRateLimiter(path, clock=clock) as first:
+            with SharedMemoryRateLimiter(path, clock=clock) as second:
+                assert first.hit(("did:web:a", 0), limit).allowed
+                assert not second.hit(("did:web:a", 0), limit).allowed
+
+    def test_existing_table_keeps_its_size(self, tmp_path):
+        path = str(tmp_path / "rl.bin")
+        with SharedMemoryRateLimiter(path, slots=100, stripes=8) as limiter:
+            assert (limiter.slots, limiter.stripes) == (104, 8)
+        with SharedMemoryRateLimiter(path, slots=5000) as limiter:
+            assert limiter.slots == 104
+
+    def test_rejects_foreign_file(self, tmp_path):
+        path = tmp_path / "other.bin"
+        path.write_bytes(b"not a table" * 10)
+        with pytest.raises(ValueError):
+            SharedMemoryRateLimiter(str(path))
+
+    def test_full_stripe_evicts_nearest_to_refill(self, tmp_path):
+        clock = FakeClock()
+        with SharedMemoryRateLimiter(
+            str(tmp_path / "rl.bin"), slots=4, stripes=1, clock=clock
+        ) as limiter:
+            hour = RateLimit(requests=1, window="hour")
+            minute = RateLimit(requests=1, window="minute")
+            for key in ("a", "b", "c"):
+                limiter.hit(key, hour)
+            limiter.hit("short", minute)
+            assert len(limiter) == 4
+
+            assert limiter.hit("new", hour).allowed
+            assert len(limiter) == 4
+            # "short" was evicted and starts over; the long-lived keys survived
+            assert limiter.hit("short", minute).allowed
+            assert not limiter.hit("b", hour).allowed
+
+    def test_refilled_slots_are_reused(self, tmp_path):
+        clock = FakeClock()
+        with SharedMemoryRateLimiter(
+            str(tmp_path / "rl.bin"), slots=2, stripes=1, clock=clock
+        ) as limiter:
+            minute = RateLimit(requests=1, window="minute")
+            limiter.hit("a", minute)
+            limiter.hit("b", minute)
+            clock.now += 120
+            assert len(limiter) == 0
+            assert limiter.hit("c", minute).allowed
+            assert not limiter.hit("c", minute).allowed
+
+    def test_reset(self, tmp_path):
+        with SharedMemoryRateLimiter(str(tmp_path / "rl.bin"), clock=FakeClock()) as limiter:
+            limit = RateLimit(requests=1, window="day")
+            limiter.hit("a", limit)
+            limiter.reset()
+            assert len(limiter) == 0
+            assert limiter.hit("a", limit).allowed
+
+    def test_key_digest_is_stable_and_non_zero(self):
+        assert key_digest(("did:web:a", 0)) == key_digest(("did:web:a", 0))
+        assert key_digest(("did:web:a", 0)) != key_digest(("did:web:a", 1))
+        assert key_digest("") != 0
+
+    def test_worker_processes_share_one_budget(self, tmp_path):
+        path = str(tmp_path / "rl.bin")
+        SharedMemoryRateLimiter(path).close()
+
+        ctx = multiprocessing.get_context("fork" if sys.platform != "darwin" else "spawn")
+        results = ctx.Queue()
+        workers = [ctx.Process(target=_hammer, args=(path, 200, results)) for _ in range(4)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join(timeout=30)
+        assert sum(results.get(timeout=5) for _ in workers) == 300
+
+    def test_enforce_with_shared_limiter(self, tmp_path):
+        policy = compile_policy(
+            AgentPolicy(
+                version="1.0",
+                default_policy=PolicyRule(
+                    allow=True, rate_limit=RateLimit(requests=1, window="minute")
+                ),
+            )
+        )
+        ctx = RequestContext(path="/", agent_name="Bot", agent_id="did:web:bot.example")
+        with SharedMemoryRateLimiter(str(tmp_path / "rl.bin"), clock=FakeClock()) as limiter:
+            assert enforce(policy, ctx, limiter).http_status == 200
+            limited = enforce(policy, ctx, limiter)
+            assert limited.http_status == 438
+            assert limited.headers["Retry-After"] == "60"
@@ -0,0 +1,64 @@
+"""Tests for apop.wheel — Timing Wheel."""
+
+import random
+
+from apop.wheel import SPAN, TimingWheel
+
+
+class TestTimingWheel:
+    def test_fires_after_deadline(self):
+        wheel = TimingWheel(now=100)
+        wheel.schedule("a", 105.5)
+        assert list(wheel.advance(105)) == []
+        assert list(wheel.advance(106)) == ["a"]
+        assert len(wheel) == 0
+
+    def test_past_deadline_fires_on_next_tick(self):
+        wheel = TimingWheel(now=100)
+        wheel.schedule("a", 50)
+        assert list(wheel.advance(101)) == ["a"]
+
+    def test_cancel_and_reschedule(self):
+        wheel = TimingWheel(now=0)
+        wheel.schedule("a", 10)
+        wheel.schedule("b", 10)
+        wheel.cancel("a")
+        wheel.schedule("b", 20)
+        assert "a" not in wheel
+        assert list(wheel.advance(15)) == []
+        assert list(wheel.advance(20)) == ["b"]
+
+    def test_cascades_through_levels(self):
+        wheel = TimingWheel(now=0)
+        deadlines = {"minute": 61, "hour": 3600, "day": 86_400, "beyond": SPAN * 2}
+        for item, deadline in deadlines.items():
+            wheel.schedule(item, deadline)
+        fired = {}
+        for now in range(0, SPAN * 2 + 10_000, 7):
+            for item in wheel.advance(now):
+                fired[item] = now
+        for item, deadline in deadlines.items():
+            assert deadline <= fired[item] < deadline + 7
+
+    def test_matches_sorted_deadlines(self):
+        rng = random.Random(7)
+        wheel = TimingWheel(now=1_000)
+        deadlines = {i: 1_000 + rng.uniform(0, 20_000) for i in range(2_000)}
+        for item, deadline in deadlines.items():
+            wheel.schedule(item, deadline)
+        now = 1_000
+        while len(wheel):
+            now += rng.randint(1, 300)
+            for item in wheel.advance(now):
+                assert deadlines[item] <= now
+                del deadlines[item]
+            assert all(deadline > now for deadline in deadlines.values())
+
+    def test_large_jump_rebuilds(self):
+        wheel = TimingWheel(now=0)
+        wheel.schedule("soon", 10)
+        wheel.schedule("later", SPAN * 3)
+        assert list(wheel.advance(SPAN * 2)) == ["soon"]
+        assert "later" in wheel
+        assert wheel.tick == SPAN * 2
+        assert list(wheel.advance(SPAN * 3)) == ["later"]